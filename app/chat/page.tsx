@@ -8,7 +8,7 @@ import { Badge } from '@/components/ui/badge'
 import { ModelSelector } from '@/components/ModelSelector'
 import { PromptUnderstanding } from '@/components/PromptUnderstanding'
 import { useChatStore } from '@/store/chatStore'
-import { Message, AVAILABLE_MODELS } from '@/lib/types'
+import { Message, CHAT_MODELS } from '@/lib/types'
 import { generateId, formatDate } from '@/lib/utils'
 import { 
   Send, 
@@ -38,13 +38,13 @@ export default function ChatPage() {
   const [copiedMessageId, setCopiedMessageId] = useState<string | null>(null)
   
   const {
-    selectedModel,
-    setSelectedModel,
+    chatModel,
+    setChatModel,
   } = useChatStore()
 
   const messages = localMessages
   const isLoading = localLoading
-  const currentModel = AVAILABLE_MODELS.find(m => m.id === selectedModel) || AVAILABLE_MODELS[0]
+  const currentModel = CHAT_MODELS.find(m => m.id === chatModel) || CHAT_MODELS[0]
 
   useEffect(() => {
     scrollToBottom()
@@ -82,7 +82,7 @@ export default function ChatPage() {
           role: m.role,
           content: m.content
         })),
-        modelId: selectedModel
+        modelId: chatModel
       }
       
       console.log('📦 Request body:', requestBody)
@@ -227,8 +227,9 @@ export default function ChatPage() {
                 Limpiar
               </Button>
               <ModelSelector
-                selectedModel={selectedModel}
-                onModelChange={setSelectedModel}
+                selectedModel={chatModel}
+                onModelChange={setChatModel}
+                models={CHAT_MODELS}
                 disabled={isLoading}
                 compact={true}
               />
@@ -284,7 +285,10 @@ export default function ChatPage() {
           
           <div className="mt-2 text-xs text-muted-foreground flex items-center justify-between">
             <span>Presiona Enter para enviar, Shift+Enter para nueva línea</span>
-            <span>Modelo: {currentModel.name} • ${currentModel.costPer1kTokens}/1k tokens</span>
+            <span>
+              Modelo: {currentModel.name}
+              {currentModel.costPer1kTokens !== undefined && ` • $${currentModel.costPer1kTokens}/1k tokens`}
+            </span>
           </div>
         </div>
       </div>
@@ -61,6 +61,7 @@ interface ProjectsResponse {
   projects: Project[]
   statistics: ProjectStatistics
   total: number
+  nextToken?: string | null
   timestamp: string
 }
 
@@ -80,32 +81,41 @@ export default function ProjectsPage() {
   const [selectedProject, setSelectedProject] = useState<Project | null>(null)
   const [showPreview, setShowPreview] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  // Cursor de la siguiente página de GET /projects (null = no hay más)
+  const [nextToken, setNextToken] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
 
   useEffect(() => {
     loadProjects()
   }, [])
 
+  const fetchProjectsPage = async (token?: string | null): Promise<ProjectsResponse> => {
+    const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'https://75bl52azoi.execute-api.us-east-1.amazonaws.com/prod'
+    const query = token ? `?nextToken=${encodeURIComponent(token)}` : ''
+    const response = await fetch(`${API_BASE_URL}/projects${query}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    })
+
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`)
+    }
+
+    return response.json()
+  }
+
   const loadProjects = async () => {
     try {
       setIsLoading(true)
       setError(null)
       
-      const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'https://75bl52azoi.execute-api.us-east-1.amazonaws.com/prod'
-      const response = await fetch(`${API_BASE_URL}/projects`, {
-        method: 'GET',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      })
-
-      if (!response.ok) {
-        throw new Error(`HTTP ${response.status}: ${response.statusText}`)
-      }
-
-      const data: ProjectsResponse = await response.json()
+      const data = await fetchProjectsPage()
       console.log('✅ Projects loaded:', data)
       
       setProjects(data.projects || [])
+      setNextToken(data.nextToken || null)
       setStatistics(data.statistics || {
         totalProjects: 0,
         completedProjects: 0,
@@ -117,11 +127,30 @@ export default function ProjectsPage() {
       console.error('❌ Error loading projects:', error)
       setError(error.message || 'Error al cargar proyectos')
       setProjects([])
+      setNextToken(null)
     } finally {
       setIsLoading(false)
     }
   }
 
+  const loadMoreProjects = async () => {
+    if (!nextToken) return
+    try {
+      setIsLoadingMore(true)
+      setError(null)
+      
+      const data = await fetchProjectsPage(nextToken)
+      setProjects(prev => [...prev, ...(data.projects || [])])
+      setNextToken(data.nextToken || null)
+      
+    } catch (error: any) {
+      console.error('❌ Error loading more projects:', error)
+      setError(error.message || 'Error al cargar más proyectos')
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   const loadProjectDetails = async (projectId: string) => {
     try {
       const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'https://75bl52azoi.execute-api.us-east-1.amazonaws.com/prod'
@@ -476,6 +505,18 @@ export default function ProjectsPage() {
               </table>
             </div>
           )}
+          {nextToken && (
+            <div className="flex justify-center pt-4">
+              <Button
+                variant="outline"
+                onClick={loadMoreProjects}
+                disabled={isLoadingMore}
+              >
+                {isLoadingMore && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+                Cargar más proyectos
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
 
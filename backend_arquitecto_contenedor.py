@@ -1,15 +1,26 @@
 import json
 import boto3
 import os
+import sys
 import urllib3
 from datetime import datetime
 import uuid
 
+# context_window y s3_upload_pipeline viven en lambda/arquitecto: se importan desde ahí al usar el
+# backend desde la raíz; en el paquete desplegado (deploy-arquitecto-backend.sh) van al lado del handler
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda', 'arquitecto'))
+
+from context_window import ContextWindow, render_transcript
+from s3_upload_pipeline import upload_documents
+
 # Clientes AWS
 bedrock_runtime = boto3.client('bedrock-runtime', region_name='us-east-1')
 s3_client = boto3.client('s3', region_name='us-east-1')
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 
+# Presupuesto de tokens del historial (CONTEXT_MAX_TOKENS); el resumen se cachea entre invocaciones
+context_window = ContextWindow()
+
 # Variables de entorno
 DOCUMENTS_BUCKET = os.environ.get('DOCUMENTS_BUCKET', 'aws-propuestas-v3-documents-prod-035385358261')
 PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'aws-propuestas-v3-projects-prod')
@@ -202,7 +213,7 @@ def save_project_to_dynamodb(project_info, documents_generated):
             'projectName': project_info['name'],
             'projectType': project_info.get('type', 'Solucion AWS'),
             'status': 'completed',
-            'createdAt': datetime.now().isoformat(),
+            'createdAt': int(datetime.now().timestamp()),  # Llave numérica de StatusIndex/UserIndex
             'updatedAt': datetime.now().isoformat(),
             'description': f"Proyecto {project_info['name']} generado con contenedores MCP",
             'documentsGenerated': documents_generated,
@@ -218,39 +229,21 @@ def save_project_to_dynamodb(project_info, documents_generated):
         return False
 
 def upload_documents_to_s3(project_info, documents):
-    """Sube documentos a S3"""
+    """Sube documentos a S3 en paralelo con el pipeline compartido; retorna el reporte por archivo"""
     try:
         folder_name = f"{project_info['name'].lower().replace(' ', '-')}-{project_info['id'][:8]}"
         
-        for doc_name, content in documents.items():
-            key = f"{folder_name}/{doc_name}"
-            
-            # Determinar content type
-            if doc_name.endswith('.json'):
-                content_type = 'application/json'
-            elif doc_name.endswith('.csv'):
-                content_type = 'text/csv'
-            elif doc_name.endswith('.docx'):
-                content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            elif doc_name.endswith('.pdf'):
-                content_type = 'application/pdf'
-            elif doc_name.endswith('.xlsx'):
-                content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        report = upload_documents(s3_client, DOCUMENTS_BUCKET, folder_name, documents)
+        for file in report['files']:
+            if file['success']:
+                print(f"Uploaded {file['name']} to S3 ({file['size_bytes']} bytes, {file['duration_ms']}ms)")
             else:
-                content_type = 'text/plain'
-            
-            s3_client.put_object(
-                Bucket=DOCUMENTS_BUCKET,
-                Key=key,
-                Body=content,
-                ContentType=content_type
-            )
-            print(f"Uploaded {doc_name} to S3")
+                print(f"Error uploading {file['name']} to S3: {file['error']}")
         
-        return True
+        return report
     except Exception as e:
         print(f"Error uploading to S3: {str(e)}")
-        return False
+        return None
 
 def lambda_handler(event, context):
     try:
@@ -275,11 +268,9 @@ def lambda_handler(event, context):
             }
         
         # Construir el prompt con el contexto maestro
-        conversation_history = ""
-        for msg in messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            conversation_history += f"\n{role.upper()}: {content}"
+        # Historial dentro del presupuesto de tokens: turnos recientes completos, anteriores resumidos
+        context = context_window.fit(messages, prefix=PROMPT_MAESTRO, summary_state=body.get('contextSummary'))
+        conversation_history = render_transcript(context['messages'], context['summary'])
         
         # FORZAR generacion de documentos despues de 5 intercambios
         message_count = len(messages)
@@ -334,6 +325,7 @@ def lambda_handler(event, context):
         # GENERAR DOCUMENTOS SOLO cuando el modelo lo decida explícitamente
         documents_generated = None
         project_id = None
+        upload_report = None
         project_name = None
         
         # SOLO generar si dice explícitamente la frase exacta
@@ -383,7 +375,8 @@ def lambda_handler(event, context):
                 documents = generate_fallback_documents(project_info['name'])
             
             # Subir a S3
-            if documents and upload_documents_to_s3(project_info, documents):
+            upload_report = upload_documents_to_s3(project_info, documents) if documents else None
+            if upload_report and upload_report['success']:
                 # Guardar en DynamoDB
                 documents_list = list(documents.keys())
                 if save_project_to_dynamodb(project_info, documents_list):
@@ -410,6 +403,9 @@ def lambda_handler(event, context):
             'mcpServicesUsed': list(set(mcp_services_used)),
             'documentsGenerated': documents_generated,
             'projectId': project_id,
+            'uploadReport': upload_report,
+            'context': context['stats'],
+            'contextSummary': context['summaryState'],
             'projectName': project_name,
             'messageCount': message_count
         }
@@ -1,14 +1,25 @@
 import json
 import boto3
 import os
+import sys
 from datetime import datetime
 import uuid
 
+# context_window y s3_upload_pipeline viven en lambda/arquitecto: se importan desde ahí al usar el
+# backend desde la raíz; en el paquete desplegado (deploy-arquitecto-backend.sh) van al lado del handler
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda', 'arquitecto'))
+
+from context_window import ContextWindow, render_transcript
+from s3_upload_pipeline import upload_documents
+
 # Clientes AWS
 bedrock_runtime = boto3.client('bedrock-runtime', region_name='us-east-1')
 s3_client = boto3.client('s3', region_name='us-east-1')
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 
+# Presupuesto de tokens del historial (CONTEXT_MAX_TOKENS); el resumen se cachea entre invocaciones
+context_window = ContextWindow()
+
 # Variables de entorno
 DOCUMENTS_BUCKET = os.environ.get('DOCUMENTS_BUCKET', 'aws-propuestas-v3-documents-prod-035385358261')
 PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'aws-propuestas-v3-projects-prod')
@@ -241,7 +252,7 @@ def save_project_to_dynamodb(project_info, documents_generated):
             'projectName': project_info['name'],
             'projectType': project_info.get('type', 'Solucion AWS'),
             'status': 'completed',
-            'createdAt': datetime.now().isoformat(),
+            'createdAt': int(datetime.now().timestamp()),  # Llave numérica de StatusIndex/UserIndex
             'updatedAt': datetime.now().isoformat(),
             'description': f"Proyecto {project_info['name']} generado automaticamente por el Arquitecto AWS",
             'documentsGenerated': documents_generated,
@@ -257,24 +268,21 @@ def save_project_to_dynamodb(project_info, documents_generated):
         return False
 
 def upload_documents_to_s3(project_info, documents):
-    """Sube documentos a S3"""
+    """Sube documentos a S3 en paralelo con el pipeline compartido; retorna el reporte por archivo"""
     try:
         folder_name = f"{project_info['name'].lower().replace(' ', '-')}-{project_info['id'][:8]}"
         
-        for doc_name, content in documents.items():
-            key = f"{folder_name}/{doc_name}"
-            s3_client.put_object(
-                Bucket=DOCUMENTS_BUCKET,
-                Key=key,
-                Body=content,
-                ContentType='application/json' if doc_name.endswith('.json') else 'text/csv' if doc_name.endswith('.csv') else 'text/markdown'
-            )
-            print(f"✅ Uploaded {doc_name} to S3")
+        report = upload_documents(s3_client, DOCUMENTS_BUCKET, folder_name, documents)
+        for file in report['files']:
+            if file['success']:
+                print(f"✅ Uploaded {file['name']} to S3 ({file['size_bytes']} bytes, {file['duration_ms']}ms)")
+            else:
+                print(f"❌ Error uploading {file['name']} to S3: {file['error']}")
         
-        return True
+        return report
     except Exception as e:
         print(f"❌ Error uploading to S3: {str(e)}")
-        return False
+        return None
 
 def lambda_handler(event, context):
     try:
@@ -299,11 +307,9 @@ def lambda_handler(event, context):
             }
         
         # Construir el prompt con el contexto maestro
-        conversation_history = ""
-        for msg in messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            conversation_history += f"\n{role.upper()}: {content}"
+        # Historial dentro del presupuesto de tokens: turnos recientes completos, anteriores resumidos
+        context = context_window.fit(messages, prefix=PROMPT_MAESTRO, summary_state=body.get('contextSummary'))
+        conversation_history = render_transcript(context['messages'], context['summary'])
         
         message_count = len(messages)
         print(f"📊 Message count: {message_count}")
@@ -356,6 +362,7 @@ def lambda_handler(event, context):
         # GENERAR DOCUMENTOS solo si dice explícitamente "GENERO LOS SIGUIENTES DOCUMENTOS"
         documents_generated = None
         project_id = None
+        upload_report = None
         project_name = None
         
         if "GENERO LOS SIGUIENTES DOCUMENTOS:" in ai_response.upper():
@@ -380,7 +387,8 @@ def lambda_handler(event, context):
             documents = generate_real_documents(project_info['name'])
             
             # Subir a S3
-            if upload_documents_to_s3(project_info, documents):
+            upload_report = upload_documents_to_s3(project_info, documents)
+            if upload_report and upload_report['success']:
                 # Guardar en DynamoDB
                 documents_list = list(documents.keys())
                 if save_project_to_dynamodb(project_info, documents_list):
@@ -405,6 +413,9 @@ def lambda_handler(event, context):
             'mcpServicesUsed': mcp_services_used,  # Solo si realmente los usa
             'documentsGenerated': documents_generated,
             'projectId': project_id,
+            'uploadReport': upload_report,
+            'context': context['stats'],
+            'contextSummary': context['summaryState'],
             'projectName': project_name,
             'messageCount': message_count
         }
@@ -10,6 +10,7 @@ interface ModelSelectorProps {
   disabled?: boolean
   compact?: boolean
   className?: string
+  models?: Model[]
 }
 
 export function ModelSelector({ 
@@ -17,9 +18,10 @@ export function ModelSelector({
   onModelChange, 
   disabled = false, 
   compact = false,
-  className 
+  className,
+  models = AVAILABLE_MODELS
 }: ModelSelectorProps) {
-  const currentModel = AVAILABLE_MODELS.find(m => m.id === selectedModel) || AVAILABLE_MODELS[0]
+  const currentModel = models.find(m => m.id === selectedModel) || models[0]
 
   if (compact) {
     return (
@@ -31,14 +33,16 @@ export function ModelSelector({
           disabled={disabled}
           className="text-sm border border-gray-600 rounded-md px-3 py-1.5 bg-gray-800 text-white focus:ring-2 focus:ring-blue-500 focus:border-blue-500 disabled:opacity-50 disabled:cursor-not-allowed"
         >
-          {AVAILABLE_MODELS.map((model) => (
+          {models.map((model) => (
             <option key={model.id} value={model.id} className="bg-gray-800 text-white">
               {model.icon || '🤖'} {model.name}
             </option>
           ))}
         </select>
         <div className="text-xs text-gray-400">
-          ${currentModel.costPer1kTokens || 0}/1k tokens
+          {currentModel.costPer1kTokens !== undefined
+            ? `$${currentModel.costPer1kTokens}/1k tokens`
+            : 'Costo según el modelo elegido'}
         </div>
       </div>
     )
@@ -54,7 +58,7 @@ export function ModelSelector({
       </div>
       
       <div className="grid gap-3">
-        {AVAILABLE_MODELS.map((model) => (
+        {models.map((model) => (
           <ModelCard
             key={model.id}
             model={model}
@@ -105,7 +109,9 @@ function ModelCard({ model, isSelected, onSelect, disabled }: ModelCardProps) {
             <div className="flex items-center space-x-4 mt-2 text-xs text-gray-400">
               <span>Proveedor: <span className="text-gray-300">{model.provider}</span></span>
               <span>Max tokens: <span className="text-gray-300">{model.maxTokens.toLocaleString()}</span></span>
-              <span className="font-medium text-green-400">${model.costPer1kTokens || 0}/1k tokens</span>
+              {model.costPer1kTokens !== undefined && (
+                <span className="font-medium text-green-400">${model.costPer1kTokens}/1k tokens</span>
+              )}
             </div>
           </div>
         </div>
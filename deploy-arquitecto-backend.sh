@@ -0,0 +1,41 @@
+#!/bin/bash
+
+# Empaqueta uno de los backend_arquitecto_*.py de la raíz junto con los módulos compartidos
+# de lambda/arquitecto que importa (context_window, s3_upload_pipeline) y actualiza la Lambda.
+# Uso: ./deploy-arquitecto-backend.sh backend_arquitecto_final.py [nombre-de-la-funcion]
+
+BACKEND_FILE=$1
+FUNCTION_NAME=${2:-aws-propuestas-v3-arquitecto-prod}
+SHARED_MODULES="context_window.py s3_upload_pipeline.py"
+
+if [ -z "$BACKEND_FILE" ] || [ ! -f "$BACKEND_FILE" ]; then
+    echo "❌ Uso: $0 backend_arquitecto_<variante>.py [nombre-de-la-funcion]"
+    exit 1
+fi
+
+echo "🚀 Desplegando $BACKEND_FILE en $FUNCTION_NAME..."
+echo "================================================"
+
+BUILD_DIR=$(mktemp -d)
+trap 'rm -rf "$BUILD_DIR"' EXIT
+
+# El backend y los módulos compartidos van en la raíz del paquete (mismo directorio que el handler)
+echo "📦 Creando paquete de deployment..."
+cp "$BACKEND_FILE" "$BUILD_DIR/"
+for module in $SHARED_MODULES; do
+    cp "lambda/arquitecto/$module" "$BUILD_DIR/"
+done
+(cd "$BUILD_DIR" && zip -q -r backend.zip .)
+
+echo "🔄 Actualizando función Lambda (handler: ${BACKEND_FILE%.py}.lambda_handler)..."
+aws lambda update-function-code \
+    --function-name "$FUNCTION_NAME" \
+    --zip-file "fileb://$BUILD_DIR/backend.zip" \
+    --region us-east-1
+
+if [ $? -eq 0 ]; then
+    echo "✅ Lambda actualizada exitosamente!"
+else
+    echo "❌ Error al actualizar la Lambda"
+    exit 1
+fi
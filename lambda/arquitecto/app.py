@@ -2,19 +2,23 @@
 Amazon Q CLI Intelligent Architect - Lambda handler principal
 """
 import json
-import boto3
 import logging
 import asyncio
 from datetime import datetime
-import uuid
 import os
+from analysis_storage import encode_analysis_results
+from aws_clients import get_client, get_resource, get_table
 from conversation_handler import ConversationState
 from mcp_caller import IntelligentMCPCaller
+from persistence_queue import enqueue_project, new_project_id, process_sqs_records
+from session_store import ChatSessionStore, SessionNotFound
 
 # Configuración de logging detallado
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'aws-propuestas-v3-projects-prod-v2')
+
 def log_request(event, body):
     """Log detallado de la petición"""
     logger.info("=== INICIO REQUEST LOGGING ===")
@@ -44,35 +48,123 @@ def create_response(status_code, body):
         'body': json.dumps(body)
     }
 
-def save_project_to_db(project_data, analysis_results):
-    """Guarda el proyecto en DynamoDB"""
+def persist_project(project_id, project_data, analysis_results, created_at=None, user_id=None):
+    """
+    Escribe el proyecto en DynamoDB (y analysis_results en S3 si es grande)
+    Idempotente por projectId: un reintento del consumidor sobrescribe el mismo item
+    createdAt (epoch), status y userId son las llaves de StatusIndex/UserIndex que lee GET /projects
+    """
+    table = get_table(PROJECTS_TABLE)
+    created = datetime.fromisoformat(created_at) if created_at else datetime.now()
+    
+    item = {
+        'projectId': project_id,  # Clave primaria correcta
+        'name': project_data.get('name', 'Proyecto sin nombre'),
+        'type': 'intelligent_analysis',
+        'created_at': created.isoformat(),
+        'createdAt': int(created.timestamp()),
+        'userId': user_id or 'anonymous',
+        'status': 'completed'
+    }
+    
+    # Inline, comprimido o en S3 según tamaño (leer con analysis_storage.decode_analysis_results)
+    item.update(encode_analysis_results(project_id, analysis_results, s3_client=get_client('s3')))
+    
+    table.put_item(Item=item)
+    logger.info(f"✅ Proyecto guardado en DynamoDB: {project_id}")
+
+def save_project_to_db(project_data, analysis_results, user_id=None):
+    """
+    Guarda el proyecto y retorna (projectId, modo)
+    Con cola configurada la escritura es write-behind ('queued'); si no, síncrona ('saved')
+    """
+    # Generar projectId único por adelantado para poder responder sin esperar la escritura
+    project_id = new_project_id()
+    
+    if enqueue_project(project_id, project_data, analysis_results, user_id):
+        return project_id, 'queued'
+    
     try:
-        import boto3
-        import uuid
-        from datetime import datetime
-        
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(os.environ.get('PROJECTS_TABLE', 'aws-propuestas-v3-projects-prod-v2'))
-        
-        # Generar projectId único (clave primaria requerida por DynamoDB)
-        project_id = f"proj_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
-        
-        item = {
-            'projectId': project_id,  # Clave primaria correcta
-            'name': project_data.get('name', 'Proyecto sin nombre'),
-            'type': 'intelligent_analysis',
-            'analysis_results': json.dumps(analysis_results),
-            'created_at': datetime.now().isoformat(),
-            'status': 'completed'
-        }
-        
-        table.put_item(Item=item)
-        logger.info(f"✅ Proyecto guardado en DynamoDB: {project_id}")
-        
-        return project_id
+        persist_project(project_id, project_data, analysis_results, user_id=user_id)
+        return project_id, 'saved'
         
     except Exception as e:
         logger.error(f"❌ Error guardando proyecto: {str(e)}")
+        return None, 'failed'
+
+def persistence_queue_handler(event, context):
+    """Consumidor SQS de la persistencia write-behind (ReportBatchItemFailures)"""
+    def process(message):
+        persist_project(
+            message['projectId'],
+            message.get('projectData') or {},
+            message.get('analysisResults') or {},
+            created_at=message.get('createdAt'),
+            user_id=message.get('userId')
+        )
+    
+    return process_sqs_records(event.get('Records', []), process)
+
+_session_store = None
+
+def get_session_store():
+    """Store de sesiones sobre ChatSessionsTable (se crea en el primer uso)"""
+    global _session_store
+    if _session_store is None:
+        _session_store = ChatSessionStore(get_resource('dynamodb'))
+    return _session_store
+
+def load_session_turn(body):
+    """
+    Modo sesión: el cliente envía {'message', 'sessionId'?} en lugar de messages + projectState
+    La detección de análisis revisa todo el historial del usuario, así que se carga el transcript
+    completo desde DynamoDB (el payload del request sigue siendo solo el mensaje nuevo)
+    """
+    new_message = {'role': 'user', 'content': body.get('message') or ''}
+    session_id = body.get('sessionId')
+    
+    if not session_id:
+        return {
+            'sessionId': ChatSessionStore.new_session_id(),
+            'isNew': True,
+            'newMessage': new_message,
+            'messages': [new_message],
+            'projectState': {}
+        }
+    
+    loaded = get_session_store().load(session_id, from_index=0)
+    stored_state = loaded['session'].get('projectState')
+    return {
+        'sessionId': session_id,
+        'isNew': False,
+        'newMessage': new_message,
+        'messages': loaded['messages'] + [new_message],
+        'projectState': json.loads(stored_state) if stored_state else {}
+    }
+
+def save_session_turn(session_turn, payload, user_id=None):
+    """
+    Agrega el mensaje del usuario y la respuesta al transcript y guarda el projectState
+    Si la escritura falla se registra y retorna None: la respuesta (y el proyecto) ya existen
+    """
+    # system_analysis ya queda en la tabla de proyectos: no se duplica en la sesión
+    project_state = {
+        key: value for key, value in (payload.get('projectState') or {}).items()
+        if key != 'system_analysis'
+    }
+    attributes = {'projectState': json.dumps(project_state, default=str)}
+    if session_turn['isNew']:
+        attributes['title'] = session_turn['newMessage']['content'][:80]
+    
+    try:
+        return get_session_store().append(
+            session_turn['sessionId'],
+            [session_turn['newMessage'], {'role': 'assistant', 'content': payload.get('message', '')}],
+            user_id=user_id,
+            attributes=attributes
+        )
+    except Exception as e:
+        logger.error(f"❌ Error guardando el turno en la sesión {session_turn['sessionId']}: {str(e)}")
         return None
 
 def lambda_handler(event, context):
@@ -91,8 +183,25 @@ def lambda_handler(event, context):
         body = json.loads(event.get('body', '{}'))
         log_request(event, body)
         
-        messages = body.get('messages', [])
-        project_state = body.get('projectState', {})
+        # Modo sesión: solo el mensaje nuevo + sessionId; si no, historial completo del cliente
+        session_turn = None
+        if 'message' in body:
+            try:
+                session_turn = load_session_turn(body)
+            except SessionNotFound:
+                return create_response(404, {'error': 'Session not found'})
+            messages = session_turn['messages']
+            project_state = session_turn['projectState']
+        else:
+            messages = body.get('messages', [])
+            project_state = body.get('projectState', {})
+        
+        def reply(payload):
+            """Respuesta 200; en modo sesión primero se agrega el turno al transcript"""
+            if session_turn:
+                payload['sessionId'] = session_turn['sessionId']
+                payload['messageCount'] = save_session_turn(session_turn, payload, body.get('userId'))
+            return create_response(200, payload)
         
         # Inicializar manejador de conversación inteligente
         conversation = ConversationState()
@@ -133,22 +242,25 @@ def lambda_handler(event, context):
                     project_state['system_analysis'] = intelligent_results
                     
                     # Guardar proyecto en DB
-                    project_id = save_project_to_db(conversation.project_data, intelligent_results)
+                    project_id, persistence = save_project_to_db(
+                        conversation.project_data, intelligent_results, body.get('userId')
+                    )
                     
-                    return create_response(200, {
+                    return reply({
                         'message': intelligent_results.get('final_response', analysis_prompt),
                         'projectState': project_state,
                         'mcpActivated': True,
                         'mcpUsed': intelligent_results.get('mcp_services_used', []),
                         'conversationComplete': True,
                         'projectId': project_id,
+                        'persistence': persistence,
                         'systemAnalysis': intelligent_results
                     })
                     
             except Exception as e:
                 logger.error(f"❌ Error en análisis inteligente: {str(e)}")
                 # Fallback: mostrar prompt de análisis
-                return create_response(200, {
+                return reply({
                     'message': analysis_prompt,
                     'projectState': project_state,
                     'mcpActivated': True,
@@ -159,7 +271,7 @@ def lambda_handler(event, context):
         
         # Si no necesita análisis inteligente, usar flujo básico
         if not conversation.is_ready_to_generate():
-            return create_response(200, {
+            return reply({
                 'message': "¿Cuál es el nombre del proyecto?",
                 'projectState': project_state,
                 'mcpActivated': False,
@@ -189,15 +301,16 @@ def lambda_handler(event, context):
             )
             
             # Guardar proyecto en DB
-            project_id = save_project_to_db(project_data, results)
+            project_id, persistence = save_project_to_db(project_data, results, body.get('userId'))
             
-            return create_response(200, {
+            return reply({
                 'message': results.get('summary', 'Documentos generados exitosamente'),
                 'projectState': project_state,
                 'mcpActivated': True,
                 'mcpUsed': results.get('mcp_services_used', []),
                 'conversationComplete': True,
                 'projectId': project_id,
+                'persistence': persistence,
                 'results': results
             })
             
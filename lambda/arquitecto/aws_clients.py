@@ -0,0 +1,94 @@
+"""
+Registro compartido de clientes AWS para la Lambda arquitecto
+Cada cliente, resource y Table se crea una sola vez (lazy) y se reutiliza entre invocaciones warm
+con una configuración de botocore ajustada: pool de conexiones, keep-alive y reintentos adaptativos
+"""
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger()
+
+# Configuración de botocore (sobrescribible por variables de entorno)
+AWS_REGION = os.environ.get('AWS_REGION', os.environ.get('REGION', 'us-east-1'))
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '32'))
+AWS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('AWS_CONNECT_TIMEOUT_SECONDS', '3'))
+AWS_READ_TIMEOUT_SECONDS = float(os.environ.get('AWS_READ_TIMEOUT_SECONDS', '30'))
+AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '5'))
+
+BOTO_CONFIG = Config(
+    region_name=AWS_REGION,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    connect_timeout=AWS_CONNECT_TIMEOUT_SECONDS,
+    read_timeout=AWS_READ_TIMEOUT_SECONDS,
+    tcp_keepalive=True,
+    retries={'total_max_attempts': AWS_MAX_ATTEMPTS, 'mode': 'adaptive'}
+)
+
+# Una sola sesión: boto3.client/resource crean sesiones por defecto que no son thread-safe
+_session: Optional[boto3.session.Session] = None
+_clients: Dict[str, Any] = {}
+_resources: Dict[str, Any] = {}
+_tables: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+
+def _get_session() -> boto3.session.Session:
+    global _session
+    if _session is None:
+        _session = boto3.session.Session(region_name=AWS_REGION)
+    return _session
+
+
+def get_client(service_name: str):
+    """Cliente de bajo nivel compartido (s3, elbv2, bedrock-runtime, ...)"""
+    client = _clients.get(service_name)
+    if client is not None:
+        return client
+
+    with _lock:
+        if service_name not in _clients:
+            _clients[service_name] = _get_session().client(service_name, config=BOTO_CONFIG)
+            logger.info(f"🔌 Cliente AWS {service_name} creado (pool={AWS_MAX_POOL_CONNECTIONS})")
+        return _clients[service_name]
+
+
+def get_resource(service_name: str):
+    """Resource de alto nivel compartido (dynamodb, s3)"""
+    resource = _resources.get(service_name)
+    if resource is not None:
+        return resource
+
+    with _lock:
+        if service_name not in _resources:
+            _resources[service_name] = _get_session().resource(service_name, config=BOTO_CONFIG)
+            logger.info(f"🔌 Resource AWS {service_name} creado")
+        return _resources[service_name]
+
+
+def get_table(table_name: str):
+    """Handle de una tabla DynamoDB, cacheado por nombre"""
+    key = ('dynamodb', table_name)
+    table = _tables.get(key)
+    if table is not None:
+        return table
+
+    dynamodb = get_resource('dynamodb')
+    with _lock:
+        if key not in _tables:
+            _tables[key] = dynamodb.Table(table_name)
+        return _tables[key]
+
+
+def reset_clients() -> None:
+    """Descarta todos los clientes (p. ej. tras rotar credenciales)"""
+    global _session
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _tables.clear()
+        _session = None
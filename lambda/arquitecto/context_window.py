@@ -0,0 +1,223 @@
+"""
+Manejo de la ventana de contexto de las conversaciones
+Aplica un presupuesto de tokens: el prefijo (instrucciones) y los turnos recientes van completos,
+los turnos anteriores se pliegan en un resumen incremental que viaja/se guarda con la sesión
+y se cachea por huella del historial plegado
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger()
+
+# Configuración (sobrescribible por variables de entorno)
+CONTEXT_MAX_TOKENS = int(os.environ.get('CONTEXT_MAX_TOKENS', '6000'))
+CONTEXT_KEEP_RECENT_MESSAGES = int(os.environ.get('CONTEXT_KEEP_RECENT_MESSAGES', '6'))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.environ.get('CONTEXT_SUMMARY_MAX_TOKENS', '600'))
+CONTEXT_SUMMARY_CACHE_ENTRIES = int(os.environ.get('CONTEXT_SUMMARY_CACHE_ENTRIES', '256'))
+
+# Aproximación sin tokenizer: ~4 caracteres por token más un overhead fijo por mensaje
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+# Caracteres por turno que conserva el resumen extractivo
+SUMMARY_CHARS_PER_MESSAGE = 240
+
+Summarizer = Callable[[str, List[Dict[str, Any]], int], str]
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """Texto de un mensaje en formato simple ({content: str}) o Bedrock ({content: [{text}]})"""
+    content = message.get('content', '')
+    if isinstance(content, list):
+        return ' '.join(block.get('text', '') for block in content if isinstance(block, dict))
+    return str(content)
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return estimate_tokens(message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def fingerprint(messages: List[Dict[str, Any]], seed: str = '') -> str:
+    """Huella estable de una lista de mensajes (role + texto), opcionalmente encadenada a un resumen previo"""
+    digest = hashlib.sha256(seed.encode('utf-8'))
+    for message in messages:
+        digest.update(json.dumps([message.get('role', 'user'), message_text(message)], ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def extractive_summary(previous: str, messages: List[Dict[str, Any]], max_tokens: int) -> str:
+    """
+    Resumen sin llamadas a modelos: una línea recortada por turno plegado
+    Si excede el presupuesto se descartan las líneas más antiguas (ventana rodante)
+    """
+    lines = previous.splitlines() if previous else []
+    for message in messages:
+        text = ' '.join(message_text(message).split())
+        if len(text) > SUMMARY_CHARS_PER_MESSAGE:
+            text = text[:SUMMARY_CHARS_PER_MESSAGE].rstrip() + '…'
+        lines.append(f"- {message.get('role', 'user').upper()}: {text}")
+
+    while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    return '\n'.join(lines)[:max_tokens * CHARS_PER_TOKEN]
+
+
+def bedrock_summarizer(bedrock_client, model_id: str) -> Summarizer:
+    """Summarizer que pide a un modelo (idealmente uno rápido) extender el resumen anterior"""
+    def summarize(previous: str, messages: List[Dict[str, Any]], max_tokens: int) -> str:
+        transcript = '\n'.join(f"{m.get('role', 'user').upper()}: {message_text(m)}" for m in messages)
+        prompt = (
+            f"Actualiza el resumen de una conversación con un consultor AWS. Conserva requisitos, "
+            f"decisiones, servicios, cifras y nombres. Máximo {max_tokens} tokens, solo el resumen.\n\n"
+            f"RESUMEN ANTERIOR:\n{previous or '(vacío)'}\n\nNUEVOS TURNOS:\n{transcript}"
+        )
+        try:
+            response = bedrock_client.converse(
+                modelId=model_id,
+                messages=[{'role': 'user', 'content': [{'text': prompt}]}],
+                inferenceConfig={'maxTokens': max_tokens, 'temperature': 0.2}
+            )
+            return response['output']['message']['content'][0]['text'].strip()
+        except Exception as e:
+            logger.error(f"Error resumiendo contexto con {model_id}, usando resumen extractivo: {str(e)}")
+            return extractive_summary(previous, messages, max_tokens)
+
+    return summarize
+
+
+class ContextWindow:
+    """Recorta un historial a un presupuesto de tokens con resumen rodante de lo plegado"""
+
+    def __init__(self, max_tokens: int = CONTEXT_MAX_TOKENS,
+                 keep_recent: int = CONTEXT_KEEP_RECENT_MESSAGES,
+                 summary_max_tokens: int = CONTEXT_SUMMARY_MAX_TOKENS,
+                 summarizer: Optional[Summarizer] = None,
+                 cache_entries: int = CONTEXT_SUMMARY_CACHE_ENTRIES):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer or extractive_summary
+        self.cache_entries = cache_entries
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cut_index(self, messages: List[Dict[str, Any]], tokens: List[int], prefix_tokens: int) -> int:
+        """
+        Primer mensaje que se conserva completo
+        Se conservan al menos keep_recent mensajes y todos los que quepan en el presupuesto;
+        el corte se mueve hasta un turno 'user' para que la conversación no empiece con 'assistant'
+        """
+        available = self.max_tokens - prefix_tokens - self.summary_max_tokens
+        cut = len(messages)
+        used = 0
+        while cut > 0:
+            needed = tokens[cut - 1]
+            if len(messages) - cut >= self.keep_recent and used + needed > available:
+                break
+            used += needed
+            cut -= 1
+
+        while 0 < cut < len(messages) and messages[cut].get('role', 'user') != 'user':
+            cut += 1
+        return cut
+
+    def _summarize(self, messages: List[Dict[str, Any]], cut: int,
+                   summary_state: Optional[Dict[str, Any]], prior: str) -> Dict[str, Any]:
+        """Resumen de prior + messages[:cut] reutilizando el estado recibido o el cache cuando se puede"""
+        folded_fingerprint = fingerprint(messages[:cut], seed=prior)
+
+        with self._lock:
+            cached = self._cache.get(folded_fingerprint)
+            if cached is not None:
+                self._cache.move_to_end(folded_fingerprint)
+        if cached is not None:
+            return {'text': cached, 'coveredMessages': cut, 'fingerprint': folded_fingerprint, 'source': 'cache'}
+
+        previous, start, source = '', 0, 'computed'
+        if prior:
+            previous, source = prior, 'incremental'
+        elif summary_state:
+            covered = int(summary_state.get('coveredMessages', 0))
+            if 0 < covered <= cut and fingerprint(messages[:covered]) == summary_state.get('fingerprint'):
+                # Incremental: solo se resumen los turnos plegados desde la última vez
+                previous, start, source = summary_state.get('text', ''), covered, 'incremental'
+
+        text = previous if start == cut else self.summarizer(previous, messages[start:cut], self.summary_max_tokens)
+
+        with self._lock:
+            self._cache[folded_fingerprint] = text
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+        return {'text': text, 'coveredMessages': cut, 'fingerprint': folded_fingerprint, 'source': source}
+
+    def fit(self, messages: List[Dict[str, Any]], prefix: str = '',
+            summary_state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Aplica el presupuesto a messages
+        summary_state con coveredMessages > 0 es el estado devuelto por un fit anterior sobre el mismo
+        historial; con coveredMessages == 0 su texto resume turnos que ya no están en messages
+        (p. ej. una sesión guardada que solo carga la cola sin resumir)
+        Retorna {'messages': turnos completos, 'summary': texto o None,
+                 'summaryState': estado a guardar con la sesión, 'stats': tokens antes/después}
+        """
+        prior = ''
+        if summary_state and not int(summary_state.get('coveredMessages', 0)):
+            prior = summary_state.get('text') or ''
+
+        prefix_tokens = estimate_tokens(prefix)
+        prior_tokens = estimate_tokens(prior)
+        tokens = [message_tokens(message) for message in messages]
+        tokens_before = prefix_tokens + prior_tokens + sum(tokens)
+
+        stats = {
+            'budget': self.max_tokens,
+            'tokensBefore': tokens_before,
+            'tokensAfter': tokens_before,
+            'messagesBefore': len(messages),
+            'messagesKept': len(messages),
+            'messagesFolded': 0,
+            'summaryTokens': prior_tokens,
+            'summarySource': 'prior' if prior else None
+        }
+        unchanged = {'messages': messages, 'summary': prior or None, 'summaryState': summary_state, 'stats': stats}
+
+        if tokens_before <= self.max_tokens:
+            return unchanged
+
+        cut = self._cut_index(messages, tokens, prefix_tokens)
+        if cut == 0:
+            return unchanged
+
+        summary = self._summarize(messages, cut, summary_state, prior)
+        kept = messages[cut:]
+        summary_tokens = estimate_tokens(summary['text'])
+
+        stats.update({
+            'tokensAfter': prefix_tokens + summary_tokens + sum(tokens[cut:]),
+            'messagesKept': len(kept),
+            'messagesFolded': cut,
+            'summaryTokens': summary_tokens,
+            'summarySource': summary.pop('source')
+        })
+        logger.info(f"✂️ Contexto recortado: {stats['tokensBefore']} → {stats['tokensAfter']} tokens "
+                    f"({cut} mensajes plegados, resumen {stats['summarySource']})")
+
+        return {'messages': kept, 'summary': summary['text'], 'summaryState': summary, 'stats': stats}
+
+
+def render_transcript(messages: List[Dict[str, Any]], summary: Optional[str] = None) -> str:
+    """Historial como texto ("\\nROLE: contenido") para prompts de un solo mensaje"""
+    transcript = f"\nRESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{summary}\n" if summary else ''
+    for message in messages:
+        transcript += f"\n{message.get('role', 'user').upper()}: {message_text(message)}"
+    return transcript
@@ -4,8 +4,12 @@ Activa MCP services automáticamente según el contexto
 """
 import json
 import logging
-import requests
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+
+import aiohttp
+
+from mcp_dag_executor import MCPDagExecutor, MCPNode
+from mcp_http_pool import get_session
 
 logger = logging.getLogger()
 
@@ -71,52 +75,65 @@ class IntelligentMCPCaller:
             return {"error": "Datos insuficientes para activar MCP"}
         
         context = self.get_intelligent_context(project_data)
-        results = {}
         
         try:
-            # 1. SIEMPRE: Core MCP para prompt understanding
-            logger.info("🧠 Activando Core MCP para prompt understanding...")
-            core_result = await self._call_core_mcp_intelligent(context)
-            results['core_analysis'] = core_result
-            
-            # 2. INTELIGENTE: Diagram MCP según servicios detectados
-            logger.info("🎨 Activando Diagram MCP inteligentemente...")
-            diagram_result = await self._call_diagram_mcp_intelligent(context, core_result)
-            results['architecture_diagram'] = diagram_result
+            # Core primero; Diagram, Pricing y CloudFormation en cuanto core termina;
+            # AWS Docs solo depende del contexto; Docgen espera los artefactos que consume
+            run = await MCPDagExecutor(self._build_generation_graph(context)).run({'context': context})
             
-            # 3. INTELIGENTE: Pricing MCP con contexto específico
-            logger.info("💰 Activando Pricing MCP con contexto...")
-            pricing_result = await self._call_pricing_mcp_intelligent(context, core_result)
-            results['cost_estimation'] = pricing_result
+            if not run['success']:
+                raise RuntimeError(f"Nodos MCP con error: {run['errors']}")
             
-            # 4. INTELIGENTE: CloudFormation MCP
-            logger.info("☁️ Activando CloudFormation MCP...")
-            cfn_result = await self._call_cfn_mcp_intelligent(context, core_result)
-            results['infrastructure_code'] = cfn_result
-            
-            # 5. CONDICIONAL: AWS Docs MCP si necesita documentación específica
-            if self._needs_aws_documentation(context):
-                logger.info("📚 Activando AWS Docs MCP...")
-                docs_result = await self._call_awsdocs_mcp_intelligent(context)
-                results['aws_documentation'] = docs_result
-            
-            # 6. SIEMPRE: Document Generator para archivos finales
-            logger.info("📄 Activando Document Generator...")
-            docgen_result = await self._call_docgen_intelligent(context, results)
-            results['generated_documents'] = docgen_result
+            # Mantener el orden declarado del grafo, no el orden de finalización
+            results = {name: run['results'][name] for name in run['status']}
             
             return {
                 "success": True,
                 "project_name": project_data['name'],
                 "mcp_services_used": list(results.keys()),
                 "results": results,
-                "generation_summary": self._create_generation_summary(results)
+                "generation_summary": self._create_generation_summary(results),
+                "execution_trace": run['trace']
             }
             
         except Exception as e:
             logger.error(f"Error en orquestación MCP: {str(e)}")
             return {"error": f"Error generando documentos: {str(e)}"}
     
+    def _build_generation_graph(self, context: Dict[str, Any]) -> List[MCPNode]:
+        """Declara cada llamada MCP con las entradas que necesita"""
+        async def call_docgen(context, **mcp_results):
+            return await self._call_docgen_intelligent(context, mcp_results)
+        
+        nodes = [
+            # 1. SIEMPRE: Core MCP para prompt understanding
+            MCPNode('core_analysis', self._call_core_mcp_intelligent,
+                    inputs={'context': 'context'}),
+            # 2-4. Diagram, Pricing y CloudFormation dependen solo del análisis core
+            MCPNode('architecture_diagram', self._call_diagram_mcp_intelligent,
+                    inputs={'context': 'context', 'core_analysis': 'core_analysis'}),
+            MCPNode('cost_estimation', self._call_pricing_mcp_intelligent,
+                    inputs={'context': 'context', 'core_analysis': 'core_analysis'}),
+            MCPNode('infrastructure_code', self._call_cfn_mcp_intelligent,
+                    inputs={'context': 'context', 'core_analysis': 'core_analysis'})
+        ]
+        
+        # 5. CONDICIONAL: AWS Docs MCP si necesita documentación específica
+        if self._needs_aws_documentation(context):
+            nodes.append(MCPNode('aws_documentation', self._call_awsdocs_mcp_intelligent,
+                                 inputs={'context': 'context'}))
+        
+        # 6. SIEMPRE: Document Generator para archivos finales
+        nodes.append(MCPNode('generated_documents', call_docgen, inputs={
+            'context': 'context',
+            'core_analysis': 'core_analysis',
+            'architecture_diagram': 'architecture_diagram',
+            'cost_estimation': 'cost_estimation',
+            'infrastructure_code': 'infrastructure_code'
+        }))
+        
+        return nodes
+    
     async def _call_core_mcp_intelligent(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Llama Core MCP con prompt understanding"""
         payload = {
@@ -125,17 +142,12 @@ class IntelligentMCPCaller:
             "request": f"Analiza este proyecto: {context['project_name']} - {context['solution_type']} con servicios {context['aws_services']}"
         }
         
-        response = requests.post(
-            self.mcp_endpoints['core'],
-            json=payload,
-            timeout=30,
-            headers={'Content-Type': 'application/json'}
-        )
+        status, body = await self._post_mcp('core', payload, timeout=30)
         
-        if response.status_code == 200:
-            return response.json()
+        if status == 200:
+            return body
         else:
-            logger.warning(f"Core MCP falló: {response.status_code}")
+            logger.warning(f"Core MCP falló: {status}")
             return {"analysis": "Análisis básico del proyecto", "recommendations": []}
     
     async def _call_diagram_mcp_intelligent(self, context: Dict[str, Any], core_analysis: Dict[str, Any]) -> Dict[str, Any]:
@@ -148,17 +160,12 @@ class IntelligentMCPCaller:
             "core_recommendations": core_analysis.get('recommendations', [])
         }
         
-        response = requests.post(
-            self.mcp_endpoints['diagram'],
-            json=payload,
-            timeout=45,
-            headers={'Content-Type': 'application/json'}
-        )
+        status, body = await self._post_mcp('diagram', payload, timeout=45)
         
-        if response.status_code == 200:
-            return response.json()
+        if status == 200:
+            return body
         else:
-            logger.warning(f"Diagram MCP falló: {response.status_code}")
+            logger.warning(f"Diagram MCP falló: {status}")
             return {"diagram_url": None, "message": "Diagrama no generado"}
     
     async def _call_pricing_mcp_intelligent(self, context: Dict[str, Any], core_analysis: Dict[str, Any]) -> Dict[str, Any]:
@@ -171,17 +178,12 @@ class IntelligentMCPCaller:
             "estimated_users": self._extract_user_count(context['requirements'])
         }
         
-        response = requests.post(
-            self.mcp_endpoints['pricing'],
-            json=payload,
-            timeout=30,
-            headers={'Content-Type': 'application/json'}
-        )
+        status, body = await self._post_mcp('pricing', payload, timeout=30)
         
-        if response.status_code == 200:
-            return response.json()
+        if status == 200:
+            return body
         else:
-            logger.warning(f"Pricing MCP falló: {response.status_code}")
+            logger.warning(f"Pricing MCP falló: {status}")
             return {"monthly_cost": "No calculado", "breakdown": []}
     
     async def _call_cfn_mcp_intelligent(self, context: Dict[str, Any], core_analysis: Dict[str, Any]) -> Dict[str, Any]:
@@ -194,17 +196,12 @@ class IntelligentMCPCaller:
             "security_enabled": True
         }
         
-        response = requests.post(
-            self.mcp_endpoints['cfn'],
-            json=payload,
-            timeout=60,
-            headers={'Content-Type': 'application/json'}
-        )
+        status, body = await self._post_mcp('cfn', payload, timeout=60)
         
-        if response.status_code == 200:
-            return response.json()
+        if status == 200:
+            return body
         else:
-            logger.warning(f"CloudFormation MCP falló: {response.status_code}")
+            logger.warning(f"CloudFormation MCP falló: {status}")
             return {"template": None, "message": "Template no generado"}
     
     async def _call_docgen_intelligent(self, context: Dict[str, Any], mcp_results: Dict[str, Any]) -> Dict[str, Any]:
@@ -219,17 +216,12 @@ class IntelligentMCPCaller:
             "generate_formats": ["csv", "xlsx", "docx", "pdf", "txt"]
         }
         
-        response = requests.post(
-            self.mcp_endpoints['docgen'],
-            json=payload,
-            timeout=90,
-            headers={'Content-Type': 'application/json'}
-        )
+        status, body = await self._post_mcp('docgen', payload, timeout=90)
         
-        if response.status_code == 200:
-            return response.json()
+        if status == 200:
+            return body
         else:
-            logger.warning(f"Document Generator falló: {response.status_code}")
+            logger.warning(f"Document Generator falló: {status}")
             return {"documents": [], "message": "Documentos no generados"}
     
     async def _call_awsdocs_mcp_intelligent(self, context: Dict[str, Any]) -> Dict[str, Any]:
@@ -244,18 +236,26 @@ class IntelligentMCPCaller:
             "documentation_type": "best_practices"
         }
         
-        response = requests.post(
-            self.mcp_endpoints['awsdocs'],
-            json=payload,
-            timeout=30,
-            headers={'Content-Type': 'application/json'}
-        )
+        status, body = await self._post_mcp('awsdocs', payload, timeout=30)
         
-        if response.status_code == 200:
-            return response.json()
+        if status == 200:
+            return body
         else:
             return {"documentation": "Documentación no disponible"}
     
+    async def _post_mcp(self, service: str, payload: Dict[str, Any], timeout: float) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """POST no bloqueante a un MCP usando el pool HTTP compartido"""
+        session = await get_session()
+        async with session.post(
+            self.mcp_endpoints[service],
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            headers={'Content-Type': 'application/json'}
+        ) as response:
+            if response.status == 200:
+                return response.status, await response.json(content_type=None)
+            return response.status, None
+    
     def _needs_aws_documentation(self, context: Dict[str, Any]) -> bool:
         """Determina si necesita documentación AWS específica"""
         complex_services = ['LAMBDA', 'DYNAMODB', 'API GATEWAY', 'EKS', 'ECS']
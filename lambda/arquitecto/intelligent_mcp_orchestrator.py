@@ -7,6 +7,7 @@ import asyncio
 import aiohttp
 import json
 import logging
+import os
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
@@ -159,7 +160,8 @@ class IntelligentTriggerSystem:
 class IntelligentMCPOrchestrator:
     """Intelligent MCP Orchestrator with phase-based execution"""
     
-    def __init__(self):
+    def __init__(self, docs_max_services: Optional[int] = None, docs_concurrency: Optional[int] = None,
+                 docs_deadline: Optional[float] = None):
         self.mcp_endpoints = {
             'core': 'https://mcp.danielingram.shop/core',
             'pricing': 'https://mcp.danielingram.shop/pricing',
@@ -170,6 +172,11 @@ class IntelligentMCPOrchestrator:
         }
         
         self.trigger_system = IntelligentTriggerSystem()
+        
+        # AWS Docs fan-out: how many services to look up, how many at once, and the overall deadline
+        self.docs_max_services = docs_max_services or int(os.environ.get('AWSDOCS_MAX_SERVICES', '3'))
+        self.docs_concurrency = docs_concurrency or int(os.environ.get('AWSDOCS_CONCURRENCY', '5'))
+        self.docs_deadline = docs_deadline or float(os.environ.get('AWSDOCS_DEADLINE_SECONDS', '20'))
         self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
     
     async def call_mcp_tool(self, mcp_name: str, tool_name: str, arguments: Dict) -> Dict:
@@ -221,17 +228,7 @@ class IntelligentMCPOrchestrator:
         
         # 1.2 AWS Docs MCP - Official information (CRITICAL)
         services_detected = core_analysis.get('services_detected', [])
-        docs_context = {}
-        
-        for service in services_detected[:3]:  # Limit to top 3 services
-            docs_result = await self.call_mcp_tool('awsdocs', 'search_documentation', {
-                'service': service,
-                'query': f'{service} best practices architecture',
-                'context': 'solution_design'
-            })
-            
-            if not docs_result.get('error'):
-                docs_context[service] = docs_result
+        docs_context = await self.search_service_documentation(services_detected[:self.docs_max_services])
         
         readiness_score = self.calculate_readiness_score(core_analysis, docs_context)
         
@@ -243,6 +240,38 @@ class IntelligentMCPOrchestrator:
             'mcps_used': ['awslabscore_mcp_server___prompt_understanding', 'awslabsaws_documentation_mcp_server___search_documentation']
         }
     
+    async def search_service_documentation(self, services: List[str]) -> Dict:
+        """Look up AWS Docs for several services concurrently, keyed by service"""
+        
+        if not services:
+            return {}
+        
+        semaphore = asyncio.Semaphore(self.docs_concurrency)
+        
+        async def search(service: str) -> Dict:
+            async with semaphore:
+                return await self.call_mcp_tool('awsdocs', 'search_documentation', {
+                    'service': service,
+                    'query': f'{service} best practices architecture',
+                    'context': 'solution_design'
+                })
+        
+        tasks = {asyncio.ensure_future(search(service)): service for service in services}
+        done, pending = await asyncio.wait(tasks, timeout=self.docs_deadline)
+        
+        # Lookups still running at the deadline are dropped, not waited on
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"AWS Docs deadline reached, skipped: {[tasks[task] for task in pending]}")
+        
+        docs_context = {}
+        for task, service in tasks.items():
+            if task in done and task.exception() is None and not task.result().get('error'):
+                docs_context[service] = task.result()
+        
+        return docs_context
+    
     async def phase_2_validation(self, phase_1_results: Dict) -> Dict:
         """PHASE 2: Validation and Enrichment (CONDITIONAL)"""
         
@@ -5,13 +5,34 @@ import asyncio
 import aiohttp
 import json
 import logging
+import os
+import time
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+from mcp_http_pool import get_session
 
 logger = logging.getLogger()
 
+# Etapas del análisis inteligente: (clave en system_analysis, nombre en mcp_services_used, log)
+ANALYSIS_STAGES = [
+    ('core', 'core_analysis', '🔍 Ejecutando análisis core...'),
+    ('aws', 'aws_analysis', '☁️ Ejecutando análisis AWS...'),
+    ('documentation', 'documentation_analysis', '📚 Ejecutando análisis de documentación...'),
+    ('costs', 'cost_analysis', '💰 Ejecutando análisis de costos...'),
+    ('diagrams', 'diagram_generation', '🎨 Generando diagramas de arquitectura...')
+]
+
+# Deadline por etapa en segundos (un poco por encima del timeout HTTP de 10s)
+DEFAULT_STAGE_TIMEOUTS = {
+    'core': 12.0,
+    'aws': 5.0,
+    'documentation': 12.0,
+    'costs': 12.0,
+    'diagrams': 12.0
+}
+
 class IntelligentMCPCaller:
-    def __init__(self):
+    def __init__(self, execution_mode: Optional[str] = None, stage_timeouts: Optional[Dict[str, float]] = None):
         self.mcp_endpoints = {
             'core': 'https://mcp.danielingram.shop/core',
             'diagram': 'https://mcp.danielingram.shop/diagram',
@@ -19,6 +40,10 @@ class IntelligentMCPCaller:
             'cfn': 'https://mcp.danielingram.shop/cfn',
             'docgen': 'https://mcp.danielingram.shop/docgen'
         }
+        # 'concurrent' (por defecto) o 'sequential'
+        self.execution_mode = execution_mode or os.environ.get('MCP_EXECUTION_MODE', 'concurrent')
+        self.stage_timeouts = {**DEFAULT_STAGE_TIMEOUTS, **(stage_timeouts or {})}
+    
     async def execute_intelligent_analysis(self, project_data: Dict[str, Any], messages: List[Dict], project_state: Dict) -> Dict[str, Any]:
         """
         Ejecuta análisis inteligente completo como Amazon Q CLI
@@ -34,48 +59,22 @@ class IntelligentMCPCaller:
                 'mcp_services_used': [],
                 'system_analysis': {},
                 'recommendations': [],
-                'final_response': ''
+                'final_response': '',
+                'execution_mode': self.execution_mode,
+                'stage_timings': {}
             }
             
-            # 1. ANÁLISIS CORE - Entender el contexto completo
-            logger.info("🔍 Ejecutando análisis core...")
-            core_analysis = await self._execute_core_analysis(project_data, messages)
-            if core_analysis:
-                analysis_results['system_analysis']['core'] = core_analysis
-                analysis_results['mcp_services_used'].append('core_analysis')
-                logger.info("✅ Análisis core completado")
-            
-            # 2. ANÁLISIS AWS - Revisar infraestructura actual
-            logger.info("☁️ Ejecutando análisis AWS...")
-            aws_analysis = await self._execute_aws_analysis(project_data)
-            if aws_analysis:
-                analysis_results['system_analysis']['aws'] = aws_analysis
-                analysis_results['mcp_services_used'].append('aws_analysis')
-                logger.info("✅ Análisis AWS completado")
-            
-            # 3. ANÁLISIS DE DOCUMENTACIÓN - Buscar mejores prácticas
-            logger.info("📚 Ejecutando análisis de documentación...")
-            docs_analysis = await self._execute_documentation_analysis(project_data)
-            if docs_analysis:
-                analysis_results['system_analysis']['documentation'] = docs_analysis
-                analysis_results['mcp_services_used'].append('documentation_analysis')
-                logger.info("✅ Análisis de documentación completado")
-            
-            # 4. ANÁLISIS DE COSTOS - Calcular dimensionamiento
-            logger.info("💰 Ejecutando análisis de costos...")
-            cost_analysis = await self._execute_cost_analysis(project_data)
-            if cost_analysis:
-                analysis_results['system_analysis']['costs'] = cost_analysis
-                analysis_results['mcp_services_used'].append('cost_analysis')
-                logger.info("✅ Análisis de costos completado")
-            
-            # 5. GENERACIÓN DE DIAGRAMAS - Visualizar arquitectura
-            logger.info("🎨 Generando diagramas de arquitectura...")
-            diagram_analysis = await self._execute_diagram_generation(project_data)
-            if diagram_analysis:
-                analysis_results['system_analysis']['diagrams'] = diagram_analysis
-                analysis_results['mcp_services_used'].append('diagram_generation')
-                logger.info("✅ Diagramas generados")
+            # 1-5. Etapas de análisis: ninguna lee la salida de otra, así que en
+            # modo concurrente el costo es la etapa más lenta y no la suma
+            stage_results = await self._run_analysis_stages(project_data, messages)
+            
+            # Ensamblar resultados parciales en el orden original de etapas
+            for stage_key, service_name, _ in ANALYSIS_STAGES:
+                stage_result, timing = stage_results[stage_key]
+                analysis_results['stage_timings'][stage_key] = timing
+                if stage_result:
+                    analysis_results['system_analysis'][stage_key] = stage_result
+                    analysis_results['mcp_services_used'].append(service_name)
             
             # 6. SÍNTESIS INTELIGENTE - Generar respuesta final
             final_response = self._synthesize_intelligent_response(analysis_results, messages)
@@ -92,6 +91,56 @@ class IntelligentMCPCaller:
                 'final_response': f"Error ejecutando análisis inteligente: {str(e)}"
             }
     
+    async def _run_analysis_stages(self, project_data: Dict, messages: List[Dict]) -> Dict[str, Tuple[Any, Dict]]:
+        """
+        Ejecuta las etapas de análisis según execution_mode
+        Retorna {etapa: (resultado, timing)}; una etapa fallida o vencida no bloquea a las demás
+        """
+        stage_calls = {
+            'core': lambda: self._execute_core_analysis(project_data, messages),
+            'aws': lambda: self._execute_aws_analysis(project_data),
+            'documentation': lambda: self._execute_documentation_analysis(project_data),
+            'costs': lambda: self._execute_cost_analysis(project_data),
+            'diagrams': lambda: self._execute_diagram_generation(project_data)
+        }
+        
+        if self.execution_mode == 'sequential':
+            results = []
+            for stage_key, _, log_message in ANALYSIS_STAGES:
+                logger.info(log_message)
+                results.append(await self._run_stage(stage_key, stage_calls[stage_key]))
+        else:
+            logger.info(f"⚡ Ejecutando {len(ANALYSIS_STAGES)} etapas de análisis en paralelo")
+            results = await asyncio.gather(*[
+                self._run_stage(stage_key, stage_calls[stage_key])
+                for stage_key, _, _ in ANALYSIS_STAGES
+            ])
+        
+        return {stage_key: result for (stage_key, _, _), result in zip(ANALYSIS_STAGES, results)}
+    
+    async def _run_stage(self, stage_key: str, stage_call) -> Tuple[Any, Dict]:
+        """Ejecuta una etapa con su deadline y mide su latencia"""
+        timeout = self.stage_timeouts.get(stage_key)
+        started = time.perf_counter()
+        result = None
+        
+        try:
+            result = await asyncio.wait_for(stage_call(), timeout=timeout)
+            status = 'completed' if result else 'empty'
+            logger.info(f"✅ Etapa {stage_key} completada")
+        except asyncio.TimeoutError:
+            status = 'timeout'
+            logger.warning(f"⏱️ Etapa {stage_key} excedió su deadline de {timeout}s")
+        except Exception as e:
+            status = 'error'
+            logger.error(f"❌ Error en etapa {stage_key}: {str(e)}")
+        
+        return result, {
+            'status': status,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'timeout_s': timeout
+        }
+    
     async def _execute_core_analysis(self, project_data: Dict, messages: List[Dict]) -> Dict:
         """Ejecuta análisis usando MCP Core"""
         try:
@@ -290,6 +339,8 @@ He ejecutado un análisis profundo usando {services_used} servicios MCP especial
 ¿Te gustaría que profundice en algún aspecto específico o necesitas ayuda implementando alguna recomendación?"""
 
         return response
+    
+    async def generate_intelligent_questions(self, project_data: Dict[str, Any], messages: List[Dict]) -> str:
         """
         Genera preguntas inteligentes específicas basadas en los servicios AWS mencionados
         Usa MCP Core para obtener contexto y mejores prácticas
@@ -389,7 +440,8 @@ He ejecutado un análisis profundo usando {services_used} servicios MCP especial
 {chr(10).join(questions)}
 
 Como arquitecto AWS, estas preguntas me ayudan a diseñar la solución más eficiente y siguiendo las mejores prácticas."""
-
+    
+    async def orchestrate_intelligent_generation(self, project_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Orquesta la generación inteligente de documentos usando MCPs
         Simula el comportamiento de Amazon Q Developer CLI
@@ -684,16 +736,17 @@ with Diagram("{project_name}", show=False, filename="{project_name}_architecture
                 logger.warning(f"⚠️ Endpoint MCP no encontrado para: {service}")
                 return {}
             
+            # Sesión compartida: reutiliza conexiones keep-alive entre llamadas e invocaciones
+            session = await get_session()
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(endpoint, json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        logger.info(f"✅ MCP {service} respondió exitosamente")
-                        return result
-                    else:
-                        logger.warning(f"⚠️ MCP {service} respondió con status {response.status}")
-                        return {}
+            async with session.post(endpoint, json=payload, timeout=timeout) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    logger.info(f"✅ MCP {service} respondió exitosamente")
+                    return result
+                else:
+                    logger.warning(f"⚠️ MCP {service} respondió con status {response.status}")
+                    return {}
                         
         except Exception as e:
             logger.error(f"❌ Error llamando MCP {service}: {str(e)}")
@@ -0,0 +1,172 @@
+"""
+Ejecutor de grafos de dependencias para llamadas MCP
+Cada nodo declara sus entradas (p. ej. 'core.services_detected') y se lanza apenas se resuelven
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger()
+
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get('MCP_DAG_MAX_CONCURRENCY', '4'))
+
+# Estados terminales que impiden ejecutar nodos dependientes
+FAILED_STATUSES = ('failed', 'timeout', 'cancelled')
+
+
+class MCPNode:
+    """Nodo del grafo: una llamada MCP con sus entradas declaradas"""
+
+    def __init__(self, name: str, call: Callable[..., Awaitable[Any]],
+                 inputs: Optional[Dict[str, str]] = None, after: Optional[Iterable[str]] = None,
+                 timeout: Optional[float] = None):
+        """
+        inputs: {argumento: referencia}, donde la referencia es 'nodo' o 'nodo.campo.subcampo'
+        after: nodos que deben terminar antes aunque no se use su resultado
+        """
+        self.name = name
+        self.call = call
+        self.inputs = inputs or {}
+        self.after = list(after or [])
+        self.timeout = timeout
+
+    @property
+    def dependencies(self) -> Set[str]:
+        deps = set(self.after)
+        for reference in self.inputs.values():
+            deps.add(reference.split('.', 1)[0])
+        return deps
+
+
+class MCPDagExecutor:
+    """Scheduler de nodos MCP con concurrencia acotada, timeouts por nodo y traza de ejecución"""
+
+    def __init__(self, nodes: List[MCPNode], max_concurrency: Optional[int] = None,
+                 default_timeout: Optional[float] = None):
+        self.nodes = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Nodo MCP duplicado: {node.name}")
+            self.nodes[node.name] = node
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        self.default_timeout = default_timeout
+
+    def _validate(self, seeds: Dict[str, Any]) -> None:
+        """Verifica que toda dependencia exista y que el grafo no tenga ciclos"""
+        for node in self.nodes.values():
+            missing = [dep for dep in node.dependencies if dep not in self.nodes and dep not in seeds]
+            if missing:
+                raise ValueError(f"Nodo {node.name} depende de entradas desconocidas: {missing}")
+
+        # Kahn: si no se pueden ordenar todos los nodos hay un ciclo
+        remaining = {name: {dep for dep in node.dependencies if dep in self.nodes}
+                     for name, node in self.nodes.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Ciclo detectado entre nodos MCP: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    @staticmethod
+    def _resolve(reference: str, values: Dict[str, Any]) -> Any:
+        """Resuelve 'nodo.campo.subcampo' contra los resultados disponibles"""
+        root, *path = reference.split('.')
+        value = values.get(root)
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    async def _run_node(self, node: MCPNode, kwargs: Dict[str, Any], semaphore: asyncio.Semaphore,
+                        run_started: float, trace: Dict[str, Any]) -> Any:
+        async with semaphore:
+            timeout = node.timeout if node.timeout is not None else self.default_timeout
+            trace['start_ms'] = round((time.perf_counter() - run_started) * 1000, 2)
+            logger.info(f"▶️ Nodo MCP {node.name} iniciado")
+            try:
+                return await asyncio.wait_for(node.call(**kwargs), timeout=timeout)
+            finally:
+                trace['end_ms'] = round((time.perf_counter() - run_started) * 1000, 2)
+                trace['duration_ms'] = round(trace['end_ms'] - trace['start_ms'], 2)
+
+    async def run(self, seeds: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ejecuta el grafo completo
+        seeds: valores iniciales referenciables como entradas (p. ej. {'context': {...}})
+        Retorna resultados, estado y error por nodo, y la traza de inicio/fin de cada uno
+        """
+        seeds = dict(seeds or {})
+        self._validate(seeds)
+
+        values = dict(seeds)
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        status = {name: 'pending' for name in self.nodes}
+        traces = {name: {'node': name} for name in self.nodes}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        running: Dict[asyncio.Task, str] = {}
+        run_started = time.perf_counter()
+
+        try:
+            while True:
+                for name, node in self.nodes.items():
+                    if status[name] != 'pending':
+                        continue
+
+                    node_deps = [dep for dep in node.dependencies if dep in self.nodes]
+                    failed_deps = [dep for dep in node_deps if status[dep] in FAILED_STATUSES]
+                    if failed_deps:
+                        # Cancelar aguas abajo: nunca se lanzará con entradas incompletas
+                        status[name] = 'cancelled'
+                        errors[name] = f"Dependencias fallidas: {failed_deps}"
+                        logger.warning(f"⏭️ Nodo MCP {name} cancelado por {failed_deps}")
+                        continue
+
+                    if all(status[dep] == 'completed' for dep in node_deps):
+                        kwargs = {arg: self._resolve(ref, values) for arg, ref in node.inputs.items()}
+                        status[name] = 'running'
+                        task = asyncio.ensure_future(
+                            self._run_node(node, kwargs, semaphore, run_started, traces[name])
+                        )
+                        running[task] = name
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        results[name] = values[name] = task.result()
+                        status[name] = 'completed'
+                        logger.info(f"✅ Nodo MCP {name} completado")
+                    except asyncio.TimeoutError:
+                        status[name] = 'timeout'
+                        errors[name] = 'Timeout'
+                        logger.warning(f"⏱️ Nodo MCP {name} excedió su timeout")
+                    except Exception as e:
+                        status[name] = 'failed'
+                        errors[name] = str(e)
+                        logger.error(f"❌ Nodo MCP {name} falló: {str(e)}")
+        finally:
+            # Si el run se cancela desde afuera, no dejar tareas huérfanas
+            for task in running:
+                task.cancel()
+
+        for name, trace in traces.items():
+            trace['status'] = status[name]
+
+        return {
+            'success': all(state == 'completed' for state in status.values()),
+            'results': results,
+            'status': status,
+            'errors': errors,
+            'trace': sorted(traces.values(), key=lambda trace: trace.get('start_ms', float('inf'))),
+            'total_ms': round((time.perf_counter() - run_started) * 1000, 2)
+        }
@@ -0,0 +1,86 @@
+"""
+Pool HTTP compartido para llamadas a MCP servers
+Mantiene una única aiohttp.ClientSession por event loop que sobrevive entre invocaciones warm de la Lambda
+"""
+import asyncio
+import atexit
+import logging
+import os
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger()
+
+# Configuración del pool (sobrescribible por variables de entorno)
+MCP_POOL_LIMIT = int(os.environ.get('MCP_POOL_LIMIT', '32'))
+MCP_POOL_LIMIT_PER_HOST = int(os.environ.get('MCP_POOL_LIMIT_PER_HOST', '10'))
+MCP_POOL_KEEPALIVE_SECONDS = float(os.environ.get('MCP_POOL_KEEPALIVE_SECONDS', '60'))
+MCP_POOL_DNS_TTL_SECONDS = int(os.environ.get('MCP_POOL_DNS_TTL_SECONDS', '300'))
+MCP_DEFAULT_TIMEOUT_SECONDS = float(os.environ.get('MCP_DEFAULT_TIMEOUT_SECONDS', '10'))
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _build_session() -> aiohttp.ClientSession:
+    """Crea la sesión con keep-alive, límites por host y cache DNS"""
+    connector = aiohttp.TCPConnector(
+        limit=MCP_POOL_LIMIT,
+        limit_per_host=MCP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=MCP_POOL_KEEPALIVE_SECONDS,
+        use_dns_cache=True,
+        ttl_dns_cache=MCP_POOL_DNS_TTL_SECONDS,
+        enable_cleanup_closed=True
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=MCP_DEFAULT_TIMEOUT_SECONDS)
+    )
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """
+    Retorna la sesión compartida del event loop actual
+    Se recrea solo si se cerró o si el handler cambió de event loop
+    """
+    global _session, _session_loop
+
+    loop = asyncio.get_running_loop()
+    if _session is not None and not _session.closed and _session_loop is loop:
+        return _session
+
+    if _session is not None and not _session.closed:
+        # La sesión pertenece a otro loop: no se puede cerrar desde aquí
+        logger.warning("⚠️ Event loop cambió, descartando pool HTTP anterior")
+
+    _session = _build_session()
+    _session_loop = loop
+    logger.info(f"🔌 Pool HTTP MCP creado (limit={MCP_POOL_LIMIT}, per_host={MCP_POOL_LIMIT_PER_HOST})")
+    return _session
+
+
+async def close_session() -> None:
+    """Cierra la sesión compartida y libera las conexiones abiertas"""
+    global _session, _session_loop
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("🔌 Pool HTTP MCP cerrado")
+    _session = None
+    _session_loop = None
+
+
+def _close_on_exit() -> None:
+    """Teardown al apagar el contenedor, si el loop dueño de la sesión sigue disponible"""
+    if _session is None or _session.closed or _session_loop is None:
+        return
+    if _session_loop.is_closed() or _session_loop.is_running():
+        return
+    try:
+        _session_loop.run_until_complete(close_session())
+    except Exception as e:
+        logger.error(f"❌ Error cerrando pool HTTP MCP: {str(e)}")
+
+
+atexit.register(_close_on_exit)
@@ -0,0 +1,177 @@
+"""
+Persistencia write-behind de proyectos para la Lambda arquitecto
+El handler genera el projectId, encola {projectId, userId, projectData, analysisResults} y responde;
+un consumidor SQS hace las escrituras en DynamoDB/S3 con reintentos y dead-letter queue.
+Con PERSISTENCE_QUEUE_URL=file:///ruta se usa una cola local en disco (desarrollo/pruebas).
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from aws_clients import get_client
+
+logger = logging.getLogger()
+
+# Configuración (sobrescribible por variables de entorno)
+PERSISTENCE_QUEUE_URL = os.environ.get('PERSISTENCE_QUEUE_URL', '')
+PERSISTENCE_MAX_ATTEMPTS = int(os.environ.get('PERSISTENCE_MAX_ATTEMPTS', '5'))
+# Límite de SQS (256 KB) con margen para los atributos del mensaje
+PERSISTENCE_MAX_MESSAGE_BYTES = int(os.environ.get('PERSISTENCE_MAX_MESSAGE_BYTES', str(240 * 1024)))
+
+MESSAGE_TYPE = 'save_project'
+
+
+def new_project_id() -> str:
+    """projectId único generado antes de persistir (clave primaria de la tabla)"""
+    return f"proj_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
+
+
+def build_message(project_id: str, project_data: Dict[str, Any], analysis_results: Dict[str, Any],
+                  user_id: Optional[str] = None) -> str:
+    """Cuerpo del mensaje; created_at se fija al encolar, no al consumir"""
+    return json.dumps({
+        'type': MESSAGE_TYPE,
+        'projectId': project_id,
+        'userId': user_id,
+        'createdAt': datetime.now().isoformat(),
+        'projectData': project_data,
+        'analysisResults': analysis_results
+    }, default=str, separators=(',', ':'))
+
+
+class SQSPersistenceQueue:
+    """Productor sobre SQS; los reintentos y la DLQ los maneja la redrive policy de la cola"""
+
+    def __init__(self, queue_url: str):
+        self.queue_url = queue_url
+
+    def send(self, body: str) -> str:
+        response = get_client('sqs').send_message(QueueUrl=self.queue_url, MessageBody=body)
+        return response['MessageId']
+
+
+class LocalPersistenceQueue:
+    """
+    Cola en disco con la misma semántica: un archivo por mensaje en pending/,
+    reintento con contador de intentos y traslado a dead-letter/ al agotarlos
+    """
+
+    def __init__(self, directory: str, max_attempts: int = PERSISTENCE_MAX_ATTEMPTS):
+        self.directory = directory
+        self.max_attempts = max_attempts
+        self.pending_dir = os.path.join(directory, 'pending')
+        self.dead_letter_dir = os.path.join(directory, 'dead-letter')
+        os.makedirs(self.pending_dir, exist_ok=True)
+        os.makedirs(self.dead_letter_dir, exist_ok=True)
+
+    def send(self, body: str) -> str:
+        message_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        envelope = {'messageId': message_id, 'attempts': 0, 'body': body}
+        path = os.path.join(self.pending_dir, f"{message_id}.json")
+        # Escritura atómica: el consumidor nunca ve un archivo a medias
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(envelope, f)
+        os.replace(f"{path}.tmp", path)
+        return message_id
+
+    def _pending_paths(self) -> List[str]:
+        return sorted(
+            os.path.join(self.pending_dir, name)
+            for name in os.listdir(self.pending_dir) if name.endswith('.json')
+        )
+
+    def drain(self, processor: Callable[[Dict[str, Any]], None]) -> Dict[str, int]:
+        """
+        Procesa los mensajes pendientes una vez
+        Un fallo incrementa attempts; al llegar a max_attempts el mensaje pasa a dead-letter/
+        """
+        report = {'processed': 0, 'retried': 0, 'dead_lettered': 0}
+        for path in self._pending_paths():
+            with open(path, encoding='utf-8') as f:
+                envelope = json.load(f)
+            try:
+                processor(json.loads(envelope['body']))
+                os.remove(path)
+                report['processed'] += 1
+            except Exception as e:
+                envelope['attempts'] += 1
+                envelope['lastError'] = str(e)
+                if envelope['attempts'] >= self.max_attempts:
+                    os.remove(path)
+                    path = os.path.join(self.dead_letter_dir, os.path.basename(path))
+                    report['dead_lettered'] += 1
+                    logger.error(f"☠️ Mensaje {envelope['messageId']} a dead-letter tras {envelope['attempts']} intentos: {str(e)}")
+                else:
+                    report['retried'] += 1
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(envelope, f)
+        return report
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        messages = []
+        for name in sorted(os.listdir(self.dead_letter_dir)):
+            with open(os.path.join(self.dead_letter_dir, name), encoding='utf-8') as f:
+                messages.append(json.load(f))
+        return messages
+
+
+_queue = None
+
+
+def get_persistence_queue():
+    """Cola configurada (SQS o local) o None si la persistencia es síncrona"""
+    global _queue
+    if _queue is None and PERSISTENCE_QUEUE_URL:
+        if PERSISTENCE_QUEUE_URL.startswith('file://'):
+            _queue = LocalPersistenceQueue(PERSISTENCE_QUEUE_URL[len('file://'):])
+        else:
+            _queue = SQSPersistenceQueue(PERSISTENCE_QUEUE_URL)
+    return _queue
+
+
+def enqueue_project(project_id: str, project_data: Dict[str, Any],
+                    analysis_results: Dict[str, Any], user_id: Optional[str] = None) -> Optional[str]:
+    """
+    Encola la persistencia del proyecto y retorna el MessageId
+    Retorna None si no hay cola, el mensaje excede el límite o el envío falló:
+    en ese caso el llamador debe persistir de forma síncrona
+    """
+    queue = get_persistence_queue()
+    if queue is None:
+        return None
+
+    body = build_message(project_id, project_data, analysis_results, user_id)
+    if len(body.encode('utf-8')) > PERSISTENCE_MAX_MESSAGE_BYTES:
+        logger.info(f"📦 Mensaje de {project_id} excede {PERSISTENCE_MAX_MESSAGE_BYTES} bytes, persistencia síncrona")
+        return None
+
+    try:
+        message_id = queue.send(body)
+        logger.info(f"📨 Persistencia de {project_id} encolada ({message_id})")
+        return message_id
+    except Exception as e:
+        logger.error(f"❌ Error encolando persistencia de {project_id}: {str(e)}")
+        return None
+
+
+def process_sqs_records(records: List[Dict[str, Any]],
+                        processor: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    """
+    Procesa un batch de SQS y retorna los fallos parciales (ReportBatchItemFailures)
+    Solo los mensajes fallidos vuelven a la cola; tras maxReceiveCount van a la DLQ
+    """
+    failures = []
+    for record in records:
+        try:
+            processor(json.loads(record['body']))
+        except Exception as e:
+            receive_count = record.get('attributes', {}).get('ApproximateReceiveCount', '?')
+            logger.error(f"❌ Error persistiendo mensaje {record.get('messageId')} (intento {receive_count}): {str(e)}")
+            failures.append({'itemIdentifier': record['messageId']})
+
+    logger.info(f"💾 Batch de persistencia: {len(records) - len(failures)} ok, {len(failures)} fallidos")
+    return {'batchItemFailures': failures}
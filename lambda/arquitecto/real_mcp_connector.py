@@ -5,17 +5,18 @@ Real MCP Connector - Connects to actual MCP services running in ECS
 import json
 import logging
 import requests
-import boto3
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+from aws_clients import get_client
+
 logger = logging.getLogger(__name__)
 
 class RealMCPConnector:
     """Connector for real MCP services running in ECS"""
     
     def __init__(self):
-        self.elbv2_client = boto3.client('elbv2')
+        self.elbv2_client = get_client('elbv2')
         self.session = requests.Session()
         self.session.timeout = 30
         
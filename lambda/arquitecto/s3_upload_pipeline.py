@@ -0,0 +1,147 @@
+"""
+Pipeline compartido de subida de documentos a S3 para la Lambda arquitecto
+Sube en paralelo sobre un thread pool acotado, detecta el Content-Type, comprime con gzip
+los artefactos de texto y usa multipart para binarios grandes
+"""
+import gzip
+import io
+import logging
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Union
+
+from boto3.s3.transfer import TransferConfig
+
+logger = logging.getLogger()
+
+# Configuración del pipeline (sobrescribible por variables de entorno)
+UPLOAD_MAX_WORKERS = int(os.environ.get('UPLOAD_MAX_WORKERS', '8'))
+UPLOAD_GZIP_MIN_BYTES = int(os.environ.get('UPLOAD_GZIP_MIN_BYTES', '1024'))
+UPLOAD_MULTIPART_THRESHOLD = int(os.environ.get('UPLOAD_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+UPLOAD_MULTIPART_CHUNK_SIZE = int(os.environ.get('UPLOAD_MULTIPART_CHUNK_SIZE', str(8 * 1024 * 1024)))
+
+# Extensiones que mimetypes no conoce o resuelve distinto según la imagen base
+CONTENT_TYPES = {
+    '.md': 'text/markdown; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8',
+    '.csv': 'text/csv; charset=utf-8',
+    '.json': 'application/json',
+    '.yaml': 'application/x-yaml',
+    '.yml': 'application/x-yaml',
+    '.svg': 'image/svg+xml',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.pdf': 'application/pdf',
+    '.png': 'image/png'
+}
+
+# Firmas de archivos binarios para cuando la extensión no alcanza
+MAGIC_NUMBERS = (
+    (b'\x89PNG', 'image/png'),
+    (b'%PDF', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\xff\xd8\xff', 'image/jpeg')
+)
+
+# Content-Types que se guardan con Content-Encoding: gzip
+COMPRESSIBLE_PREFIXES = ('text/', 'application/json', 'application/x-yaml', 'application/xml', 'image/svg+xml')
+
+Document = Union[str, bytes]
+
+
+def detect_content_type(name: str, content: Document) -> str:
+    """Content-Type por extensión, luego por firma del contenido"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension in CONTENT_TYPES:
+        return CONTENT_TYPES[extension]
+
+    guessed, _ = mimetypes.guess_type(name)
+    if guessed:
+        return guessed
+
+    if isinstance(content, bytes):
+        for signature, content_type in MAGIC_NUMBERS:
+            if content.startswith(signature):
+                return content_type
+        return 'application/octet-stream'
+    return 'text/plain; charset=utf-8'
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_PREFIXES)
+
+
+def _upload_one(s3_client, bucket: str, key: str, name: str, content: Document,
+                transfer_config: TransferConfig) -> Dict[str, Any]:
+    """Sube un documento y retorna su métrica (tamaño original/almacenado, método y duración)"""
+    started = time.perf_counter()
+    body = content.encode('utf-8') if isinstance(content, str) else content
+    content_type = detect_content_type(name, content)
+    extra_args = {'ContentType': content_type}
+
+    result = {
+        'name': name,
+        'key': key,
+        'content_type': content_type,
+        'size_bytes': len(body)
+    }
+
+    try:
+        if is_compressible(content_type) and len(body) >= UPLOAD_GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=6)
+            extra_args['ContentEncoding'] = 'gzip'
+            result['content_encoding'] = 'gzip'
+
+        if len(body) >= UPLOAD_MULTIPART_THRESHOLD:
+            s3_client.upload_fileobj(io.BytesIO(body), bucket, key, ExtraArgs=extra_args, Config=transfer_config)
+            result['method'] = 'multipart'
+        else:
+            s3_client.put_object(Bucket=bucket, Key=key, Body=body, **extra_args)
+            result['method'] = 'put'
+
+        result['stored_bytes'] = len(body)
+        result['success'] = True
+    except Exception as e:
+        logger.error(f"❌ Error subiendo {key}: {str(e)}")
+        result['success'] = False
+        result['error'] = str(e)
+
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def upload_documents(s3_client, bucket: str, folder: str, documents: Dict[str, Document],
+                     max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Sube {nombre: contenido} bajo folder/ en paralelo
+    Retorna {'success', 'folder', 'files': [métrica por archivo], 'total_bytes', 'stored_bytes', 'total_ms'}
+    """
+    started = time.perf_counter()
+    workers = max(1, min(max_workers or UPLOAD_MAX_WORKERS, len(documents) or 1))
+    transfer_config = TransferConfig(
+        multipart_threshold=UPLOAD_MULTIPART_THRESHOLD,
+        multipart_chunksize=UPLOAD_MULTIPART_CHUNK_SIZE,
+        max_concurrency=4
+    )
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_upload_one, s3_client, bucket, f"{folder}/{name}", name, content, transfer_config)
+            for name, content in documents.items()
+        ]
+        files = [future.result() for future in futures]
+
+    report = {
+        'success': all(file['success'] for file in files),
+        'folder': folder,
+        'files': files,
+        'total_bytes': sum(file['size_bytes'] for file in files),
+        'stored_bytes': sum(file.get('stored_bytes', 0) for file in files),
+        'total_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+    logger.info(f"📤 {len(files)} documentos subidos a s3://{bucket}/{folder} en {report['total_ms']}ms "
+                f"({report['total_bytes']} → {report['stored_bytes']} bytes)")
+    return report
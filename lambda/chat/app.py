@@ -7,8 +7,14 @@ import json
 import boto3
 import os
 import logging
+import itertools
+import time
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from context_window import ContextWindow, bedrock_summarizer
+from model_router import RoutingMetrics, STRONG, FAST, route
+from response_cache import RESPONSE_CACHE_ENABLED, ResponseCache, bedrock_embedder
+from session_store import ChatSessionStore, SessionNotFound
 
 # Configure logging
 logger = logging.getLogger()
@@ -16,6 +22,38 @@ logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
 bedrock_runtime = boto3.client('bedrock-runtime', region_name=os.environ.get('REGION', 'us-east-1'))
+dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('REGION', 'us-east-1'))
+
+# Server-side transcripts in ChatSessionsTable
+session_store = ChatSessionStore(dynamodb)
+
+INFERENCE_CONFIG = {
+    'maxTokens': 4000,
+    'temperature': 0.7,
+    'topP': 0.9
+}
+
+AWS_ONLY_INSTRUCTION = "INSTRUCCIÓN: Eres un consultor experto SOLO en AWS. Si preguntan sobre Azure, GCP, deportes, noticias o temas no-AWS, responde: 'Soy especialista en AWS únicamente. ¿En qué servicio de AWS puedo ayudarte?' \n\n"
+
+# Context window: 'extractive' (no model call) or 'bedrock' (rolling summary by a fast model)
+CONTEXT_SUMMARIZER = os.environ.get('CONTEXT_SUMMARIZER', 'extractive')
+CONTEXT_SUMMARY_MODEL_ID = os.environ.get('CONTEXT_SUMMARY_MODEL_ID', 'amazon.nova-lite-v1:0')
+
+context_window = ContextWindow(
+    summarizer=bedrock_summarizer(bedrock_runtime, CONTEXT_SUMMARY_MODEL_ID) if CONTEXT_SUMMARIZER == 'bedrock' else None
+)
+
+# Opt-in response cache: RESPONSE_CACHE_ENABLED or {'cache': true} per request; 'local' or 'bedrock' embeddings
+RESPONSE_CACHE_EMBEDDER = os.environ.get('RESPONSE_CACHE_EMBEDDER', 'local')
+
+response_cache = ResponseCache(
+    embedder=bedrock_embedder(bedrock_runtime) if RESPONSE_CACHE_EMBEDDER == 'bedrock' else None
+)
+
+NO_USAGE = {'inputTokens': 0, 'outputTokens': 0, 'totalTokens': 0}
+
+# Per-route latency/cost (EMF metrics in CloudWatch)
+routing_metrics = RoutingMetrics()
 
 def get_cors_headers():
     """Get standard CORS headers for all responses"""
@@ -59,15 +97,27 @@ def create_success_response(data):
     """Create a success response with CORS headers"""
     return create_response(200, data)
 
-def prepare_conversation(messages: List[Dict]) -> List[Dict]:
-    """Prepare conversation for Bedrock - AWS Expert Only"""
+def prepare_conversation(messages: List[Dict], summary_state: Optional[Dict] = None) -> Tuple[List[Dict], Dict]:
+    """
+    Prepare conversation for Bedrock - AWS Expert Only
+    The history is fitted to the context window token budget: the AWS-only prefix and the most
+    recent turns go verbatim, older turns are folded into a rolling summary.
+    Returns (conversation, context) where context has the token stats and the summaryState
+    to send back with the next turn.
+    """
     conversation = []
     
+    window = context_window.fit(messages, prefix=AWS_ONLY_INSTRUCTION, summary_state=summary_state)
+    messages = window['messages']
+    
     # Add AWS-only instruction at the beginning
     if messages:
-        # Modify the first user message to include AWS-only instruction
+        # Modify the first user message to include AWS-only instruction (and the folded history)
         first_message = messages[0]
-        aws_prefix = "INSTRUCCIÓN: Eres un consultor experto SOLO en AWS. Si preguntan sobre Azure, GCP, deportes, noticias o temas no-AWS, responde: 'Soy especialista en AWS únicamente. ¿En qué servicio de AWS puedo ayudarte?' \n\nPREGUNTA DEL USUARIO: "
+        aws_prefix = AWS_ONLY_INSTRUCTION
+        if window['summary']:
+            aws_prefix += f"RESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{window['summary']}\n\n"
+        aws_prefix += "PREGUNTA DEL USUARIO: "
         
         modified_content = aws_prefix + first_message.get("content", "")
         
@@ -84,7 +134,84 @@ def prepare_conversation(messages: List[Dict]) -> List[Dict]:
                 "content": [{"text": content}]
             })
     
-    return conversation
+    return conversation, {'stats': window['stats'], 'summaryState': window['summaryState']}
+
+def load_turn(body: Dict) -> Dict:
+    """
+    Resolve the messages for this turn
+    Session mode ({'message', 'sessionId'?}): the stored transcript from the first message the
+    rolling summary does not cover, plus the new message. A missing sessionId starts a session.
+    Legacy mode ({'messages', 'contextSummary'?}): the client sends the whole history.
+    Raises SessionNotFound for an unknown sessionId.
+    """
+    if 'message' not in body:
+        return {
+            'sessionId': None,
+            'messages': body.get('messages', []),
+            'summaryState': body.get('contextSummary')
+        }
+
+    new_message = {'role': 'user', 'content': body.get('message') or ''}
+    session_id = body.get('sessionId')
+    if not session_id:
+        return {
+            'sessionId': ChatSessionStore.new_session_id(),
+            'isNew': True,
+            'messages': [new_message],
+            'newMessage': new_message,
+            'baseIndex': 0,
+            'indexes': [],
+            'summaryState': None
+        }
+
+    loaded = session_store.load(session_id)
+    summary = loaded['session'].get('contextSummary')
+    return {
+        'sessionId': session_id,
+        'isNew': False,
+        'messages': loaded['messages'] + [new_message],
+        'newMessage': new_message,
+        'baseIndex': loaded['baseIndex'],
+        'indexes': loaded['indexes'],
+        # The stored summary covers everything before baseIndex
+        'summaryState': {'text': summary, 'coveredMessages': 0} if summary else None
+    }
+
+def covered_index(turn: Dict, covered: int) -> int:
+    """Absolute transcript index after the first `covered` messages of turn['messages']"""
+    indexes = turn.get('indexes') or []
+    if covered <= len(indexes):
+        return indexes[covered - 1] + 1 if covered else turn['baseIndex']
+    # Messages past the loaded ones (the new turn) are not stored yet and follow contiguously
+    return (indexes[-1] + 1 if indexes else turn['baseIndex']) + covered - len(indexes)
+
+def save_turn(turn: Dict, assistant_text: str, context_info: Dict, user_id: Optional[str] = None) -> Optional[int]:
+    """
+    Append the user message and the answer to the session; returns the new message count
+    A failed transcript write is logged and returns None: the answer was already generated
+    """
+    if not turn.get('sessionId'):
+        return None
+
+    attributes = {}
+    if turn['isNew']:
+        attributes['title'] = turn['newMessage']['content'][:80]
+    summary_state = context_info.get('summaryState')
+    if summary_state and summary_state.get('coveredMessages'):
+        # The summary advanced: it now covers the stored turns up to the first uncovered message
+        attributes['contextSummary'] = summary_state['text']
+        attributes['summaryCovered'] = covered_index(turn, summary_state['coveredMessages'])
+
+    try:
+        return session_store.append(
+            turn['sessionId'],
+            [turn['newMessage'], {'role': 'assistant', 'content': assistant_text}],
+            user_id=user_id,
+            attributes=attributes
+        )
+    except Exception as e:
+        logger.error(f"Error saving turn to session {turn['sessionId']}: {str(e)}", exc_info=True)
+        return None
 
 def call_bedrock_model(model_id: str, conversation: List[Dict]) -> Dict:
     """Call Bedrock model with correct format"""
@@ -92,11 +219,7 @@ def call_bedrock_model(model_id: str, conversation: List[Dict]) -> Dict:
         response = bedrock_runtime.converse(
             modelId=model_id,
             messages=conversation,
-            inferenceConfig={
-                'maxTokens': 4000,
-                'temperature': 0.7,
-                'topP': 0.9
-            }
+            inferenceConfig=INFERENCE_CONFIG
         )
         
         return {
@@ -109,6 +232,217 @@ def call_bedrock_model(model_id: str, conversation: List[Dict]) -> Dict:
         logger.error(f"Error calling Bedrock: {str(e)}")
         return {'error': f'Error calling Bedrock: {str(e)}'}
 
+def use_response_cache(body: Dict) -> bool:
+    """The request flag wins over the RESPONSE_CACHE_ENABLED default"""
+    return body.get('cache', RESPONSE_CACHE_ENABLED) is True
+
+def cached_bedrock_call(model_id: str, conversation: List[Dict], question: str, use_cache: bool) -> Dict:
+    """
+    call_bedrock_model behind the response cache
+    A hit costs no tokens: usage is zero and cache.savedTokens has what the original call used
+    """
+    if use_cache:
+        cached = response_cache.get(model_id, conversation, INFERENCE_CONFIG, question)
+        if cached:
+            logger.info(f"Response cache {cached['cache']['tier']} hit, saved {cached['cache']['savedTokens']} tokens")
+            return {'response': cached['response'], 'usage': NO_USAGE, 'modelUsed': model_id, 'cache': cached['cache']}
+
+    result = call_bedrock_model(model_id, conversation)
+    if use_cache and 'error' not in result:
+        response_cache.put(model_id, conversation, INFERENCE_CONFIG, result['response'], result.get('usage'), question)
+        result['cache'] = {'hit': False, 'savedTokens': 0}
+    return result
+
+def stream_with_cache(model_id: str, conversation: List[Dict], question: str, use_cache: bool) -> Iterator[Dict]:
+    """stream_bedrock_model behind the response cache; a hit is a single token frame"""
+    if use_cache:
+        cached = response_cache.get(model_id, conversation, INFERENCE_CONFIG, question)
+        if cached:
+            yield {'type': 'token', 'text': cached['response']}
+            yield {'type': 'usage', 'usage': NO_USAGE, 'modelUsed': model_id, 'stopReason': 'cache',
+                   'metrics': {'timeToFirstTokenMs': 0, 'tokensPerSecond': None}, 'cache': cached['cache']}
+            return
+
+    answer = []
+    for chunk in stream_bedrock_model(model_id, conversation):
+        if chunk['type'] == 'token':
+            answer.append(chunk['text'])
+        elif use_cache:
+            response_cache.put(model_id, conversation, INFERENCE_CONFIG, ''.join(answer), chunk['usage'], question)
+            chunk['cache'] = {'hit': False, 'savedTokens': 0}
+        yield chunk
+
+def start_stream(messages: List[Dict], routing: Dict, conversation: List[Dict], question: str,
+                 use_cache: bool) -> Tuple[Dict, Iterator[Dict]]:
+    """
+    stream_with_cache started up to its first chunk
+    A fast-tier failure before the first token retries once on the strong tier, like lambda_handler
+    Returns (routing, chunks), with the first chunk put back in front of the iterator
+    """
+    chunks = stream_with_cache(routing['modelId'], conversation, question, use_cache)
+    try:
+        first = next(chunks)
+    except StopIteration:
+        return routing, iter(())
+    except Exception as e:
+        if routing['tier'] != FAST:
+            raise
+        logger.warning(f"Fast model {routing['modelId']} failed before the first token, falling back to the strong tier: {str(e)}")
+        routing = route(messages, requested_tier=STRONG)
+        routing['reason'] = 'fallback'
+        chunks = stream_with_cache(routing['modelId'], conversation, question, use_cache)
+        first = next(chunks)
+    return routing, itertools.chain([first], chunks)
+
+def stream_bedrock_model(model_id: str, conversation: List[Dict]) -> Iterator[Dict]:
+    """
+    Stream Bedrock output with converse_stream
+    Yields {'type': 'token', 'text': ...} per delta and a final {'type': 'usage', ...} with
+    time-to-first-token and tokens/sec measured from the first token to the end of the stream
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    usage = {}
+    metrics = {}
+    stop_reason = None
+
+    response = bedrock_runtime.converse_stream(
+        modelId=model_id,
+        messages=conversation,
+        inferenceConfig=INFERENCE_CONFIG
+    )
+
+    for stream_event in response['stream']:
+        if 'contentBlockDelta' in stream_event:
+            text = stream_event['contentBlockDelta'].get('delta', {}).get('text')
+            if text:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                yield {'type': 'token', 'text': text}
+        elif 'messageStop' in stream_event:
+            stop_reason = stream_event['messageStop'].get('stopReason')
+        elif 'metadata' in stream_event:
+            usage = stream_event['metadata'].get('usage', {})
+            metrics = stream_event['metadata'].get('metrics', {})
+
+    finished = time.perf_counter()
+    output_tokens = usage.get('outputTokens', 0)
+    generation_seconds = finished - (first_token_at or started)
+
+    yield {
+        'type': 'usage',
+        'usage': usage,
+        'modelUsed': model_id,
+        'stopReason': stop_reason,
+        'metrics': {
+            'timeToFirstTokenMs': round((first_token_at - started) * 1000, 2) if first_token_at else None,
+            'totalMs': round((finished - started) * 1000, 2),
+            'bedrockLatencyMs': metrics.get('latencyMs'),
+            'tokensPerSecond': round(output_tokens / generation_seconds, 2) if generation_seconds > 0 else None
+        }
+    }
+
+def sse_frame(event_name: str, data: Dict) -> bytes:
+    """Encode one Server-Sent Events frame"""
+    return f"event: {event_name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+def parse_request_body(event) -> Dict:
+    """Body as a dict (API Gateway sends a string, direct invokes may send a dict)"""
+    if isinstance(event.get('body'), str):
+        return json.loads(event['body'])
+    return event.get('body', {})
+
+def streaming_handler(event, response_stream, context):
+    """
+    Streaming chat for Function URLs with InvokeMode RESPONSE_STREAM
+    Same request as lambda_handler; the response is text/event-stream with one 'token'
+    frame per delta and a final 'usage' frame (usage, modelUsed, TTFT, tokens/sec, timestamp)
+    response_stream is any object with write(bytes) and close(); in Lambda it is the
+    ResponseStream of streaming_runtime.py, started by stream_bootstrap.sh
+    """
+    prelude_sent = False
+
+    def write_prelude(status_code, headers):
+        nonlocal prelude_sent
+        prelude = json.dumps({'statusCode': status_code, 'headers': headers}).encode('utf-8')
+        response_stream.write(prelude + b'\x00' * 8)
+        prelude_sent = True
+
+    def write_error(status_code, error_message):
+        payload = {'error': error_message, 'timestamp': datetime.now().isoformat()}
+        if prelude_sent:
+            # Headers already went out with 200: report the error as a final SSE frame
+            response_stream.write(sse_frame('error', payload))
+        else:
+            write_prelude(status_code, get_cors_headers())
+            response_stream.write(json.dumps(payload).encode('utf-8'))
+
+    try:
+        if event.get('httpMethod') == 'OPTIONS' or event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
+            write_prelude(200, get_cors_headers())
+            return
+
+        body = parse_request_body(event)
+
+        try:
+            turn = load_turn(body)
+        except SessionNotFound:
+            write_error(404, 'Session not found')
+            return
+        messages = turn['messages']
+
+        if not messages or (turn['sessionId'] and not turn['newMessage']['content']):
+            write_error(400, 'No messages provided')
+            return
+
+        routing = route(messages, body.get('modelId'), body.get('routing'))
+        model_id = routing['modelId']
+        started = time.perf_counter()
+
+        logger.info(f"Streaming {len(messages)} messages with model: {model_id}")
+
+        headers = get_cors_headers()
+        headers.update({
+            'Content-Type': 'text/event-stream; charset=utf-8',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        write_prelude(200, headers)
+
+        conversation, context_info = prepare_conversation(messages, turn['summaryState'])
+        answer = []
+        routing, chunks = start_stream(messages, routing, conversation, messages[-1].get('content', ''),
+                                       use_response_cache(body))
+        for chunk in chunks:
+            if chunk['type'] == 'token':
+                answer.append(chunk['text'])
+                response_stream.write(sse_frame('token', {'text': chunk['text']}))
+            else:
+                chunk.pop('type')
+                chunk['context'] = context_info['stats']
+                routing.update(routing_metrics.record(
+                    routing, (time.perf_counter() - started) * 1000, chunk['usage'],
+                    cached=bool(chunk.get('cache', {}).get('hit'))
+                ))
+                chunk['routing'] = routing
+                if turn['sessionId']:
+                    chunk['sessionId'] = turn['sessionId']
+                    chunk['messageCount'] = save_turn(turn, ''.join(answer), context_info, body.get('userId'))
+                else:
+                    chunk['contextSummary'] = context_info['summaryState']
+                chunk['timestamp'] = datetime.now().isoformat()
+                response_stream.write(sse_frame('usage', chunk))
+                logger.info(f"Stream finished: {chunk['metrics']}")
+
+    except Exception as e:
+        logger.error(f"Error in streaming_handler: {str(e)}", exc_info=True)
+        write_error(500, f'Error calling Bedrock: {str(e)}')
+
+    finally:
+        close = getattr(response_stream, 'end', None) or getattr(response_stream, 'close', None)
+        if close:
+            close()
+
 def lambda_handler(event, context):
     """Main Lambda handler for simple chat"""
     
@@ -121,25 +455,40 @@ def lambda_handler(event, context):
             return handle_preflight_request()
         
         # Parse request
-        if isinstance(event.get('body'), str):
-            body = json.loads(event['body'])
-        else:
-            body = event.get('body', {})
+        body = parse_request_body(event)
         
-        messages = body.get('messages', [])
-        model_id = body.get('modelId', 'amazon.nova-pro-v1:0')
+        # Session mode sends only the new message; legacy mode the whole history
+        try:
+            turn = load_turn(body)
+        except SessionNotFound:
+            return create_error_response(404, 'Session not found')
+        messages = turn['messages']
         
-        if not messages:
+        if not messages or (turn['sessionId'] and not turn['newMessage']['content']):
             logger.error("No messages provided")
             return create_error_response(400, 'No messages provided')
         
-        logger.info(f"Processing {len(messages)} messages with model: {model_id}")
+        # Fast or strong tier by turn complexity; an explicit modelId is a user override
+        routing = route(messages, body.get('modelId'), body.get('routing'))
+        model_id = routing['modelId']
+        
+        logger.info(f"Processing {len(messages)} messages with model: {model_id} (route {routing['tier']}/{routing['reason']})")
         
         # Prepare conversation for Bedrock
-        conversation = prepare_conversation(messages)
+        conversation, context_info = prepare_conversation(messages, turn['summaryState'])
+        
+        # Call Bedrock model (or answer from the response cache)
+        started = time.perf_counter()
+        question = messages[-1].get('content', '')
+        bedrock_response = cached_bedrock_call(model_id, conversation, question, use_response_cache(body))
         
-        # Call Bedrock model
-        bedrock_response = call_bedrock_model(model_id, conversation)
+        if 'error' in bedrock_response and routing['tier'] == FAST:
+            # The fast tier failed: retry once on the strong tier
+            logger.warning(f"Fast model {model_id} failed, falling back to the strong tier")
+            routing = route(messages, requested_tier=STRONG)
+            routing['reason'] = 'fallback'
+            model_id = routing['modelId']
+            bedrock_response = cached_bedrock_call(model_id, conversation, question, use_response_cache(body))
         
         if 'error' in bedrock_response:
             return create_error_response(500, bedrock_response['error'])
@@ -149,9 +498,27 @@ def lambda_handler(event, context):
             'response': bedrock_response['response'],
             'usage': bedrock_response.get('usage', {}),
             'modelUsed': bedrock_response.get('modelUsed', model_id),
+            'context': context_info['stats'],
             'timestamp': datetime.now().isoformat()
         }
         
+        routing.update(routing_metrics.record(
+            routing, (time.perf_counter() - started) * 1000, bedrock_response.get('usage', {}),
+            cached=bool(bedrock_response.get('cache', {}).get('hit'))
+        ))
+        response_data['routing'] = routing
+        
+        if bedrock_response.get('cache'):
+            response_data['cacheHit'] = bedrock_response['cache']['hit']
+            response_data['savedTokens'] = bedrock_response['cache']['savedTokens']
+            response_data['cache'] = bedrock_response['cache']
+        
+        if turn['sessionId']:
+            response_data['sessionId'] = turn['sessionId']
+            response_data['messageCount'] = save_turn(turn, bedrock_response['response'], context_info, body.get('userId'))
+        else:
+            response_data['contextSummary'] = context_info['summaryState']
+        
         logger.info("Returning successful response")
         return create_success_response(response_data)
         
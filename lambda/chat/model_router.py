@@ -0,0 +1,188 @@
+"""
+Ruteo de modelos por complejidad del turno
+Clasifica cada turno sin llamar a ningún modelo (largo, palabras clave y fase de la conversación)
+y lo envía al tier rápido o al fuerte. Registra latencia y costo estimado por ruta.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger()
+
+# Configuración (sobrescribible por variables de entorno)
+MODEL_ROUTING_ENABLED = os.environ.get('MODEL_ROUTING_ENABLED', 'true').lower() == 'true'
+MODEL_FAST_ID = os.environ.get('MODEL_FAST_ID', 'amazon.nova-lite-v1:0')
+MODEL_STRONG_ID = os.environ.get('MODEL_STRONG_ID', 'amazon.nova-pro-v1:0')
+# Un turno con más caracteres que esto nunca va al tier rápido
+ROUTING_FAST_MAX_CHARS = int(os.environ.get('ROUTING_FAST_MAX_CHARS', '160'))
+ROUTING_METRICS_NAMESPACE = os.environ.get('ROUTING_METRICS_NAMESPACE', 'AWSPropuestas/Chat')
+
+FAST = 'fast'
+STRONG = 'strong'
+
+# Precio on-demand aproximado en USD por 1K tokens (entrada, salida)
+MODEL_PRICES = {
+    'amazon.nova-micro-v1:0': (0.000035, 0.00014),
+    'amazon.nova-lite-v1:0': (0.00006, 0.00024),
+    'amazon.nova-pro-v1:0': (0.0008, 0.0032),
+    'anthropic.claude-3-haiku-20240307-v1:0': (0.00025, 0.00125),
+    'anthropic.claude-3-5-sonnet-20240620-v1:0': (0.003, 0.015)
+}
+
+# Señales de diseño/análisis: siempre tier fuerte
+STRONG_KEYWORDS = (
+    'arquitectura', 'disen', 'migra', 'cost', 'precio', 'presupuesto', 'estim', 'compar', 'diferencia',
+    'alta disponibilidad', 'multi region', 'multi-region', 'escal', 'segur', 'well-architected',
+    'cloudformation', 'terraform', 'cdk', 'iam', 'vpc', 'kubernetes', 'eks', 'ecs', 'serverless',
+    'recomiend', 'mejor opcion', 'por que', 'como implement', 'paso a paso', 'propuesta', 'optimiz',
+    'architecture', 'design', 'migrat', 'compare', 'best practice'
+)
+
+# Turnos conversacionales triviales
+FAST_KEYWORDS = (
+    'hola', 'buenas', 'buenos dias', 'buenas tardes', 'gracias', 'ok', 'okay', 'vale', 'perfecto',
+    'listo', 'entendido', 'si', 'no', 'claro', 'genial', 'excelente', 'adios', 'hello', 'hi', 'thanks'
+)
+
+
+# Las claves se buscan al inicio de palabra: 'iam' no debe coincidir con 'diamante'
+STRONG_PATTERN = re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in STRONG_KEYWORDS) + ')')
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get('content', '')
+    if isinstance(content, list):
+        return ' '.join(block.get('text', '') for block in content if isinstance(block, dict))
+    return str(content)
+
+
+def conversation_phase(messages: List[Dict[str, Any]]) -> str:
+    """
+    'opening' (primer turno), 'design' (algún turno anterior del usuario trata diseño/costos)
+    o 'followup'
+    """
+    previous_user = [_normalize(_message_text(m)) for m in messages[:-1] if m.get('role') == 'user']
+    if not previous_user:
+        return 'opening'
+    if any(STRONG_PATTERN.search(text) for text in previous_user):
+        return 'design'
+    return 'followup'
+
+
+def classify(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Tier del último turno con el motivo de la decisión"""
+    text = _normalize(_message_text(messages[-1])) if messages else ''
+    words = re.findall(r'[\w\-.]+', text)
+    phase = conversation_phase(messages)
+
+    if len(text) > ROUTING_FAST_MAX_CHARS:
+        return {'tier': STRONG, 'reason': 'length', 'phase': phase}
+    if '```' in text or STRONG_PATTERN.search(text):
+        return {'tier': STRONG, 'reason': 'keywords', 'phase': phase}
+    if words and all(word in FAST_KEYWORDS for word in words):
+        return {'tier': FAST, 'reason': 'smalltalk', 'phase': phase}
+    if phase == 'design':
+        # Una aclaración corta en medio de un diseño necesita el mismo contexto de razonamiento
+        return {'tier': STRONG, 'reason': 'phase', 'phase': phase}
+    if len(words) <= 12 and '?' not in text:
+        return {'tier': FAST, 'reason': 'short', 'phase': phase}
+    return {'tier': STRONG, 'reason': 'default', 'phase': phase}
+
+
+def route(messages: List[Dict[str, Any]], requested_model: Optional[str] = None,
+          requested_tier: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Modelo para el turno
+    - modelId explícito (distinto de 'auto'): override del usuario
+    - routing 'fast'/'strong': fuerza el tier
+    - si no, clasificación (o el tier fuerte si MODEL_ROUTING_ENABLED=false)
+    """
+    if requested_model and requested_model != 'auto':
+        return {'tier': 'override', 'reason': 'user', 'modelId': requested_model}
+    if requested_tier in (FAST, STRONG):
+        decision = {'tier': requested_tier, 'reason': 'user'}
+    elif not MODEL_ROUTING_ENABLED:
+        decision = {'tier': STRONG, 'reason': 'disabled'}
+    else:
+        decision = classify(messages)
+
+    decision['modelId'] = MODEL_FAST_ID if decision['tier'] == FAST else MODEL_STRONG_ID
+    return decision
+
+
+def estimate_cost(model_id: str, usage: Dict[str, Any]) -> Optional[float]:
+    prices = MODEL_PRICES.get(model_id)
+    if not prices:
+        return None
+    input_price, output_price = prices
+    return round(int(usage.get('inputTokens', 0)) / 1000 * input_price +
+                 int(usage.get('outputTokens', 0)) / 1000 * output_price, 8)
+
+
+class RoutingMetrics:
+    """Acumulados por ruta en el contenedor y una línea EMF por turno para CloudWatch"""
+
+    def __init__(self, namespace: str = ROUTING_METRICS_NAMESPACE):
+        self.namespace = namespace
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, decision: Dict[str, Any], latency_ms: float, usage: Dict[str, Any],
+               cached: bool = False) -> Dict[str, Any]:
+        """Registra un turno y retorna {'latencyMs', 'estimatedCostUsd'} para la respuesta"""
+        cost = 0.0 if cached else estimate_cost(decision['modelId'], usage)
+        with self._lock:
+            totals = self._routes.setdefault(decision['tier'], {
+                'requests': 0, 'latencyMsTotal': 0.0, 'estimatedCostUsd': 0.0, 'cached': 0
+            })
+            totals['requests'] += 1
+            totals['latencyMsTotal'] += latency_ms
+            totals['estimatedCostUsd'] += cost or 0.0
+            totals['cached'] += int(cached)
+
+        # Embedded Metric Format: CloudWatch extrae las métricas de esta línea de log
+        print(json.dumps({
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [['Route'], ['Route', 'ModelId']],
+                    'Metrics': [
+                        {'Name': 'Latency', 'Unit': 'Milliseconds'},
+                        {'Name': 'EstimatedCost', 'Unit': 'None'},
+                        {'Name': 'OutputTokens', 'Unit': 'Count'}
+                    ]
+                }]
+            },
+            'Route': decision['tier'],
+            'ModelId': decision['modelId'],
+            'Reason': decision.get('reason'),
+            'Latency': round(latency_ms, 2),
+            'EstimatedCost': cost or 0.0,
+            'OutputTokens': int(usage.get('outputTokens', 0)),
+            'Cached': cached
+        }))
+
+        return {'latencyMs': round(latency_ms, 2), 'estimatedCostUsd': cost}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                tier: {
+                    'requests': totals['requests'],
+                    'avgLatencyMs': round(totals['latencyMsTotal'] / totals['requests'], 2),
+                    'estimatedCostUsd': round(totals['estimatedCostUsd'], 6),
+                    'cached': totals['cached']
+                }
+                for tier, totals in self._routes.items()
+            }
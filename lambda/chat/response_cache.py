@@ -0,0 +1,269 @@
+"""
+Cache de respuestas de Bedrock para preguntas repetidas
+Dos niveles, ambos con TTL y expulsión LRU:
+- exacto: hash de (modelId, conversación normalizada, inferenceConfig)
+- semántico: similitud coseno entre embeddings de la última pregunta, solo dentro del mismo
+  alcance (modelo, config y turnos anteriores idénticos) y exigiendo los mismos tokens de entidad,
+  es decir todo lo que no es stopword: SQS no responde por SNS ni db.t3.micro por db.t3.small,
+  aunque el coseno de esas preguntas supere el umbral
+Los embeddings son locales (hashing de n-gramas, sin dependencias) o de Bedrock Titan.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger()
+
+# Configuración (sobrescribible por variables de entorno)
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '512'))
+# Con los tokens de entidad fijados por el alcance, el coseno solo compara la redacción
+RESPONSE_CACHE_SIMILARITY = float(os.environ.get('RESPONSE_CACHE_SIMILARITY', '0.85'))
+# Ruta de un archivo JSON para persistir el cache (vacío = solo en memoria)
+RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH', '')
+
+EMBEDDING_DIMENSIONS = 512
+
+# Palabras que no cambian de qué trata la pregunta (sin negaciones: 'no'/'not' sí cuentan)
+STOPWORDS = frozenset('''
+a an the of in on at to for from by per with and or is are was be do does can could would should i my me
+we our you your it its this that these those what which who how much many when where why there please
+between difference vs versus about tell explain give show
+el la los las un una unos unas de del al en para por con y o u es son esta estan ser que cual cuales
+quien como cuanto cuanta cuantos cuantas cuando donde porque hay mi mis yo tu su sus se lo le
+entre diferencia sobre dime explica explicame muestra favor puedo puedes
+cost costs price pricing costo costos precio precios cuesta cuestan instance instancia
+'''.split())
+
+Embedder = Callable[[str], List[float]]
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin acentos ni puntuación, espacios colapsados"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^\w\s.\-]', ' ', text)
+    text = re.sub(r'(?<!\w)[.\-]|[.\-](?!\w)', ' ', text)
+    return ' '.join(text.split())
+
+
+def entity_tokens(text: str) -> List[str]:
+    """
+    Tokens que no son stopwords (servicios, tipos de instancia, tamaños, regiones): deben coincidir
+    exactamente. El plural se reduce al singular para que 'instances' y 'instance' coincidan
+    """
+    tokens = set()
+    for token in normalize_text(text).split():
+        if len(token) > 3 and token.endswith('s') and not any(char.isdigit() for char in token):
+            token = token[:-1]
+        if token not in STOPWORDS:
+            tokens.add(token)
+    return sorted(tokens)
+
+
+def conversation_text(message: Dict[str, Any]) -> str:
+    content = message.get('content', '')
+    if isinstance(content, list):
+        return ' '.join(block.get('text', '') for block in content if isinstance(block, dict))
+    return str(content)
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:40]
+
+
+def local_embedding(text: str) -> List[float]:
+    """
+    Embedding local por feature hashing de palabras y trigramas de caracteres, normalizado L2
+    Suficiente para detectar reformulaciones cercanas sin modelos ni dependencias
+    """
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    words = normalize_text(text).split()
+    features = [f"w:{word}" for word in words]
+    for word in words:
+        padded = f" {word} "
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+
+    for feature in features:
+        digest = hashlib.md5(feature.encode('utf-8')).digest()
+        index = int.from_bytes(digest[:4], 'little') % EMBEDDING_DIMENSIONS
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+def bedrock_embedder(bedrock_client, model_id: str = 'amazon.titan-embed-text-v2:0') -> Embedder:
+    """Embeddings de Bedrock Titan (normalizados), con el local como respaldo"""
+    def embed(text: str) -> List[float]:
+        try:
+            response = bedrock_client.invoke_model(
+                modelId=model_id,
+                body=json.dumps({'inputText': text, 'normalize': True}),
+                contentType='application/json',
+                accept='application/json'
+            )
+            return json.loads(response['body'].read())['embedding']
+        except Exception as e:
+            logger.error(f"Error obteniendo embedding de {model_id}, usando embedding local: {str(e)}")
+            return local_embedding(text)
+
+    return embed
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    if len(a) != len(b):
+        return 0.0
+    return sum(x * y for x, y in zip(a, b))
+
+
+class ResponseCache:
+    """Cache local (en proceso, opcionalmente persistido a un archivo JSON)"""
+
+    def __init__(self, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 similarity_threshold: float = RESPONSE_CACHE_SIMILARITY,
+                 embedder: Optional[Embedder] = None,
+                 path: str = RESPONSE_CACHE_PATH):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.embedder = embedder or local_embedding
+        self.path = path
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {'exact': 0, 'semantic': 0}
+        self.misses = 0
+        self.saved_tokens = 0
+        if path:
+            self._load()
+
+    @staticmethod
+    def keys(model_id: str, conversation: List[Dict[str, Any]], inference_config: Dict[str, Any],
+             question: Optional[str] = None) -> Tuple[str, str, str]:
+        """
+        (clave exacta, alcance semántico, pregunta)
+        question es el texto del usuario sin instrucciones agregadas (por defecto, el último mensaje)
+        El alcance incluye todo menos la pregunta, que es lo que se compara por similitud
+        """
+        normalized = [[message.get('role', 'user'), normalize_text(conversation_text(message))]
+                      for message in conversation]
+        if question is None:
+            question = conversation_text(conversation[-1]) if conversation else ''
+        exact_key = _digest(model_id, normalized, inference_config)
+        # Lo que acompaña a la pregunta en el último mensaje (instrucciones, resumen) también es alcance
+        last_context = normalized[-1][1].replace(normalize_text(question), '') if normalized else ''
+        scope = _digest(model_id, normalized[:-1], last_context, inference_config, entity_tokens(question))
+        return exact_key, scope, question
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return entry['storedAt'] + self.ttl_seconds <= now
+
+    def get(self, model_id: str, conversation: List[Dict[str, Any]], inference_config: Dict[str, Any],
+            question: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Respuesta cacheada o None
+        Retorna {'response', 'usage', 'cache': {'hit', 'tier', 'similarity', 'ageSeconds', 'savedTokens'}}
+        """
+        exact_key, scope, question = self.keys(model_id, conversation, inference_config, question)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(exact_key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[exact_key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(exact_key)
+                return self._hit(entry, 'exact', 1.0, now)
+
+            candidates = [(key, candidate) for key, candidate in self._entries.items()
+                          if candidate['scope'] == scope and not self._expired(candidate, now)]
+
+        if not candidates:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        embedding = self.embedder(question)
+        best_key, best_entry, best_score = None, None, 0.0
+        for key, candidate in candidates:
+            score = cosine(embedding, candidate['embedding'])
+            if score > best_score:
+                best_key, best_entry, best_score = key, candidate, score
+
+        with self._lock:
+            if best_entry is None or best_score < self.similarity_threshold or best_key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            return self._hit(best_entry, 'semantic', best_score, now)
+
+    def _hit(self, entry: Dict[str, Any], tier: str, similarity: float, now: float) -> Dict[str, Any]:
+        saved = int(entry.get('usage', {}).get('totalTokens', 0))
+        self.hits[tier] += 1
+        self.saved_tokens += saved
+        return {
+            'response': entry['response'],
+            'usage': entry.get('usage', {}),
+            'cache': {
+                'hit': True,
+                'tier': tier,
+                'similarity': round(similarity, 4),
+                'ageSeconds': round(now - entry['storedAt'], 1),
+                'savedTokens': saved
+            }
+        }
+
+    def put(self, model_id: str, conversation: List[Dict[str, Any]], inference_config: Dict[str, Any],
+            response: str, usage: Optional[Dict[str, Any]] = None, question: Optional[str] = None) -> None:
+        exact_key, scope, question = self.keys(model_id, conversation, inference_config, question)
+        entry = {
+            'scope': scope,
+            'embedding': self.embedder(question),
+            'response': response,
+            'usage': usage or {},
+            'storedAt': time.time()
+        }
+        with self._lock:
+            self._entries[exact_key] = entry
+            self._entries.move_to_end(exact_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.path:
+            self._save()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, entry in entries.items():
+            if not self._expired(entry, now):
+                self._entries[key] = entry
+
+    def _save(self) -> None:
+        with self._lock:
+            snapshot = dict(self._entries)
+        try:
+            with open(f"{self.path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(f"{self.path}.tmp", self.path)
+        except OSError as e:
+            logger.error(f"Error guardando cache de respuestas en {self.path}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {'entries': entries, 'hits': dict(self.hits), 'misses': self.misses, 'savedTokens': self.saved_tokens}
@@ -0,0 +1,159 @@
+"""
+Sesiones de chat del lado del servidor sobre ChatSessionsTable
+El cliente envía solo el mensaje nuevo y el sessionId; el transcript se guarda append-only:
+- item cabecera {sessionId, userId, timestamp, messageCount, contextSummary, summaryCovered, ...}
+  (el único que aparece en el GSI UserIndex)
+- un item por mensaje {sessionId: '<id>#<i>', m: 'u|texto'} bajo su índice absoluto i, así ningún
+  item se acerca al límite de 400 KB de DynamoDB por más larga que sea la sesión
+Agregar un turno es un ADD atómico en la cabecera que reserva los índices, y luego un put por
+mensaje: nunca se reescribe el historial, y si un put falla o dos turnos compiten solo queda un
+hueco, sin correr los índices de los mensajes siguientes. Cargar una sesión lee solo los mensajes
+desde el primero sin resumir.
+"""
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from boto3.dynamodb.conditions import Key
+
+logger = logging.getLogger()
+
+# Configuración (sobrescribible por variables de entorno)
+CHAT_SESSIONS_TABLE = os.environ.get('CHAT_SESSIONS_TABLE', 'aws-propuestas-v3-chat-sessions-prod')
+SESSION_TTL_DAYS = int(os.environ.get('SESSION_TTL_DAYS', '30'))
+USER_INDEX = 'UserIndex'
+
+# Codificación compacta de roles: 'u|texto' / 'a|texto'
+ROLE_CODES = {'user': 'u', 'assistant': 'a'}
+CODE_ROLES = {code: role for role, code in ROLE_CODES.items()}
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    return f"{ROLE_CODES.get(message.get('role', 'user'), 'u')}|{message.get('content', '')}"
+
+
+def decode_message(encoded: str) -> Dict[str, str]:
+    code, _, content = encoded.partition('|')
+    return {'role': CODE_ROLES.get(code, 'user'), 'content': content}
+
+
+def message_key(session_id: str, index: int) -> str:
+    return f"{session_id}#{index}"
+
+
+class ChatSessionStore:
+    """Transcript append-only por sesión con carga incremental"""
+
+    def __init__(self, dynamodb, table_name: str = CHAT_SESSIONS_TABLE):
+        self.dynamodb = dynamodb
+        self.table = dynamodb.Table(table_name)
+        self.table_name = table_name
+
+    @staticmethod
+    def new_session_id() -> str:
+        return f"sess_{uuid.uuid4().hex}"
+
+    def get_session(self, session_id: str) -> Dict[str, Any]:
+        """Item cabecera (sin mensajes)"""
+        item = self.table.get_item(Key={'sessionId': session_id}).get('Item')
+        if item is None:
+            raise SessionNotFound(session_id)
+        return item
+
+    def load(self, session_id: str, from_index: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Cabecera y mensajes desde from_index (por defecto, el primero que el resumen no cubre)
+        Retorna {'session', 'messages', 'indexes', 'baseIndex'}; indexes[i] es el índice absoluto
+        de messages[i] (los índices reservados cuyo mensaje no se llegó a escribir se omiten)
+        y baseIndex el índice desde el que se leyó
+        """
+        session = self.get_session(session_id)
+        count = int(session.get('messageCount', 0))
+        start = int(session.get('summaryCovered', 0)) if from_index is None else from_index
+        start = max(0, min(start, count))
+
+        messages, indexes = [], []
+        if count > start:
+            by_index = self._get_messages(session_id, list(range(start, count)))
+            for index in range(start, count):
+                encoded = by_index.get(index)
+                if encoded is None:
+                    logger.warning(f"Session {session_id}: message {index} was reserved but never written")
+                    continue
+                messages.append(decode_message(encoded))
+                indexes.append(index)
+
+        return {'session': session, 'messages': messages, 'indexes': indexes, 'baseIndex': start}
+
+    def _get_messages(self, session_id: str, indexes: List[int]) -> Dict[int, str]:
+        """batch_get_item de los mensajes pedidos (100 keys por request)"""
+        found = {}
+        for offset in range(0, len(indexes), 100):
+            keys = [{'sessionId': message_key(session_id, index)} for index in indexes[offset:offset + 100]]
+            request = {self.table_name: {'Keys': keys, 'ProjectionExpression': 'sessionId, m'}}
+            while request:
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    found[int(item['sessionId'].rsplit('#', 1)[1])] = item.get('m', '')
+                request = response.get('UnprocessedKeys') or None
+        return found
+
+    def append(self, session_id: str, messages: List[Dict[str, Any]], user_id: Optional[str] = None,
+               attributes: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Agrega mensajes al final del transcript y actualiza la cabecera (crea la sesión si no existe)
+        attributes se guardan en la cabecera (p. ej. contextSummary, summaryCovered, projectState)
+        Retorna el nuevo messageCount
+        """
+        now = int(time.time())
+        names = {'#ts': 'timestamp', '#ttl': 'expiresAt'}
+        values = {
+            ':n': len(messages),
+            ':now': now,
+            ':ttl': now + SESSION_TTL_DAYS * 86400,
+            ':uid': user_id or 'anonymous'
+        }
+        assignments = ['#ts = :now', '#ttl = :ttl', 'createdAt = if_not_exists(createdAt, :now)',
+                       'userId = if_not_exists(userId, :uid)']
+        for index, (name, value) in enumerate((attributes or {}).items()):
+            names[f"#a{index}"] = name
+            values[f":a{index}"] = value
+            assignments.append(f"#a{index} = :a{index}")
+
+        # Reserva atómica de los índices de los mensajes nuevos
+        response = self.table.update_item(
+            Key={'sessionId': session_id},
+            UpdateExpression=f"ADD messageCount :n SET {', '.join(assignments)}",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='UPDATED_NEW'
+        )
+        count = int(response['Attributes']['messageCount'])
+
+        # Cada mensaje es su propio item bajo el índice reservado
+        for index, message in enumerate(messages, start=count - len(messages)):
+            self.table.put_item(Item={
+                'sessionId': message_key(session_id, index),
+                'm': encode_message(message),
+                'expiresAt': values[':ttl']
+            })
+
+        return count
+
+    def list_sessions(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Sesiones de un usuario, más recientes primero (GSI UserIndex)"""
+        response = self.table.query(
+            IndexName=USER_INDEX,
+            KeyConditionExpression=Key('userId').eq(user_id),
+            ScanIndexForward=False,
+            Limit=limit,
+            ProjectionExpression='sessionId, #ts, messageCount, title',
+            ExpressionAttributeNames={'#ts': 'timestamp'}
+        )
+        return response.get('Items', [])
@@ -0,0 +1,151 @@
+"""
+Minimal Lambda runtime loop with response streaming for the RESPONSE_STREAM Function URLs
+(ChatStreamFunction, CorsProxyStreamFunction; lambda/chat and lambda/cors-proxy ship identical copies)
+The managed Python runtime only returns buffered responses and calls handler(event, context).
+stream_bootstrap.sh (AWS_LAMBDA_EXEC_WRAPPER) starts this loop instead: it talks to the
+Runtime API directly and calls handler(event, response_stream, context), where every
+response_stream.write() goes out as one chunk of the streamed invocation response.
+"""
+import base64
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+from http.client import HTTPConnection
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger()
+
+API_VERSION = '2018-06-01'
+# Function URLs read the status code and headers from the prelude the handler writes first
+STREAMING_CONTENT_TYPE = 'application/vnd.awslambda.http-integration-response'
+ERROR_TRAILERS = 'Lambda-Runtime-Function-Error-Type, Lambda-Runtime-Function-Error-Body'
+
+
+def runtime_connection() -> HTTPConnection:
+    host, _, port = os.environ['AWS_LAMBDA_RUNTIME_API'].partition(':')
+    return HTTPConnection(host, int(port or 80))
+
+
+def error_payload(error: BaseException) -> Dict[str, Any]:
+    return {
+        'errorMessage': str(error),
+        'errorType': type(error).__name__,
+        'stackTrace': traceback.format_tb(error.__traceback__)
+    }
+
+
+def post_error(path: str, error: BaseException, error_type: Optional[str] = None) -> None:
+    """Report an init or invocation error that happened before any byte was streamed"""
+    connection = runtime_connection()
+    connection.request('POST', f"/{API_VERSION}/runtime/{path}", body=json.dumps(error_payload(error)),
+                       headers={'Lambda-Runtime-Function-Error-Type': error_type or type(error).__name__,
+                                'Content-Type': 'application/json'})
+    connection.getresponse().read()
+    connection.close()
+
+
+class LambdaContext:
+    """The subset of the managed runtime's context object the handlers use"""
+
+    def __init__(self, headers):
+        self.aws_request_id = headers['Lambda-Runtime-Aws-Request-Id']
+        self.invoked_function_arn = headers.get('Lambda-Runtime-Invoked-Function-Arn', '')
+        self.function_name = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', '')
+        self.function_version = os.environ.get('AWS_LAMBDA_FUNCTION_VERSION', '$LATEST')
+        self.memory_limit_in_mb = os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', '')
+        self.log_group_name = os.environ.get('AWS_LAMBDA_LOG_GROUP_NAME', '')
+        self.log_stream_name = os.environ.get('AWS_LAMBDA_LOG_STREAM_NAME', '')
+        self._deadline_ms = int(headers.get('Lambda-Runtime-Deadline-Ms', '0'))
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, self._deadline_ms - int(time.time() * 1000))
+
+
+class ResponseStream:
+    """Chunked POST to /invocation/{id}/response, opened on the first write"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.connection: Optional[HTTPConnection] = None
+        self.closed = False
+
+    @property
+    def started(self) -> bool:
+        return self.connection is not None
+
+    def _open(self) -> None:
+        self.connection = runtime_connection()
+        self.connection.putrequest('POST', f"/{API_VERSION}/runtime/invocation/{self.request_id}/response")
+        self.connection.putheader('Lambda-Runtime-Function-Response-Mode', 'streaming')
+        self.connection.putheader('Transfer-Encoding', 'chunked')
+        self.connection.putheader('Content-Type', STREAMING_CONTENT_TYPE)
+        self.connection.putheader('Trailer', ERROR_TRAILERS)
+        self.connection.endheaders()
+
+    def write(self, data: bytes) -> None:
+        if not self.started:
+            self._open()
+        if data:
+            self.connection.send(b'%x\r\n%s\r\n' % (len(data), data))
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """Last chunk; a mid-stream failure is reported in the error trailers. Idempotent,
+        the streaming handlers already close the stream when they finish"""
+        if self.closed:
+            return
+        self.closed = True
+        if not self.started:
+            self._open()
+        trailers = b''
+        if error is not None:
+            body = base64.b64encode(json.dumps(error_payload(error)).encode('utf-8'))
+            trailers = (f"Lambda-Runtime-Function-Error-Type: {type(error).__name__}\r\n".encode('utf-8') +
+                        b'Lambda-Runtime-Function-Error-Body: ' + body + b'\r\n')
+        self.connection.send(b'0\r\n' + trailers + b'\r\n')
+        self.connection.getresponse().read()
+        self.connection.close()
+
+
+def load_handler(name: str):
+    module_name, _, function_name = name.rpartition('.')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+    try:
+        handler = load_handler(os.environ['_HANDLER'])
+    except Exception as e:
+        post_error('init/error', e, 'Runtime.ImportModuleError')
+        sys.exit(1)
+
+    while True:
+        connection = runtime_connection()
+        connection.request('GET', f"/{API_VERSION}/runtime/invocation/next")
+        response = connection.getresponse()
+        event = json.loads(response.read() or b'{}')
+        context = LambdaContext(response.headers)
+        connection.close()
+
+        if response.headers.get('Lambda-Runtime-Trace-Id'):
+            os.environ['_X_AMZN_TRACE_ID'] = response.headers['Lambda-Runtime-Trace-Id']
+
+        stream = ResponseStream(context.aws_request_id)
+        try:
+            handler(event, stream, context)
+            stream.close()
+        except Exception as e:
+            logger.error(f"Streaming handler failed: {str(e)}", exc_info=True)
+            if not stream.started:
+                post_error(f"invocation/{context.aws_request_id}/error", e)
+            elif not stream.closed:
+                stream.close(error=e)
+
+
+if __name__ == '__main__':
+    main()
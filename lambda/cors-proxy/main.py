@@ -1,91 +1,238 @@
 import json
+import base64
 import urllib3
 import os
 from urllib.parse import urlencode
+from urllib3.util import Retry, Timeout
+
+from proxy_cache import ProxyResponseCache
+
+# Timeouts y reintentos hacia los MCP servers (sobrescribibles por variables de entorno)
+PROXY_CONNECT_TIMEOUT = float(os.environ.get('PROXY_CONNECT_TIMEOUT', '3'))
+PROXY_READ_TIMEOUT = float(os.environ.get('PROXY_READ_TIMEOUT', '30'))
+PROXY_MAX_RETRIES = int(os.environ.get('PROXY_MAX_RETRIES', '2'))
+PROXY_RETRY_BACKOFF = float(os.environ.get('PROXY_RETRY_BACKOFF', '0.3'))
+PROXY_CHUNK_SIZE = int(os.environ.get('PROXY_CHUNK_SIZE', str(64 * 1024)))
+# Una respuesta síncrona de Lambda admite 6 MB; base64 agrega un tercio
+PROXY_MAX_BUFFERED_BYTES = int(os.environ.get('PROXY_MAX_BUFFERED_BYTES', str(4 * 1024 * 1024)))
+
+# Solo los métodos idempotentes se reintentan tras un error de lectura o un 502/503/504;
+# los errores de conexión se reintentan siempre porque la request nunca llegó upstream
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+ALLOWED_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
 
 # Configurar urllib3
-http = urllib3.PoolManager()
+http = urllib3.PoolManager(
+    timeout=Timeout(connect=PROXY_CONNECT_TIMEOUT, read=PROXY_READ_TIMEOUT),
+    retries=Retry(
+        total=PROXY_MAX_RETRIES,
+        backoff_factor=PROXY_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False
+    )
+)
+
+# Micro-cache de GETs compartido entre invocaciones del contenedor warm
+response_cache = ProxyResponseCache()
 
 # URLs base de los MCP servers
 MCP_BASE_URL = os.environ.get('MCP_BASE_URL', 'https://mcp.danielingram.shop')
 
+# Headers CORS
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With',
+    'Access-Control-Max-Age': '86400',
+    'Access-Control-Expose-Headers': 'X-Proxy-Cache, X-Proxy-Cache-Hit-Rate, Age'
+}
+
+# Content-Types que se devuelven como texto; todo lo demás (PNG, PDF, DOCX...) va en base64
+TEXT_CONTENT_TYPES = ('text/', 'application/json', 'application/xml', 'application/javascript',
+                      'application/x-ndjson', 'image/svg+xml')
+
+
+class UpstreamBodyTooLarge(Exception):
+    """La respuesta upstream no cabe en una respuesta Lambda buffered"""
+
+
+def is_text_content(content_type):
+    """True si el Content-Type se puede devolver como texto UTF-8"""
+    content_type = (content_type or '').lower()
+    return any(content_type.startswith(prefix) or prefix in content_type for prefix in TEXT_CONTENT_TYPES)
+
+
+def request_method(event):
+    """Método HTTP de un evento de API Gateway (payload v1) o de una Function URL (payload v2)"""
+    if 'rawPath' in event:
+        return event.get('requestContext', {}).get('http', {}).get('method', 'GET')
+    return event.get('httpMethod', 'GET')
+
+
+def build_upstream_request(event):
+    """
+    Traduce el evento de API Gateway (v1) o de la Function URL (v2) a (método, URL, headers, body)
+    para el MCP server
+    """
+    method = request_method(event)
+    if 'rawPath' in event:
+        path = event.get('rawPath', '')
+        query_string = event.get('rawQueryString', '')
+    else:
+        path = event.get('path', '')
+        query_string = urlencode(event.get('queryStringParameters') or {})
+    headers = event.get('headers') or {}
+    body = event.get('body')
+
+    # El body de la request también puede ser binario
+    if body and event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+
+    # Construir URL del MCP server
+    # Remover /cors-proxy del path si existe
+    if path.startswith('/cors-proxy'):
+        path = path[11:]  # Remover '/cors-proxy'
+
+    target_url = f"{MCP_BASE_URL}{path}"
+    if query_string:
+        target_url += '?' + query_string
+
+    # Preparar headers para la request upstream
+    upstream_headers = {}
+    for key, value in headers.items():
+        # Filtrar headers que no deben ser enviados upstream
+        if key.lower() not in ['host', 'x-forwarded-for', 'x-forwarded-proto', 'x-forwarded-port']:
+            upstream_headers[key] = value
+
+    return method, target_url, upstream_headers, body
+
+
+def open_upstream(method, target_url, upstream_headers, body):
+    """
+    Abre la request upstream sin precargar el body para poder leerlo por chunks
+    """
+    return http.request(
+        method,
+        target_url,
+        body=body if method in ('POST', 'PUT') else None,
+        headers=upstream_headers,
+        preload_content=False
+    )
+
+
+def copy_response_headers(response):
+    """Copiar algunos headers de la response upstream"""
+    upstream_response_headers = {}
+    for key, value in response.headers.items():
+        if key.lower() in ['content-type', 'cache-control', 'content-disposition']:
+            upstream_response_headers[key] = value
+    return upstream_response_headers
+
+
+def read_upstream_body(response):
+    """
+    Lee el body por chunks con un tope de tamaño
+    Retorna (body, is_base64): texto UTF-8 tal cual, binarios codificados en base64
+    """
+    data = bytearray()
+    try:
+        for chunk in response.stream(PROXY_CHUNK_SIZE):
+            data.extend(chunk)
+            if len(data) > PROXY_MAX_BUFFERED_BYTES:
+                raise UpstreamBodyTooLarge(
+                    f"Upstream response exceeds {PROXY_MAX_BUFFERED_BYTES} bytes; use the streaming handler"
+                )
+    finally:
+        response.release_conn()
+
+    if not data:
+        return '', False
+    if is_text_content(response.headers.get('Content-Type')):
+        try:
+            return data.decode('utf-8'), False
+        except UnicodeDecodeError:
+            pass
+    return base64.b64encode(bytes(data)).decode('ascii'), True
+
+
 def lambda_handler(event, context):
     """
     Proxy CORS para MCP servers
     """
-    
-    # Headers CORS
-    cors_headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With',
-        'Access-Control-Max-Age': '86400'
-    }
-    
+
+    cors_headers = CORS_HEADERS.copy()
+
     try:
         # Manejar preflight OPTIONS request
-        if event.get('httpMethod') == 'OPTIONS':
+        if request_method(event) == 'OPTIONS':
             return {
                 'statusCode': 200,
                 'headers': cors_headers,
                 'body': ''
             }
-        
+
         # Extraer información de la request
-        path = event.get('path', '')
-        method = event.get('httpMethod', 'GET')
-        query_params = event.get('queryStringParameters') or {}
-        headers = event.get('headers') or {}
-        body = event.get('body')
-        
-        # Construir URL del MCP server
-        # Remover /cors-proxy del path si existe
-        if path.startswith('/cors-proxy'):
-            path = path[11:]  # Remover '/cors-proxy'
-        
-        target_url = f"{MCP_BASE_URL}{path}"
-        if query_params:
-            target_url += '?' + urlencode(query_params)
-        
+        method, target_url, upstream_headers, body = build_upstream_request(event)
+
         print(f"Proxying {method} request to: {target_url}")
-        
-        # Preparar headers para la request upstream
-        upstream_headers = {}
-        for key, value in headers.items():
-            # Filtrar headers que no deben ser enviados upstream
-            if key.lower() not in ['host', 'x-forwarded-for', 'x-forwarded-proto', 'x-forwarded-port']:
-                upstream_headers[key] = value
-        
-        # Hacer request al MCP server
-        if method == 'GET':
-            response = http.request('GET', target_url, headers=upstream_headers)
-        elif method == 'POST':
-            response = http.request('POST', target_url, body=body, headers=upstream_headers)
-        elif method == 'PUT':
-            response = http.request('PUT', target_url, body=body, headers=upstream_headers)
-        elif method == 'DELETE':
-            response = http.request('DELETE', target_url, headers=upstream_headers)
-        else:
+
+        if method not in ALLOWED_METHODS:
             return {
                 'statusCode': 405,
                 'headers': cors_headers,
                 'body': json.dumps({'error': 'Method not allowed'})
             }
-        
-        # Preparar response
+
+        def fetch_upstream():
+            # Hacer request al MCP server
+            response = open_upstream(method, target_url, upstream_headers, body)
+            response_body, is_base64 = read_upstream_body(response)
+
+            return {
+                'statusCode': response.status,
+                'headers': copy_response_headers(response),
+                'body': response_body,
+                'isBase64Encoded': is_base64
+            }
+
+        # GETs idénticos comparten la llamada upstream y se sirven del micro-cache
+        upstream, cache_status, age = response_cache.get_or_fetch(
+            method, target_url, upstream_headers, fetch_upstream
+        )
+
+        # Preparar response (sin mutar la entrada cacheada)
         response_headers = cors_headers.copy()
-        
-        # Copiar algunos headers de la response upstream
-        for key, value in response.headers.items():
-            if key.lower() in ['content-type', 'cache-control']:
-                response_headers[key] = value
-        
+        response_headers.update(upstream['headers'])
+        response_headers.update(response_cache.response_headers(cache_status, age))
+
         return {
-            'statusCode': response.status,
+            'statusCode': upstream['statusCode'],
             'headers': response_headers,
-            'body': response.data.decode('utf-8') if response.data else ''
+            'body': upstream['body'],
+            'isBase64Encoded': upstream['isBase64Encoded']
+        }
+
+    except UpstreamBodyTooLarge as e:
+        print(f"Upstream body too large: {str(e)}")
+        return {
+            'statusCode': 502,
+            'headers': cors_headers,
+            'body': json.dumps({
+                'error': 'Upstream response too large',
+                'message': str(e)
+            })
+        }
+    except (urllib3.exceptions.TimeoutError, urllib3.exceptions.MaxRetryError) as e:
+        print(f"Upstream unavailable: {str(e)}")
+        return {
+            'statusCode': 504 if isinstance(e, urllib3.exceptions.TimeoutError) else 502,
+            'headers': cors_headers,
+            'body': json.dumps({
+                'error': 'Upstream unavailable',
+                'message': str(e)
+            })
         }
-        
     except Exception as e:
         print(f"Error in CORS proxy: {str(e)}")
         return {
@@ -96,3 +243,75 @@ def lambda_handler(event, context):
                 'message': str(e)
             })
         }
+
+
+def streaming_handler(event, response_stream, context):
+    """
+    Proxy CORS en modo streaming para Function URLs con InvokeMode RESPONSE_STREAM
+    response_stream es el ResponseStream de streaming_runtime.py (iniciado por stream_bootstrap.sh)
+    Escribe el preludio HTTP (JSON + 8 bytes nulos) y luego reenvía cada chunk apenas llega,
+    así los documentos grandes empiezan a llegar al navegador antes de estar completos.
+    Las respuestas en streaming no pasan por el micro-cache ni por el límite de 6 MB.
+    Un fallo después del preludio se relanza: el runtime lo informa en los trailers de error
+    en lugar de cerrar el stream como si el documento estuviera completo.
+    """
+
+    prelude_sent = False
+    failed_mid_stream = False
+
+    def write_prelude(status_code, headers):
+        nonlocal prelude_sent
+        prelude = json.dumps({'statusCode': status_code, 'headers': headers}).encode('utf-8')
+        response_stream.write(prelude + b'\x00' * 8)
+        prelude_sent = True
+
+    def write_error(status_code, payload):
+        write_prelude(status_code, cors_headers)
+        response_stream.write(json.dumps(payload).encode('utf-8'))
+
+    cors_headers = CORS_HEADERS.copy()
+
+    try:
+        if request_method(event) == 'OPTIONS':
+            write_prelude(200, cors_headers)
+            return
+
+        method, target_url, upstream_headers, body = build_upstream_request(event)
+
+        print(f"Streaming {method} request to: {target_url}")
+
+        if method not in ALLOWED_METHODS:
+            write_error(405, {'error': 'Method not allowed'})
+            return
+
+        response = open_upstream(method, target_url, upstream_headers, body)
+        try:
+            response_headers = cors_headers.copy()
+            response_headers.update(copy_response_headers(response))
+            write_prelude(response.status, response_headers)
+
+            # Los bytes viajan tal cual: no hace falta base64 en modo streaming
+            for chunk in response.stream(PROXY_CHUNK_SIZE):
+                response_stream.write(chunk)
+        finally:
+            response.release_conn()
+
+    except (urllib3.exceptions.TimeoutError, urllib3.exceptions.MaxRetryError) as e:
+        print(f"Upstream unavailable: {str(e)}")
+        if prelude_sent:
+            failed_mid_stream = True
+            raise
+        write_error(504 if isinstance(e, urllib3.exceptions.TimeoutError) else 502,
+                    {'error': 'Upstream unavailable', 'message': str(e)})
+    except Exception as e:
+        print(f"Error in CORS proxy stream: {str(e)}")
+        if prelude_sent:
+            failed_mid_stream = True
+            raise
+        write_error(500, {'error': 'Internal server error', 'message': str(e)})
+
+    finally:
+        # Un stream cortado no se cierra acá: el runtime lo cierra con los trailers de error
+        close = getattr(response_stream, 'end', None) or getattr(response_stream, 'close', None)
+        if close and not failed_mid_stream:
+            close()
@@ -0,0 +1,180 @@
+"""
+Micro-cache y coalescing para GETs seguros del proxy CORS
+Las requests idénticas concurrentes comparten una sola llamada upstream y la respuesta
+se reutiliza durante el TTL que permita el Cache-Control del MCP server
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Configuración del cache (sobrescribible por variables de entorno)
+PROXY_CACHE_ENABLED = os.environ.get('PROXY_CACHE_ENABLED', 'true').lower() == 'true'
+PROXY_CACHE_DEFAULT_TTL = float(os.environ.get('PROXY_CACHE_DEFAULT_TTL', '5'))
+PROXY_CACHE_MAX_TTL = float(os.environ.get('PROXY_CACHE_MAX_TTL', '60'))
+PROXY_CACHE_MAX_ENTRIES = int(os.environ.get('PROXY_CACHE_MAX_ENTRIES', '256'))
+
+# Headers de la request que cambian la respuesta y por lo tanto forman parte de la llave
+VARY_HEADERS = ('authorization', 'accept', 'accept-encoding')
+
+# Valores del header X-Proxy-Cache
+CACHE_HIT = 'HIT'
+CACHE_MISS = 'MISS'
+CACHE_COALESCED = 'COALESCED'
+CACHE_BYPASS = 'BYPASS'
+
+_MAX_AGE_PATTERN = re.compile(r'(s-maxage|max-age)\s*=\s*"?(\d+)"?')
+
+
+def cache_control_ttl(cache_control: Optional[str], default_ttl: float = PROXY_CACHE_DEFAULT_TTL,
+                      max_ttl: float = PROXY_CACHE_MAX_TTL) -> float:
+    """
+    TTL permitido por el Cache-Control upstream
+    no-store/no-cache/private desactivan el cache; s-maxage tiene prioridad sobre max-age
+    """
+    if not cache_control:
+        return default_ttl
+
+    directives = cache_control.lower()
+    if any(directive in directives for directive in ('no-store', 'no-cache', 'private')):
+        return 0
+
+    ages = dict(_MAX_AGE_PATTERN.findall(directives))
+    age = ages.get('s-maxage', ages.get('max-age'))
+    if age is None:
+        return default_ttl
+    return min(float(age), max_ttl)
+
+
+def is_cacheable_request(method: str, headers: Dict[str, str]) -> bool:
+    """Solo GETs sin Cache-Control: no-cache/no-store del cliente"""
+    if method != 'GET':
+        return False
+    client_cache_control = next(
+        (value for key, value in headers.items() if key.lower() == 'cache-control'), ''
+    ).lower()
+    return 'no-cache' not in client_cache_control and 'no-store' not in client_cache_control
+
+
+class _InFlight:
+    """Llamada upstream en curso que otras requests pueden esperar"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class ProxyResponseCache:
+    """LRU de respuestas upstream compartido por las invocaciones de un contenedor warm"""
+
+    def __init__(self, default_ttl: Optional[float] = None, max_ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.default_ttl = PROXY_CACHE_DEFAULT_TTL if default_ttl is None else default_ttl
+        self.max_ttl = PROXY_CACHE_MAX_TTL if max_ttl is None else max_ttl
+        self.max_entries = max_entries or PROXY_CACHE_MAX_ENTRIES
+        self.enabled = PROXY_CACHE_ENABLED if enabled is None else enabled
+        self._entries: 'OrderedDict[str, Tuple[float, float, Dict[str, Any]]]' = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.counters = {CACHE_HIT: 0, CACHE_MISS: 0, CACHE_COALESCED: 0, CACHE_BYPASS: 0}
+
+    @staticmethod
+    def make_key(method: str, url: str, headers: Dict[str, str]) -> str:
+        """Llave por método, URL y headers que varían la respuesta (Authorization se hashea)"""
+        normalized = {key.lower(): value for key, value in headers.items()}
+        vary = '|'.join(f"{name}={normalized.get(name, '')}" for name in VARY_HEADERS)
+        return f"{method} {url} {hashlib.sha256(vary.encode()).hexdigest()}"
+
+    def _get(self, key: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, 0
+        stored_at, expires_at, response = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            del self._entries[key]
+            return None, 0
+        self._entries.move_to_end(key)
+        return response, now - stored_at
+
+    def _store(self, key: str, response: Dict[str, Any]) -> None:
+        if response.get('statusCode') != 200:
+            return
+        cache_control = next(
+            (value for name, value in response.get('headers', {}).items() if name.lower() == 'cache-control'),
+            None
+        )
+        ttl = cache_control_ttl(cache_control, self.default_ttl, self.max_ttl)
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        self._entries[key] = (now, now + ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_fetch(self, method: str, url: str, headers: Dict[str, str],
+                     fetch: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], str, float]:
+        """
+        Retorna (respuesta, estado del cache, edad en segundos)
+        fetch() hace la llamada upstream y retorna la respuesta en formato Lambda proxy
+        """
+        if not self.enabled or not is_cacheable_request(method, headers):
+            with self._lock:
+                self.counters[CACHE_BYPASS] += 1
+            return fetch(), CACHE_BYPASS, 0
+
+        key = self.make_key(method, url, headers)
+        with self._lock:
+            cached, age = self._get(key)
+            if cached is not None:
+                self.counters[CACHE_HIT] += 1
+                return cached, CACHE_HIT, age
+
+            in_flight = self._in_flight.get(key)
+            owner = in_flight is None
+            if owner:
+                in_flight = self._in_flight[key] = _InFlight()
+                self.counters[CACHE_MISS] += 1
+            else:
+                self.counters[CACHE_COALESCED] += 1
+
+        if not owner:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.result, CACHE_COALESCED, 0
+
+        try:
+            response = fetch()
+            in_flight.result = response
+            with self._lock:
+                self._store(key, response)
+            return response, CACHE_MISS, 0
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.done.set()
+
+    def hit_rate(self) -> Optional[float]:
+        with self._lock:
+            lookups = self.counters[CACHE_HIT] + self.counters[CACHE_MISS] + self.counters[CACHE_COALESCED]
+            served = self.counters[CACHE_HIT] + self.counters[CACHE_COALESCED]
+        return round(served / lookups, 3) if lookups else None
+
+    def response_headers(self, status: str, age: float) -> Dict[str, str]:
+        """Headers de diagnóstico que se agregan a cada respuesta del proxy"""
+        headers = {'X-Proxy-Cache': status}
+        hit_rate = self.hit_rate()
+        if hit_rate is not None:
+            headers['X-Proxy-Cache-Hit-Rate'] = f"{hit_rate:.3f}"
+        if status == CACHE_HIT:
+            headers['Age'] = str(int(age))
+        return headers
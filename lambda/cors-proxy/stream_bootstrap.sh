@@ -0,0 +1,4 @@
+#!/bin/sh
+# AWS_LAMBDA_EXEC_WRAPPER of ChatStreamFunction: the managed runtime command ("$@") only supports
+# buffered responses, so run the streaming Runtime API loop with the runtime's interpreter instead
+exec /var/lang/bin/python3 "$LAMBDA_TASK_ROOT/streaming_runtime.py"
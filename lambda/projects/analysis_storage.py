@@ -0,0 +1,99 @@
+"""
+Almacenamiento de analysis_results para los items de proyectos
+Resultados chicos van inline como JSON, medianos como binario comprimido con zlib
+y grandes se descargan a S3 dejando solo un puntero en el item (límite de 400 KB por item)
+"""
+import gzip
+import json
+import logging
+import os
+import zlib
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger()
+
+# Umbrales (sobrescribibles por variables de entorno)
+ANALYSIS_INLINE_MAX_BYTES = int(os.environ.get('ANALYSIS_INLINE_MAX_BYTES', str(16 * 1024)))
+ANALYSIS_COMPRESSED_MAX_BYTES = int(os.environ.get('ANALYSIS_COMPRESSED_MAX_BYTES', str(256 * 1024)))
+ANALYSIS_RESULTS_PREFIX = os.environ.get('ANALYSIS_RESULTS_PREFIX', 'analysis-results')
+DOCUMENTS_BUCKET = os.environ.get('DOCUMENTS_BUCKET', 'aws-propuestas-v3-documents-prod-035385358261')
+
+# Atributos del item según el modo de almacenamiento
+INLINE_ATTRIBUTE = 'analysis_results'
+COMPRESSED_ATTRIBUTE = 'analysis_results_z'
+POINTER_ATTRIBUTE = 'analysis_results_ref'
+STORAGE_ATTRIBUTE = 'analysis_results_storage'
+SIZE_ATTRIBUTE = 'analysis_results_bytes'
+
+
+def encode_analysis_results(project_id: str, analysis_results: Dict[str, Any], s3_client=None,
+                            bucket: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Retorna los atributos a guardar en el item para analysis_results
+    - inline: JSON string (mismo formato que antes, legible en la consola)
+    - zlib: binario comprimido
+    - s3: objeto JSON con gzip en S3 y un puntero {bucket, key} en el item
+    """
+    raw = json.dumps(analysis_results, default=str, separators=(',', ':')).encode('utf-8')
+
+    if len(raw) <= ANALYSIS_INLINE_MAX_BYTES:
+        return {
+            INLINE_ATTRIBUTE: raw.decode('utf-8'),
+            STORAGE_ATTRIBUTE: 'inline',
+            SIZE_ATTRIBUTE: len(raw)
+        }
+
+    compressed = zlib.compress(raw, 6)
+    if len(compressed) <= ANALYSIS_COMPRESSED_MAX_BYTES or s3_client is None:
+        if len(compressed) > ANALYSIS_COMPRESSED_MAX_BYTES:
+            logger.warning(f"⚠️ analysis_results de {project_id} comprimido ocupa {len(compressed)} bytes y no hay cliente S3")
+        return {
+            COMPRESSED_ATTRIBUTE: compressed,
+            STORAGE_ATTRIBUTE: 'zlib',
+            SIZE_ATTRIBUTE: len(raw)
+        }
+
+    bucket = bucket or DOCUMENTS_BUCKET
+    key = f"{ANALYSIS_RESULTS_PREFIX}/{project_id}.json"
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=gzip.compress(raw, compresslevel=6),
+        ContentType='application/json',
+        ContentEncoding='gzip'
+    )
+    logger.info(f"📦 analysis_results de {project_id} ({len(raw)} bytes) guardado en s3://{bucket}/{key}")
+
+    return {
+        POINTER_ATTRIBUTE: {'bucket': bucket, 'key': key},
+        STORAGE_ATTRIBUTE: 's3',
+        SIZE_ATTRIBUTE: len(raw)
+    }
+
+
+def decode_analysis_results(item: Dict[str, Any], s3_client=None) -> Optional[Dict[str, Any]]:
+    """
+    Lee analysis_results de un item sin importar cómo se guardó
+    También entiende los items antiguos con el JSON string inline
+    """
+    if POINTER_ATTRIBUTE in item:
+        if s3_client is None:
+            raise ValueError('S3 client required to read offloaded analysis_results')
+        pointer = item[POINTER_ATTRIBUTE]
+        response = s3_client.get_object(Bucket=pointer['bucket'], Key=pointer['key'])
+        body = response['Body'].read()
+        if response.get('ContentEncoding') == 'gzip':
+            body = gzip.decompress(body)
+        return json.loads(body)
+
+    if COMPRESSED_ATTRIBUTE in item:
+        compressed = item[COMPRESSED_ATTRIBUTE]
+        # boto3 retorna los binarios de DynamoDB como Binary; .value son los bytes
+        compressed = getattr(compressed, 'value', compressed)
+        return json.loads(zlib.decompress(compressed))
+
+    inline = item.get(INLINE_ATTRIBUTE)
+    if inline is None:
+        return None
+    return json.loads(inline) if isinstance(inline, str) else inline
+
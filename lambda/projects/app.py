@@ -4,12 +4,19 @@ Conecta con DynamoDB para obtener proyectos reales generados por el arquitecto
 """
 
 import json
+import base64
 import boto3
 import os
 import logging
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+from boto3.dynamodb.conditions import Key, Attr
+
+from analysis_storage import decode_analysis_results
+from presign_service import PresignService
+from project_deletion import delete_s3_prefix
+from project_stats import read_statistics
 
 # Configure logging
 logger = logging.getLogger()
@@ -18,11 +25,42 @@ logger.setLevel(logging.INFO)
 # Initialize AWS clients
 dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('REGION', 'us-east-1'))
 s3_client = boto3.client('s3', region_name='us-east-1')
+lambda_client = boto3.client('lambda', region_name=os.environ.get('REGION', 'us-east-1'))
+
+# URLs pre-firmadas cacheadas entre invocaciones warm
+presign_service = PresignService(s3_client)
 
 # Variables de entorno
 PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'aws-propuestas-v3-projects-prod')
 DOCUMENTS_BUCKET = os.environ.get('DOCUMENTS_BUCKET', 'aws-propuestas-v3-documents-prod-035385358261')
 
+# Paginación de GET /projects sobre los GSIs userId/createdAt y status/createdAt
+USER_INDEX = os.environ.get('PROJECTS_USER_INDEX', 'UserIndex')
+STATUS_INDEX = os.environ.get('PROJECTS_STATUS_INDEX', 'StatusIndex')
+DEFAULT_PAGE_SIZE = int(os.environ.get('PROJECTS_PAGE_SIZE', '20'))
+MAX_PAGE_SIZE = int(os.environ.get('PROJECTS_MAX_PAGE_SIZE', '100'))
+# Sin filtros se recorren estos estados en StatusIndex y se mezclan por fecha
+# (incluye los estados en español que escribe app_fixed.py; 'deleting' queda oculto a propósito)
+PROJECT_STATUSES = [s.strip() for s in os.environ.get(
+    'PROJECT_STATUSES', 'completed,in_progress,error,completado,en-progreso,delete_failed'
+).split(',') if s.strip()]
+
+# Atributos que forman la llave de cada índice (necesarios para reanudar desde un item)
+INDEX_KEY_ATTRIBUTES = {
+    USER_INDEX: ('projectId', 'userId', 'createdAt'),
+    STATUS_INDEX: ('projectId', 'status', 'createdAt')
+}
+
+# Estados de un proyecto durante su eliminación
+DELETING_STATUS = 'deleting'
+DELETE_FAILED_STATUS = 'delete_failed'
+
+# Atributos que renderiza la vista de lista; blobs como analysis_results nunca se leen
+PROJECT_LIST_FIELDS = (
+    'projectId', 'projectName', 'projectType', 'status', 'createdAt', 'updatedAt',
+    'description', 's3Folder', 's3Bucket', 'documentsGenerated', 'totalDocuments', 'estimatedCost'
+)
+
 def get_cors_headers():
     """Get standard CORS headers for all responses"""
     return {
@@ -71,91 +109,255 @@ def create_success_response(data):
     """Create a success response with CORS headers"""
     return create_response(200, data)
 
-def get_all_projects():
-    """Obtiene todos los proyectos de DynamoDB"""
+class InvalidPageToken(ValueError):
+    """El nextToken recibido no es un cursor válido"""
+
+def encode_page_token(cursor: Optional[Dict]) -> Optional[str]:
+    """Serializa el cursor de DynamoDB como un token opaco para el frontend"""
+    if not cursor:
+        return None
+    raw = json.dumps(cursor, default=lambda o: int(o) if o % 1 == 0 else float(o), separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_page_token(token: Optional[str]) -> Optional[Dict]:
+    """Decodifica el nextToken; los números vuelven como Decimal para DynamoDB"""
+    if not token:
+        return None
     try:
-        table = dynamodb.Table(PROJECTS_TABLE)
-        
-        logger.info(f"Scanning projects table: {PROJECTS_TABLE}")
-        response = table.scan()
-        
-        projects = response.get('Items', [])
-        logger.info(f"Found {len(projects)} projects in DynamoDB")
-        
-        # Procesar proyectos para el frontend
-        processed_projects = []
-        for project in projects:
-            processed_project = {
-                'projectId': project.get('projectId', ''),
-                'projectName': project.get('projectName', 'Proyecto Sin Nombre'),
-                'projectType': project.get('projectType', 'Solucion AWS'),
-                'status': project.get('status', 'completed'),
-                'createdAt': project.get('createdAt', ''),
-                'updatedAt': project.get('updatedAt', ''),
-                'description': project.get('description', ''),
-                's3Folder': project.get('s3Folder', ''),
-                's3Bucket': project.get('s3Bucket', DOCUMENTS_BUCKET),
-                'documentsGenerated': project.get('documentsGenerated', []),
-                'totalDocuments': project.get('totalDocuments', 0),
-                'estimatedCost': float(project.get('estimatedCost', 0)) if project.get('estimatedCost') else None
-            }
-            processed_projects.append(processed_project)
-        
-        # Ordenar por fecha de creación (más recientes primero)
-        processed_projects.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
-        
-        return processed_projects
-        
-    except Exception as e:
-        logger.error(f"Error getting projects from DynamoDB: {str(e)}")
-        return []
+        cursor = json.loads(base64.urlsafe_b64decode(token.encode('ascii')), parse_float=Decimal)
+    except (ValueError, TypeError) as e:
+        raise InvalidPageToken(f'Invalid nextToken: {str(e)}')
+    if not isinstance(cursor, dict):
+        raise InvalidPageToken('Invalid nextToken')
+    return cursor
 
-def get_project_statistics(projects: List[Dict]) -> Dict:
-    """Calcula estadísticas de los proyectos"""
-    total_projects = len(projects)
-    completed_projects = len([p for p in projects if p.get('status') == 'completed'])
-    in_progress_projects = len([p for p in projects if p.get('status') == 'in_progress'])
-    total_documents = sum(p.get('totalDocuments', 0) for p in projects)
+def parse_fields(raw_fields: Optional[str]) -> List[str]:
+    """
+    Parsea el sparse fieldset ?fields=projectId,projectName,status
+    Sin parámetro retorna todos los campos de la vista de lista
+    """
+    if not raw_fields:
+        return list(PROJECT_LIST_FIELDS)
     
+    fields = [field.strip() for field in raw_fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in PROJECT_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(PROJECT_LIST_FIELDS)}")
+    return fields
+
+def build_projection(fields: List[str], index_name: str) -> Dict[str, Any]:
+    """
+    ProjectionExpression con los campos pedidos más la llave del índice
+    (la llave es necesaria para armar el cursor de paginación)
+    Todos los atributos van con alias porque 'status' es palabra reservada
+    """
+    attributes = list(dict.fromkeys(list(fields) + list(INDEX_KEY_ATTRIBUTES[index_name])))
+    names = {f"#p{index}": attribute for index, attribute in enumerate(attributes)}
     return {
-        'totalProjects': total_projects,
-        'completedProjects': completed_projects,
-        'inProgressProjects': in_progress_projects,
-        'totalDocuments': total_documents
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
     }
 
+def format_timestamp(value: Any) -> str:
+    """createdAt se guarda como epoch (llave numérica de los GSIs); el frontend espera ISO 8601"""
+    if isinstance(value, (int, float, Decimal)):
+        return datetime.fromtimestamp(float(value)).isoformat()
+    return value or ''
+
+def process_project(project: Dict, fields: Optional[List[str]] = None) -> Dict:
+    """
+    Convierte un item de DynamoDB al formato que espera el frontend
+    fields: si se indica, solo se retornan esos campos
+    """
+    processed_project = {
+        'projectId': project.get('projectId', ''),
+        'projectName': project.get('projectName', 'Proyecto Sin Nombre'),
+        'projectType': project.get('projectType', 'Solucion AWS'),
+        'status': project.get('status', 'completed'),
+        'createdAt': format_timestamp(project.get('createdAt')),
+        'updatedAt': format_timestamp(project.get('updatedAt')),
+        'description': project.get('description', ''),
+        's3Folder': project.get('s3Folder', ''),
+        's3Bucket': project.get('s3Bucket', DOCUMENTS_BUCKET),
+        'documentsGenerated': project.get('documentsGenerated', []),
+        'totalDocuments': project.get('totalDocuments', 0),
+        'estimatedCost': float(project.get('estimatedCost', 0)) if project.get('estimatedCost') else None
+    }
+    
+    if fields is None:
+        return processed_project
+    return {field: processed_project[field] for field in fields}
+
+def query_index_page(index_name: str, key_condition, limit: int,
+                     start_key: Optional[Dict] = None, filter_expression=None,
+                     fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Lee hasta `limit` items de un GSI, del más reciente al más antiguo
+    Si el filtro descarta items sigue leyendo hasta completar la página;
+    el cursor retornado apunta al último item entregado
+    fields: atributos a leer vía ProjectionExpression (por defecto los de la vista de lista)
+    """
+    table = dynamodb.Table(PROJECTS_TABLE)
+    items: List[Dict] = []
+    cursor = start_key
+
+    while len(items) < limit:
+        query_kwargs = {
+            'IndexName': index_name,
+            'KeyConditionExpression': key_condition,
+            'ScanIndexForward': False,
+            'Limit': limit - len(items),
+            **build_projection(fields or list(PROJECT_LIST_FIELDS), index_name)
+        }
+        if filter_expression is not None:
+            query_kwargs['FilterExpression'] = filter_expression
+        if cursor:
+            query_kwargs['ExclusiveStartKey'] = cursor
+
+        response = table.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        cursor = response.get('LastEvaluatedKey')
+        if not cursor:
+            break
+
+    if len(items) > limit:
+        items = items[:limit]
+        cursor = {attr: items[-1][attr] for attr in INDEX_KEY_ATTRIBUTES[index_name]}
+
+    return items, cursor
+
+def query_all_statuses_page(limit: int, cursors: Optional[Dict],
+                            fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Página global sin filtros: una query por estado en StatusIndex y merge por createdAt
+    El cursor guarda la posición de cada estado; None marca un estado agotado
+    """
+    if cursors is None:
+        cursors = {status: {} for status in PROJECT_STATUSES}
+
+    candidates = []
+    next_keys = {}
+    for status, cursor in cursors.items():
+        if cursor is None:
+            continue
+        items, next_key = query_index_page(
+            STATUS_INDEX, Key('status').eq(status), limit, start_key=cursor or None, fields=fields
+        )
+        next_keys[status] = next_key
+        candidates.extend((status, index, item) for index, item in enumerate(items))
+
+    candidates.sort(key=lambda candidate: candidate[2].get('createdAt', 0), reverse=True)
+    page = candidates[:limit]
+
+    # Avanzar cada estado hasta el último item entregado de ese estado
+    taken = {}
+    for status, index, item in page:
+        taken[status] = (index, item)
+
+    fetched_counts = {}
+    for status, index, item in candidates:
+        fetched_counts[status] = fetched_counts.get(status, 0) + 1
+
+    new_cursors = {}
+    for status, cursor in cursors.items():
+        if cursor is None or status not in next_keys:
+            new_cursors[status] = None
+        elif status not in fetched_counts and next_keys[status] is None:
+            # Estado sin items pendientes: agotado
+            new_cursors[status] = None
+        elif status not in taken:
+            new_cursors[status] = cursor
+        elif taken[status][0] + 1 == fetched_counts[status]:
+            new_cursors[status] = next_keys[status]
+        else:
+            last_item = taken[status][1]
+            new_cursors[status] = {attr: last_item[attr] for attr in INDEX_KEY_ATTRIBUTES[STATUS_INDEX]}
+
+    has_more = any(cursor is not None for cursor in new_cursors.values())
+    return [item for _, _, item in page], (new_cursors if has_more else None)
+
+def get_all_projects(limit: int = DEFAULT_PAGE_SIZE, next_token: Optional[str] = None,
+                     status: Optional[str] = None, user_id: Optional[str] = None,
+                     fields: Optional[List[str]] = None) -> Dict:
+    """
+    Obtiene una página de proyectos de DynamoDB, más recientes primero, sin full-table scan
+    - user_id: query sobre UserIndex (status se aplica como filtro server-side)
+    - status: query sobre StatusIndex
+    - sin filtros: merge de StatusIndex para cada estado conocido
+    - fields: sparse fieldset; solo esos atributos se leen de DynamoDB y se retornan
+    Retorna {'projects': [...], 'nextToken': str|None}
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    cursor = decode_page_token(next_token)
+    fields = fields or list(PROJECT_LIST_FIELDS)
+
+    try:
+        if user_id:
+            logger.info(f"Querying {USER_INDEX} for user {user_id} (status={status})")
+            items, next_cursor = query_index_page(
+                USER_INDEX,
+                Key('userId').eq(user_id),
+                limit,
+                start_key=cursor,
+                filter_expression=Attr('status').eq(status) if status else None,
+                fields=fields
+            )
+        elif status:
+            logger.info(f"Querying {STATUS_INDEX} for status {status}")
+            items, next_cursor = query_index_page(
+                STATUS_INDEX, Key('status').eq(status), limit, start_key=cursor, fields=fields
+            )
+        else:
+            logger.info(f"Merging {STATUS_INDEX} pages for statuses {PROJECT_STATUSES}")
+            items, next_cursor = query_all_statuses_page(limit, cursor, fields=fields)
+
+        logger.info(f"Found {len(items)} projects in DynamoDB")
+
+        return {
+            'projects': [process_project(project, fields) for project in items],
+            'nextToken': encode_page_token(next_cursor)
+        }
+
+    except Exception as e:
+        logger.error(f"Error getting projects from DynamoDB: {str(e)}")
+        return {'projects': [], 'nextToken': None}
+
+def get_project_statistics() -> Dict:
+    """Lee las estadísticas precalculadas (mantenidas por project_stats.stream_handler)"""
+    try:
+        stats = read_statistics()
+        by_status = stats['byStatus']
+        
+        return {
+            'totalProjects': stats['totalProjects'],
+            'completedProjects': by_status.get('completed', 0),
+            'inProgressProjects': by_status.get('in_progress', 0),
+            'totalDocuments': stats['totalDocuments'],
+            'byStatus': by_status,
+            'byType': stats['byType']
+        }
+        
+    except Exception as e:
+        logger.error(f"Error reading project statistics: {str(e)}")
+        return {}
+
 def get_s3_document_urls(s3_folder: str, documents: List[Dict]) -> List[Dict]:
-    """Genera URLs pre-firmadas para documentos en S3"""
+    """Genera URLs pre-firmadas para documentos en S3 (cacheadas y firmadas en paralelo)"""
     try:
-        document_urls = []
+        s3_keys = [f"{s3_folder}/{doc.get('file_name', '')}" for doc in documents]
+        presigned_urls = presign_service.presign_many(DOCUMENTS_BUCKET, s3_keys)
         
-        for doc in documents:
-            s3_key = f"{s3_folder}/{doc.get('file_name', '')}"
-            
-            try:
-                # Generar URL pre-firmada válida por 1 hora
-                presigned_url = s3_client.generate_presigned_url(
-                    'get_object',
-                    Params={'Bucket': DOCUMENTS_BUCKET, 'Key': s3_key},
-                    ExpiresIn=3600
-                )
-                
-                document_urls.append({
-                    'fileName': doc.get('file_name', ''),
-                    'contentType': doc.get('content_type', ''),
-                    's3Key': s3_key,
-                    'downloadUrl': presigned_url
-                })
-                
-            except Exception as e:
-                logger.error(f"Error generating presigned URL for {s3_key}: {str(e)}")
-                document_urls.append({
-                    'fileName': doc.get('file_name', ''),
-                    'contentType': doc.get('content_type', ''),
-                    's3Key': s3_key,
-                    'downloadUrl': None,
-                    'error': 'URL generation failed'
-                })
+        document_urls = []
+        for doc, s3_key in zip(documents, s3_keys):
+            document_url = {
+                'fileName': doc.get('file_name', ''),
+                'contentType': doc.get('content_type', ''),
+                's3Key': s3_key,
+                'downloadUrl': presigned_urls.get(s3_key)
+            }
+            if not document_url['downloadUrl']:
+                document_url['error'] = 'URL generation failed'
+            document_urls.append(document_url)
         
         return document_urls
         
@@ -163,8 +365,12 @@ def get_s3_document_urls(s3_folder: str, documents: List[Dict]) -> List[Dict]:
         logger.error(f"Error processing S3 documents: {str(e)}")
         return []
 
-def get_project_details(project_id: str):
-    """Obtiene detalles completos de un proyecto específico"""
+def get_project_details(project_id: str, include_bundle: bool = False, include_analysis: bool = False):
+    """
+    Obtiene detalles completos de un proyecto específico
+    include_bundle: agrega la URL de un ZIP con todos los documentos (documentBundle)
+    include_analysis: agrega analysis_results decodificado (inline, zlib o S3) como analysisResults
+    """
     try:
         table = dynamodb.Table(PROJECTS_TABLE)
         
@@ -176,20 +382,7 @@ def get_project_details(project_id: str):
         project = response['Item']
         
         # Procesar proyecto con URLs de documentos
-        processed_project = {
-            'projectId': project.get('projectId', ''),
-            'projectName': project.get('projectName', 'Proyecto Sin Nombre'),
-            'projectType': project.get('projectType', 'Solucion AWS'),
-            'status': project.get('status', 'completed'),
-            'createdAt': project.get('createdAt', ''),
-            'updatedAt': project.get('updatedAt', ''),
-            'description': project.get('description', ''),
-            's3Folder': project.get('s3Folder', ''),
-            's3Bucket': project.get('s3Bucket', DOCUMENTS_BUCKET),
-            'documentsGenerated': project.get('documentsGenerated', []),
-            'totalDocuments': project.get('totalDocuments', 0),
-            'estimatedCost': float(project.get('estimatedCost', 0)) if project.get('estimatedCost') else None
-        }
+        processed_project = process_project(project)
         
         # Agregar URLs de descarga si hay documentos
         if project.get('s3Folder') and project.get('documentsGenerated'):
@@ -198,18 +391,198 @@ def get_project_details(project_id: str):
                 project.get('documentsGenerated', [])
             )
         
+        if include_analysis:
+            try:
+                processed_project['analysisResults'] = decode_analysis_results(project, s3_client)
+            except Exception as e:
+                logger.error(f"Error decoding analysis results for {project_id}: {str(e)}")
+                processed_project['analysisResults'] = None
+        
+        if include_bundle and project.get('s3Folder'):
+            try:
+                processed_project['documentBundle'] = presign_service.get_bundle_url(
+                    project.get('s3Bucket', DOCUMENTS_BUCKET),
+                    project.get('s3Folder')
+                )
+            except Exception as e:
+                logger.error(f"Error building document bundle for {project_id}: {str(e)}")
+                processed_project['documentBundle'] = None
+        
         return processed_project
         
     except Exception as e:
         logger.error(f"Error getting project details: {str(e)}")
         return None
 
+def run_project_deletion(project_id: str) -> Dict:
+    """
+    Elimina los archivos S3 del proyecto por lotes y luego el item de DynamoDB
+    Si algún objeto no se pudo borrar el item se conserva con el reporte para reintentar
+    """
+    table = dynamodb.Table(PROJECTS_TABLE)
+    
+    response = table.get_item(Key={'projectId': project_id})
+    if 'Item' not in response:
+        return {'success': False, 'projectId': project_id, 'error': 'Project not found'}
+    
+    project = response['Item']
+    s3_folder = project.get('s3Folder', '')
+    bucket = project.get('s3Bucket', DOCUMENTS_BUCKET)
+    
+    if s3_folder:
+        report = delete_s3_prefix(s3_client, bucket, f"{s3_folder.rstrip('/')}/")
+    else:
+        report = {'success': True, 'deleted': 0, 'failed': 0, 'batches': 0, 'failures': []}
+    
+    # analysis_results grandes viven fuera de la carpeta del proyecto (ver arquitecto/analysis_storage.py)
+    analysis_pointer = project.get('analysis_results_ref')
+    if report['success'] and analysis_pointer:
+        try:
+            s3_client.delete_object(Bucket=analysis_pointer['bucket'], Key=analysis_pointer['key'])
+        except Exception as e:
+            logger.error(f"Error deleting offloaded analysis results for {project_id}: {str(e)}")
+    
+    if report['success']:
+        table.delete_item(Key={'projectId': project_id})
+        logger.info(f"Deleted project {project_id} ({report['deleted']} S3 objects)")
+    else:
+        mark_deletion_failed(project_id, {'report': report})
+        logger.warning(f"Project {project_id} deletion left {report['failed']} S3 objects behind")
+    
+    return {'projectId': project_id, **report}
+
+def mark_deletion_failed(project_id: str, details: Dict) -> None:
+    """
+    Deja el proyecto en 'delete_failed' con deletionJob.state='failed' y el detalle (reporte o error)
+    Así el job nunca queda en 'running' y el proyecto vuelve al listado para reintentar
+    """
+    dynamodb.Table(PROJECTS_TABLE).update_item(
+        Key={'projectId': project_id},
+        UpdateExpression='SET #status = :status, deletionJob = :job, updatedAt = :updated',
+        ConditionExpression='attribute_exists(projectId)',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':status': DELETE_FAILED_STATUS,
+            ':job': {'state': 'failed', 'finishedAt': datetime.now().isoformat(), **details},
+            ':updated': datetime.now().isoformat()
+        }
+    )
+
+def run_deletion_job(project_id: str) -> Dict:
+    """
+    Ejecuta el borrado de una invocación asíncrona
+    Cualquier excepción (listado o borrado en S3, DynamoDB) queda registrada como job fallido
+    en lugar de depender de los reintentos asíncronos de Lambda
+    """
+    try:
+        return run_project_deletion(project_id)
+    except Exception as e:
+        logger.error(f"Deletion job for project {project_id} failed: {str(e)}", exc_info=True)
+        try:
+            mark_deletion_failed(project_id, {'error': str(e)})
+        except Exception as mark_error:
+            logger.error(f"Could not record failed deletion for {project_id}: {str(mark_error)}")
+        return {'success': False, 'projectId': project_id, 'error': str(e)}
+
+def start_project_deletion(project_id: str, function_name: str) -> Optional[Dict]:
+    """
+    Marca el proyecto como 'deleting' y delega el borrado a una invocación asíncrona
+    de esta misma Lambda. Retorna None si el proyecto no existe.
+    """
+    table = dynamodb.Table(PROJECTS_TABLE)
+    job = {'state': 'running', 'startedAt': datetime.now().isoformat()}
+    
+    try:
+        previous = table.update_item(
+            Key={'projectId': project_id},
+            UpdateExpression='SET #status = :status, deletionJob = :job, updatedAt = :updated',
+            ConditionExpression='attribute_exists(projectId)',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':status': DELETING_STATUS,
+                ':job': job,
+                ':updated': datetime.now().isoformat()
+            },
+            ReturnValues='UPDATED_OLD'
+        ).get('Attributes', {})
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+    
+    try:
+        lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'deletionJob': {'projectId': project_id}}).encode('utf-8')
+        )
+    except Exception as e:
+        # Sin job en curso el proyecto no puede quedar oculto como 'deleting': restaurar su estado
+        logger.error(f"Error starting async deletion for {project_id}, rolling back: {str(e)}")
+        restore_deletion_state(project_id, previous)
+        raise
+    
+    logger.info(f"Started async deletion for project {project_id}")
+    return {'projectId': project_id, **job}
+
+def restore_deletion_state(project_id: str, previous: Dict) -> None:
+    """Vuelve status/deletionJob/updatedAt a los valores previos a start_project_deletion"""
+    names = {'#status': 'status', '#job': 'deletionJob', '#updated': 'updatedAt'}
+    assignments, removals, values = [], [], {}
+    for placeholder, attribute in names.items():
+        if attribute in previous:
+            values[f":{attribute}"] = previous[attribute]
+            assignments.append(f"{placeholder} = :{attribute}")
+        else:
+            removals.append(placeholder)
+    
+    update_expression = ' '.join(filter(None, [
+        f"SET {', '.join(assignments)}" if assignments else '',
+        f"REMOVE {', '.join(removals)}" if removals else ''
+    ]))
+    update_kwargs = {
+        'Key': {'projectId': project_id},
+        'UpdateExpression': update_expression,
+        'ExpressionAttributeNames': names
+    }
+    if values:
+        update_kwargs['ExpressionAttributeValues'] = values
+    
+    try:
+        dynamodb.Table(PROJECTS_TABLE).update_item(**update_kwargs)
+    except Exception as e:
+        logger.error(f"Error rolling back deletion state for {project_id}: {str(e)}")
+
+def get_deletion_status(project_id: str) -> Dict:
+    """
+    Estado de la eliminación de un proyecto
+    Cuando termina con éxito el item ya no existe y el estado es 'completed'
+    """
+    table = dynamodb.Table(PROJECTS_TABLE)
+    
+    response = table.get_item(
+        Key={'projectId': project_id},
+        ProjectionExpression='#status, deletionJob',
+        ExpressionAttributeNames={'#status': 'status'}
+    )
+    
+    if 'Item' not in response:
+        return {'projectId': project_id, 'state': 'completed'}
+    
+    job = response['Item'].get('deletionJob')
+    if not job:
+        return {'projectId': project_id, 'state': 'not_started', 'status': response['Item'].get('status')}
+    
+    return {'projectId': project_id, **job}
+
 def lambda_handler(event, context):
     """Main Lambda handler para Projects API"""
     
     try:
         logger.info(f"Event received: {json.dumps(event, default=str)}")
         
+        # Invocación asíncrona del job de eliminación (ver start_project_deletion)
+        if event.get('deletionJob'):
+            return run_deletion_job(event['deletionJob']['projectId'])
+        
         # Handle CORS preflight requests
         if event.get('httpMethod') == 'OPTIONS':
             logger.info("Handling OPTIONS preflight request")
@@ -221,27 +594,51 @@ def lambda_handler(event, context):
         
         # GET /projects - Obtener todos los proyectos
         if http_method == 'GET' and not path_parameters.get('projectId'):
-            logger.info("Getting all projects")
+            logger.info("Getting projects page")
+            
+            try:
+                page = get_all_projects(
+                    limit=int(query_parameters.get('limit') or DEFAULT_PAGE_SIZE),
+                    next_token=query_parameters.get('nextToken'),
+                    status=query_parameters.get('status'),
+                    user_id=query_parameters.get('userId'),
+                    fields=parse_fields(query_parameters.get('fields'))
+                )
+            except ValueError as e:
+                # limit no numérico, nextToken inválido (InvalidPageToken) o campos desconocidos
+                return create_error_response(400, str(e))
             
-            projects = get_all_projects()
-            statistics = get_project_statistics(projects)
+            projects = page['projects']
+            statistics = get_project_statistics()
             
             response_data = {
                 'projects': projects,
                 'statistics': statistics,
                 'total': len(projects),
+                'nextToken': page['nextToken'],
                 'timestamp': datetime.now().isoformat()
             }
             
             logger.info(f"Returning {len(projects)} projects with statistics")
             return create_success_response(response_data)
         
+        # GET /projects/{projectId}/deletion - Estado de una eliminación asíncrona
+        elif http_method == 'GET' and path_parameters.get('projectId') and event.get('path', '').rstrip('/').endswith('/deletion'):
+            project_id = path_parameters['projectId']
+            logger.info(f"Getting deletion status for: {project_id}")
+            
+            return create_success_response(get_deletion_status(project_id))
+        
         # GET /projects/{projectId} - Obtener proyecto específico
         elif http_method == 'GET' and path_parameters.get('projectId'):
             project_id = path_parameters['projectId']
             logger.info(f"Getting project details for: {project_id}")
             
-            project = get_project_details(project_id)
+            project = get_project_details(
+                project_id,
+                include_bundle=query_parameters.get('bundle', '').lower() == 'true',
+                include_analysis='analysis' in query_parameters.get('include', '').split(',')
+            )
             
             if not project:
                 return create_error_response(404, f'Project not found: {project_id}')
@@ -254,8 +651,23 @@ def lambda_handler(event, context):
             project_id = path_parameters['projectId']
             logger.info(f"Deleting project: {project_id}")
             
-            # TODO: Implementar eliminación de proyecto y archivos S3
-            return create_error_response(501, 'Delete functionality not implemented yet')
+            # ?async=true para proyectos grandes: responde 202 y se consulta GET .../deletion
+            if query_parameters.get('async', '').lower() == 'true':
+                job = start_project_deletion(project_id, context.function_name)
+                if not job:
+                    return create_error_response(404, f'Project not found: {project_id}')
+                return create_response(202, {
+                    **job,
+                    'statusUrl': f"/projects/{project_id}/deletion"
+                })
+            
+            result = run_project_deletion(project_id)
+            
+            if result.get('error') == 'Project not found':
+                return create_error_response(404, f'Project not found: {project_id}')
+            
+            # 207: el item se conserva y el reporte lista los objetos que no se borraron
+            return create_response(200 if result['success'] else 207, result)
         
         else:
             return create_error_response(400, f'Unsupported method or path: {http_method}')
@@ -12,6 +12,10 @@ from decimal import Decimal
 from typing import Dict, List, Any
 from boto3.dynamodb.conditions import Key, Attr
 
+from presign_service import PresignService
+from project_deletion import delete_s3_prefix
+from project_stats import read_statistics
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -20,10 +24,16 @@ logger.setLevel(logging.INFO)
 s3_client = boto3.client('s3', region_name='us-east-1')
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 
+# URLs pre-firmadas cacheadas entre invocaciones warm
+presign_service = PresignService(s3_client)
+
 # Variables de entorno
 DOCUMENTS_BUCKET = os.environ.get('DOCUMENTS_BUCKET', 'aws-propuestas-v3-documents-prod-035385358261')
 PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'aws-propuestas-v3-projects-prod')
 
+# Estados aceptados: GET /projects (app.py) solo lista los estados de PROJECT_STATUSES en StatusIndex
+VALID_STATUSES = ('completado', 'en-progreso', 'error')
+
 def get_cors_headers():
     """Get standard CORS headers for all responses"""
     return {
@@ -127,54 +137,35 @@ def delete_project(project_id: str) -> Dict:
         if not project:
             return {"success": False, "error": "Project not found"}
         
-        # Eliminar archivos de S3 si existen
+        # Eliminar archivos de S3 por lotes de hasta 1000 keys
         s3_folder = project.get('s3Folder', '')
+        report = None
         if s3_folder:
-            try:
-                # Listar objetos en la carpeta
-                response = s3_client.list_objects_v2(
-                    Bucket=DOCUMENTS_BUCKET,
-                    Prefix=f"{s3_folder}/"
-                )
-                
-                # Eliminar cada objeto
-                if 'Contents' in response:
-                    for obj in response['Contents']:
-                        s3_client.delete_object(
-                            Bucket=DOCUMENTS_BUCKET,
-                            Key=obj['Key']
-                        )
-                        logger.info(f"Deleted S3 object: {obj['Key']}")
-                
-            except Exception as e:
-                logger.error(f"Error deleting S3 files: {str(e)}")
+            report = delete_s3_prefix(s3_client, DOCUMENTS_BUCKET, f"{s3_folder}/")
+            if not report['success']:
+                # Conservar el proyecto para poder reintentar sobre los objetos restantes
+                return {"success": False, "error": "Some S3 objects could not be deleted", "report": report}
         
         # Eliminar proyecto de DynamoDB
         table = dynamodb.Table(PROJECTS_TABLE)
         table.delete_item(Key={'id': project_id})
         
         logger.info(f"Deleted project {project_id}")
-        return {"success": True, "message": "Project deleted successfully"}
+        return {"success": True, "message": "Project deleted successfully", "report": report}
         
     except Exception as e:
         logger.error(f"Error deleting project {project_id}: {str(e)}")
         return {"success": False, "error": str(e)}
 
-def generate_presigned_url(s3_key: str, expiration: int = 3600) -> str:
-    """Genera una URL firmada para descargar un archivo de S3"""
-    try:
-        url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': DOCUMENTS_BUCKET, 'Key': s3_key},
-            ExpiresIn=expiration
-        )
-        return url
-    except Exception as e:
-        logger.error(f"Error generating presigned URL for {s3_key}: {str(e)}")
-        return ""
+def generate_presigned_url(s3_key: str) -> str:
+    """Genera (o reutiliza del cache) una URL firmada para descargar un archivo de S3"""
+    return presign_service.presign(DOCUMENTS_BUCKET, s3_key) or ""
 
-def get_project_files(project_id: str) -> Dict:
-    """Obtiene las URLs de descarga para los archivos de un proyecto"""
+def get_project_files(project_id: str, include_bundle: bool = False) -> Dict:
+    """
+    Obtiene las URLs de descarga para los archivos de un proyecto
+    include_bundle: agrega la URL de un ZIP con todos los archivos
+    """
     try:
         project = get_project_by_id(project_id)
         
@@ -195,22 +186,35 @@ def get_project_files(project_id: str) -> Dict:
             'svg': 'diagram.svg'
         }
         
-        for file_type, filename in file_types.items():
-            if project.get('files', {}).get(file_type, False):
-                s3_key = f"{s3_folder}/{filename}"
-                presigned_url = generate_presigned_url(s3_key)
-                if presigned_url:
-                    file_urls[file_type] = {
-                        'url': presigned_url,
-                        'filename': filename,
-                        's3_key': s3_key
-                    }
+        available = {
+            file_type: f"{s3_folder}/{filename}"
+            for file_type, filename in file_types.items()
+            if project.get('files', {}).get(file_type, False)
+        }
+        presigned_urls = presign_service.presign_many(DOCUMENTS_BUCKET, list(available.values()))
+        
+        for file_type, s3_key in available.items():
+            presigned_url = presigned_urls.get(s3_key)
+            if presigned_url:
+                file_urls[file_type] = {
+                    'url': presigned_url,
+                    'filename': file_types[file_type],
+                    's3_key': s3_key
+                }
+        
+        bundle = None
+        if include_bundle:
+            try:
+                bundle = presign_service.get_bundle_url(DOCUMENTS_BUCKET, s3_folder)
+            except Exception as e:
+                logger.error(f"Error building bundle for {project_id}: {str(e)}")
         
         return {
             "success": True,
             "project_id": project_id,
             "s3_folder": s3_folder,
-            "files": file_urls
+            "files": file_urls,
+            "bundle": bundle
         }
         
     except Exception as e:
@@ -219,6 +223,9 @@ def get_project_files(project_id: str) -> Dict:
 
 def update_project_status(project_id: str, status: str) -> Dict:
     """Actualiza el estado de un proyecto"""
+    if status not in VALID_STATUSES:
+        return {"success": False, "error": f"Invalid status '{status}'. Allowed: {', '.join(VALID_STATUSES)}"}
+    
     try:
         table = dynamodb.Table(PROJECTS_TABLE)
         
@@ -243,24 +250,24 @@ def update_project_status(project_id: str, status: str) -> Dict:
         return {"success": False, "error": str(e)}
 
 def get_project_statistics() -> Dict:
-    """Obtiene estadisticas de los proyectos"""
+    """Obtiene estadisticas precalculadas de los proyectos (sin scan)"""
     try:
-        projects = get_all_projects()
-        
-        stats = {
-            "total_projects": len(projects),
-            "completed_projects": len([p for p in projects if p.get('status') == 'completado']),
-            "in_progress_projects": len([p for p in projects if p.get('status') == 'en-progreso']),
-            "error_projects": len([p for p in projects if p.get('status') == 'error']),
-            "total_files": sum(len([f for f in p.get('files', {}).values() if f]) for p in projects),
+        stats = read_statistics()
+        by_status = stats['byStatus']
+        by_type = stats['byType']
+        
+        return {
+            "total_projects": stats['totalProjects'],
+            "completed_projects": by_status.get('completado', 0),
+            "in_progress_projects": by_status.get('en-progreso', 0),
+            "error_projects": by_status.get('error', 0),
+            "total_files": stats['totalDocuments'],
             "by_type": {
-                "servicio_rapido": len([p for p in projects if p.get('type') == 'servicio-rapido']),
-                "solucion_integral": len([p for p in projects if p.get('type') == 'solucion-integral'])
+                "servicio_rapido": by_type.get('servicio-rapido', 0),
+                "solucion_integral": by_type.get('solucion-integral', 0)
             }
         }
         
-        return stats
-        
     except Exception as e:
         logger.error(f"Error getting project statistics: {str(e)}")
         return {}
@@ -308,7 +315,10 @@ def lambda_handler(event, context):
             elif path.startswith('/projects/') and '/files' in path:
                 # Get project files - /projects/{id}/files
                 project_id = path.split('/')[2]
-                files_info = get_project_files(project_id)
+                files_info = get_project_files(
+                    project_id,
+                    include_bundle=query_parameters.get('bundle', '').lower() == 'true'
+                )
                 return create_success_response(files_info)
                 
             elif path.startswith('/projects/'):
@@ -0,0 +1,173 @@
+"""
+AWS Propuestas v3 - Servicio de URLs pre-firmadas para documentos de proyectos
+Cachea cada URL por (bucket, key) durante la mayor parte de su validez, firma los misses
+en paralelo y puede armar un ZIP "descargar todo" con los documentos de la carpeta.
+"""
+
+import gzip
+import os
+import logging
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Configuración (sobrescribible por variables de entorno)
+PRESIGN_EXPIRES_SECONDS = int(os.environ.get('PRESIGN_EXPIRES_SECONDS', '3600'))
+# Una URL se reutiliza mientras le quede más de este porcentaje de validez
+PRESIGN_REUSE_RATIO = float(os.environ.get('PRESIGN_REUSE_RATIO', '0.8'))
+PRESIGN_CACHE_MAX_ENTRIES = int(os.environ.get('PRESIGN_CACHE_MAX_ENTRIES', '2048'))
+PRESIGN_MAX_WORKERS = int(os.environ.get('PRESIGN_MAX_WORKERS', '8'))
+BUNDLE_FOLDER = '_bundle'
+BUNDLE_FILE_NAME = 'documentos.zip'
+
+
+class PresignService:
+    """Genera y cachea URLs pre-firmadas de get_object, compartidas entre invocaciones warm"""
+
+    def __init__(self, s3_client, expires_in: int = PRESIGN_EXPIRES_SECONDS,
+                 reuse_ratio: float = PRESIGN_REUSE_RATIO,
+                 max_entries: int = PRESIGN_CACHE_MAX_ENTRIES,
+                 max_workers: int = PRESIGN_MAX_WORKERS):
+        self.s3_client = s3_client
+        self.expires_in = expires_in
+        self.reuse_seconds = expires_in * reuse_ratio
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self._cache: 'OrderedDict[Tuple[str, str], Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, bucket: str, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get((bucket, key))
+            if entry is None:
+                return None
+            reuse_until, url = entry
+            if reuse_until <= time.monotonic():
+                del self._cache[(bucket, key)]
+                return None
+            self._cache.move_to_end((bucket, key))
+            return url
+
+    def _store(self, bucket: str, key: str, url: str, signed_at: float) -> None:
+        with self._lock:
+            self._cache[(bucket, key)] = (signed_at + self.reuse_seconds, url)
+            self._cache.move_to_end((bucket, key))
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _sign(self, bucket: str, key: str) -> Optional[str]:
+        signed_at = time.monotonic()
+        try:
+            url = self.s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': bucket, 'Key': key},
+                ExpiresIn=self.expires_in
+            )
+        except Exception as e:
+            logger.error(f"Error generating presigned URL for {key}: {str(e)}")
+            return None
+        self._store(bucket, key, url, signed_at)
+        return url
+
+    def presign(self, bucket: str, key: str) -> Optional[str]:
+        """URL pre-firmada para un solo objeto"""
+        return self.presign_many(bucket, [key]).get(key)
+
+    def presign_many(self, bucket: str, keys: List[str]) -> Dict[str, Optional[str]]:
+        """
+        URLs pre-firmadas para varios objetos del mismo bucket
+        Los hits salen del cache; los misses se firman en paralelo. None indica un error de firma.
+        """
+        urls: Dict[str, Optional[str]] = {}
+        misses = []
+        for key in dict.fromkeys(keys):
+            url = self._cached(bucket, key)
+            if url is None:
+                misses.append(key)
+            else:
+                urls[key] = url
+
+        self.hits += len(urls)
+        self.misses += len(misses)
+
+        if len(misses) == 1:
+            urls[misses[0]] = self._sign(bucket, misses[0])
+        elif misses:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(misses))) as executor:
+                for key, url in zip(misses, executor.map(lambda key: self._sign(bucket, key), misses)):
+                    urls[key] = url
+
+        return urls
+
+    def get_bundle_url(self, bucket: str, s3_folder: str) -> Optional[Dict]:
+        """
+        URL de un ZIP con todos los documentos de la carpeta
+        El ZIP se reconstruye solo si algún documento es más nuevo que el existente
+        """
+        bundle_key = f"{s3_folder}/{BUNDLE_FOLDER}/{BUNDLE_FILE_NAME}"
+        documents = []
+        bundle_modified = None
+
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=f"{s3_folder}/"):
+            for obj in page.get('Contents', []):
+                if obj['Key'] == bundle_key:
+                    bundle_modified = obj['LastModified']
+                elif f"/{BUNDLE_FOLDER}/" not in obj['Key']:
+                    documents.append(obj)
+
+        if not documents:
+            return None
+
+        latest_document = max(obj['LastModified'] for obj in documents)
+        if bundle_modified is None or bundle_modified < latest_document:
+            self._build_bundle(bucket, s3_folder, bundle_key, documents)
+            with self._lock:
+                self._cache.pop((bucket, bundle_key), None)
+
+        return {
+            'fileName': BUNDLE_FILE_NAME,
+            's3Key': bundle_key,
+            'fileCount': len(documents),
+            'downloadUrl': self.presign(bucket, bundle_key)
+        }
+
+    def _build_bundle(self, bucket: str, s3_folder: str, bundle_key: str, documents: List[Dict]) -> None:
+        """Descarga los documentos a un ZIP en /tmp y lo sube junto a ellos"""
+        started = time.perf_counter()
+        with tempfile.TemporaryFile(dir='/tmp' if os.path.isdir('/tmp') else None) as bundle_file:
+            with zipfile.ZipFile(bundle_file, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+                for obj in documents:
+                    arcname = obj['Key'][len(s3_folder) + 1:]
+                    response = self.s3_client.get_object(Bucket=bucket, Key=obj['Key'])
+                    body = response['Body']
+                    # Los artefactos de texto se guardan con Content-Encoding: gzip
+                    if response.get('ContentEncoding') == 'gzip':
+                        body = gzip.GzipFile(fileobj=body)
+                    with bundle.open(arcname, 'w') as entry:
+                        shutil.copyfileobj(body, entry, 1024 * 1024)
+
+            bundle_file.seek(0)
+            self.s3_client.upload_fileobj(
+                bundle_file, bucket, bundle_key,
+                ExtraArgs={'ContentType': 'application/zip'}
+            )
+
+        logger.info(f"Built bundle {bundle_key} with {len(documents)} documents "
+                    f"in {round((time.perf_counter() - started) * 1000, 2)}ms")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = len(self._cache)
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,104 @@
+"""
+AWS Propuestas v3 - Backfill de las llaves de los GSIs de proyectos
+GET /projects solo lee UserIndex y StatusIndex, que son sparse: un item sin status o sin
+createdAt numérico no aparece en el listado. Este job recorre la tabla una vez y completa
+createdAt (epoch a partir de createdAt/created_at/updatedAt en ISO) y status.
+"""
+
+import boto3
+import os
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Any, Optional
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('REGION', 'us-east-1'))
+
+# Variables de entorno
+PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'aws-propuestas-v3-projects-prod')
+
+# Estado que asume process_project cuando falta
+DEFAULT_STATUS = 'completed'
+
+
+def to_epoch(value: Any) -> Optional[int]:
+    """Epoch en segundos desde un número o un string ISO 8601; None si no se puede interpretar"""
+    if isinstance(value, (int, float, Decimal)):
+        return int(value)
+    if isinstance(value, str) and value:
+        try:
+            return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+        except ValueError:
+            return None
+    return None
+
+
+def index_key_updates(project: Dict[str, Any]) -> Dict[str, Any]:
+    """Atributos que le faltan a un item para entrar en los índices (vacío si ya está indexado)"""
+    updates = {}
+
+    if not isinstance(project.get('createdAt'), (int, float, Decimal)):
+        created_at = None
+        for attribute in ('createdAt', 'created_at', 'updatedAt', 'updated_at'):
+            created_at = to_epoch(project.get(attribute))
+            if created_at is not None:
+                break
+        # Sin ninguna fecha el proyecto queda al final del listado
+        updates['createdAt'] = created_at if created_at is not None else 0
+
+    if not project.get('status'):
+        updates['status'] = DEFAULT_STATUS
+
+    return updates
+
+
+def backfill_index_keys(dry_run: bool = False) -> Dict[str, Any]:
+    """Scan paginado que completa createdAt/status; idempotente, se puede reejecutar"""
+    table = dynamodb.Table(PROJECTS_TABLE)
+    report = {'scanned': 0, 'updated': 0, 'failed': 0, 'dryRun': dry_run}
+    scan_kwargs = {
+        'ProjectionExpression': 'projectId, createdAt, created_at, updatedAt, updated_at, #status',
+        'ExpressionAttributeNames': {'#status': 'status'}
+    }
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        for project in response.get('Items', []):
+            report['scanned'] += 1
+            updates = index_key_updates(project)
+            if not updates or 'projectId' not in project:
+                continue
+            if dry_run:
+                report['updated'] += 1
+                continue
+
+            names = {f"#a{index}": name for index, name in enumerate(updates)}
+            values = {f":a{index}": value for index, value in enumerate(updates.values())}
+            try:
+                table.update_item(
+                    Key={'projectId': project['projectId']},
+                    UpdateExpression='SET ' + ', '.join(f"{name} = :{name[1:]}" for name in names),
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=values
+                )
+                report['updated'] += 1
+            except Exception as e:
+                logger.error(f"Error backfilling {project['projectId']}: {str(e)}")
+                report['failed'] += 1
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    logger.info(f"Backfill of project index keys: {report}")
+    return report
+
+
+def backfill_handler(event, context):
+    """Job invocable manualmente ({"dryRun": true} solo cuenta los items a corregir)"""
+    return backfill_index_keys(dry_run=bool((event or {}).get('dryRun')))
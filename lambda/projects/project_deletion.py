@@ -0,0 +1,83 @@
+"""
+AWS Propuestas v3 - Borrado por lotes de los archivos S3 de un proyecto
+Lista la carpeta con paginación y envía lotes de delete_objects (hasta 1000 keys)
+en paralelo, reportando qué keys fallaron.
+"""
+
+import os
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Límite de keys por request de delete_objects impuesto por S3
+MAX_KEYS_PER_BATCH = 1000
+DELETE_MAX_WORKERS = int(os.environ.get('DELETE_MAX_WORKERS', '4'))
+# Máximo de fallos individuales que se incluyen en el reporte
+MAX_REPORTED_FAILURES = int(os.environ.get('DELETE_MAX_REPORTED_FAILURES', '100'))
+
+
+def _delete_batch(s3_client, bucket: str, keys: List[str]) -> Dict[str, Any]:
+    """Un request delete_objects; los errores por key vienen en la respuesta, no como excepción"""
+    try:
+        response = s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+        )
+        return {
+            'deleted': len(keys) - len(response.get('Errors', [])),
+            'errors': [
+                {'key': error.get('Key'), 'code': error.get('Code'), 'message': error.get('Message')}
+                for error in response.get('Errors', [])
+            ]
+        }
+    except Exception as e:
+        logger.error(f"Error deleting batch of {len(keys)} objects: {str(e)}")
+        return {
+            'deleted': 0,
+            'errors': [{'key': key, 'code': 'BatchFailed', 'message': str(e)} for key in keys]
+        }
+
+
+def delete_s3_prefix(s3_client, bucket: str, prefix: str,
+                     max_workers: int = DELETE_MAX_WORKERS) -> Dict[str, Any]:
+    """
+    Borra todos los objetos bajo el prefijo
+    Cada página del listado (hasta 1000 keys) se envía como un lote mientras se sigue listando
+    Retorna {'success', 'deleted', 'failed', 'batches', 'failures', 'duration_ms'}
+    """
+    started = time.perf_counter()
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        paginator = s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=bucket,
+            Prefix=prefix,
+            PaginationConfig={'PageSize': MAX_KEYS_PER_BATCH}
+        )
+        for page in pages:
+            keys = [obj['Key'] for obj in page.get('Contents', [])]
+            for start in range(0, len(keys), MAX_KEYS_PER_BATCH):
+                batch = keys[start:start + MAX_KEYS_PER_BATCH]
+                futures.append(executor.submit(_delete_batch, s3_client, bucket, batch))
+
+        results = [future.result() for future in futures]
+
+    failures = [error for result in results for error in result['errors']]
+    report = {
+        'success': not failures,
+        'deleted': sum(result['deleted'] for result in results),
+        'failed': len(failures),
+        'batches': len(results),
+        'failures': failures[:MAX_REPORTED_FAILURES],
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+    logger.info(f"Deleted {report['deleted']} objects under {prefix} in {report['batches']} batches "
+                f"({report['failed']} failed, {report['duration_ms']}ms)")
+    return report
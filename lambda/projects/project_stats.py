@@ -0,0 +1,279 @@
+"""
+AWS Propuestas v3 - Estadísticas precalculadas de proyectos
+Un único item agregado con contadores por estado y tipo más el total de documentos,
+mantenido incrementalmente desde el DynamoDB Stream de la tabla de proyectos.
+La lectura del dashboard es un get_item: O(1) sin importar el tamaño de la tabla.
+
+El agregado está versionado: cada batch del stream incrementa version, y solo se aplica sobre un
+agregado ya inicializado por un rebuild (rebuiltAt). El rebuild escribe con una condición sobre la
+version que leyó antes del scan, así nunca pisa deltas que llegaron mientras escaneaba.
+"""
+
+import boto3
+import os
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Any, Optional
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('REGION', 'us-east-1'))
+
+# Variables de entorno
+PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'aws-propuestas-v3-projects-prod')
+PROJECT_STATS_TABLE = os.environ.get('PROJECT_STATS_TABLE', 'aws-propuestas-v3-project-stats-prod')
+# Espera tras el scan para que el stream entregue los cambios hechos durante el scan
+# (MaximumBatchingWindowInSeconds del mapping más margen)
+STATS_STREAM_SETTLE_SECONDS = float(os.environ.get('STATS_STREAM_SETTLE_SECONDS', '15'))
+STATS_REBUILD_MAX_ATTEMPTS = int(os.environ.get('STATS_REBUILD_MAX_ATTEMPTS', '3'))
+
+# Llave del item agregado
+STATS_ID = 'global'
+
+# Prefijos de los contadores dinámicos (un atributo numérico por valor)
+STATUS_PREFIX = 'status#'
+TYPE_PREFIX = 'type#'
+
+_deserializer = TypeDeserializer()
+
+
+def project_contribution(project: Optional[Dict[str, Any]]) -> Counter:
+    """
+    Aporte de un proyecto a los contadores
+    Soporta ambos esquemas: projectType/totalDocuments (app.py) y type/files (app_fixed.py)
+    """
+    if not project:
+        return Counter()
+
+    contribution = Counter({'totalProjects': 1})
+
+    status = project.get('status')
+    if status:
+        contribution[f"{STATUS_PREFIX}{status}"] += 1
+
+    project_type = project.get('projectType') or project.get('type')
+    if project_type:
+        contribution[f"{TYPE_PREFIX}{project_type}"] += 1
+
+    if project.get('totalDocuments') is not None:
+        documents = int(project.get('totalDocuments') or 0)
+    else:
+        documents = len([f for f in (project.get('files') or {}).values() if f])
+    if documents:
+        contribution['totalDocuments'] += documents
+
+    return contribution
+
+
+def compute_delta(old_image: Optional[Dict], new_image: Optional[Dict]) -> Dict[str, int]:
+    """Diferencia de contadores entre la imagen anterior y la nueva de un item"""
+    delta = Counter(project_contribution(new_image))
+    delta.subtract(project_contribution(old_image))
+    return {counter: value for counter, value in delta.items() if value}
+
+
+def deserialize_image(image: Optional[Dict]) -> Optional[Dict]:
+    """Convierte una imagen del stream ({'S': ...}) a un dict de Python"""
+    if not image:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+
+def is_conditional_check_failure(error: Exception) -> bool:
+    return isinstance(error, ClientError) and \
+        error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+
+def apply_delta(delta: Dict[str, int]) -> bool:
+    """
+    Aplica el delta y suma 1 a version en un solo UpdateItem atómico con ADD
+    Si falla no se aplica nada, así el reintento del batch no cuenta dos veces
+    Retorna False si el agregado todavía no fue inicializado por un rebuild
+    """
+    if not delta:
+        return True
+
+    names = {}
+    values = {':updated': datetime.now().isoformat(), ':one': 1}
+    additions = ['version :one']
+    for index, (counter, value) in enumerate(sorted(delta.items())):
+        names[f"#c{index}"] = counter
+        values[f":v{index}"] = value
+        additions.append(f"#c{index} :v{index}")
+
+    table = dynamodb.Table(PROJECT_STATS_TABLE)
+    try:
+        table.update_item(
+            Key={'statsId': STATS_ID},
+            UpdateExpression=f"ADD {', '.join(additions)} SET updatedAt = :updated",
+            # Sin rebuild previo el item solo contaría los proyectos tocados desde el deploy
+            ConditionExpression='attribute_exists(rebuiltAt)',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if is_conditional_check_failure(e):
+            return False
+        raise
+    return True
+
+
+def stream_handler(event, context):
+    """
+    Handler del DynamoDB Stream de la tabla de proyectos (NEW_AND_OLD_IMAGES)
+    Acumula los deltas de todo el batch (INSERT, MODIFY y REMOVE) y los aplica de una vez
+    """
+    batch_delta = Counter()
+    records = event.get('Records', [])
+
+    for record in records:
+        images = record.get('dynamodb', {})
+        delta = compute_delta(
+            deserialize_image(images.get('OldImage')),
+            deserialize_image(images.get('NewImage'))
+        )
+        batch_delta.update(delta)
+
+    batch_delta = {counter: value for counter, value in batch_delta.items() if value}
+    if not apply_delta(batch_delta):
+        # Los cambios de este batch ya están en la tabla, así que el scan del rebuild los incluye;
+        # el mapping no entrega el siguiente batch del shard hasta que este termine
+        logger.info("Project statistics aggregate not initialized, rebuilding instead of applying the batch")
+        if rebuild_statistics(settle_seconds=0) is None and not apply_delta(batch_delta):
+            raise RuntimeError('Project statistics aggregate could not be initialized')
+
+    logger.info(f"Applied statistics delta from {len(records)} stream records: {batch_delta}")
+    return {'records': len(records), 'delta': batch_delta}
+
+
+def scan_totals() -> Counter:
+    """Contadores de todos los proyectos con un scan paginado"""
+    table = dynamodb.Table(PROJECTS_TABLE)
+    totals = Counter()
+    scan_kwargs = {
+        'ProjectionExpression': '#status, projectType, #type, totalDocuments, files',
+        'ExpressionAttributeNames': {'#status': 'status', '#type': 'type'}
+    }
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        for project in response.get('Items', []):
+            totals.update(project_contribution(project))
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return totals
+
+
+def rebuild_statistics(settle_seconds: float = STATS_STREAM_SETTLE_SECONDS,
+                       max_attempts: int = STATS_REBUILD_MAX_ATTEMPTS) -> Optional[Dict[str, Any]]:
+    """
+    Recalcula el agregado desde cero y lo reemplaza solo si ningún batch del stream lo modificó
+    desde que empezó el scan (la version no cambió); si no, vuelve a intentar
+    Inicializa el agregado la primera vez y corrige cualquier deriva
+    Retorna el item escrito, o None si todos los intentos perdieron contra el stream
+    (el agregado queda como lo mantiene el stream)
+    """
+    table = dynamodb.Table(PROJECT_STATS_TABLE)
+
+    for attempt in range(1, max_attempts + 1):
+        current = table.get_item(Key={'statsId': STATS_ID}, ConsistentRead=True).get('Item')
+        if current is None or 'rebuiltAt' not in current:
+            # Un item sin rebuiltAt solo tiene ADDs de antes de la inicialización: se descarta
+            condition, values, version = 'attribute_not_exists(rebuiltAt)', None, 0
+        elif 'version' in current:
+            version = int(current['version'])
+            condition, values = 'version = :version', {':version': version}
+        else:
+            condition, values, version = 'attribute_not_exists(version)', None, 0
+
+        totals = scan_totals()
+        # Los cambios hechos durante el scan llegan por el stream y mueven version
+        if settle_seconds:
+            time.sleep(settle_seconds)
+
+        now = datetime.now().isoformat()
+        item = {
+            'statsId': STATS_ID,
+            'totalProjects': totals.get('totalProjects', 0),
+            'totalDocuments': totals.get('totalDocuments', 0),
+            'version': version,
+            'updatedAt': now,
+            'rebuiltAt': now
+        }
+        item.update({counter: value for counter, value in totals.items() if value})
+
+        put_kwargs = {'Item': item, 'ConditionExpression': condition}
+        if values:
+            put_kwargs['ExpressionAttributeValues'] = values
+        try:
+            table.put_item(**put_kwargs)
+        except ClientError as e:
+            if not is_conditional_check_failure(e):
+                raise
+            logger.info(f"Project statistics changed during rebuild attempt {attempt}, retrying")
+            continue
+
+        logger.info(f"Rebuilt project statistics: {item}")
+        return item
+
+    logger.warning(f"Project statistics rebuild gave up after {max_attempts} attempts; keeping the stream aggregate")
+    return None
+
+
+def rebuild_handler(event, context):
+    """Job de reconstrucción invocable manualmente o por un schedule"""
+    item = rebuild_statistics()
+    if item is None:
+        return {'rebuilt': False}
+    return format_statistics(item)
+
+
+def format_statistics(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Agrupa los contadores planos del item en byStatus/byType"""
+    by_status = {}
+    by_type = {}
+    for key, value in item.items():
+        # Un contador que bajó a cero (p. ej. todos los proyectos cambiaron de estado) no se muestra
+        if key.startswith(STATUS_PREFIX) and int(value):
+            by_status[key[len(STATUS_PREFIX):]] = int(value)
+        elif key.startswith(TYPE_PREFIX) and int(value):
+            by_type[key[len(TYPE_PREFIX):]] = int(value)
+
+    return {
+        'totalProjects': int(item.get('totalProjects', 0)),
+        'totalDocuments': int(item.get('totalDocuments', 0)),
+        'byStatus': by_status,
+        'byType': by_type,
+        'updatedAt': item.get('updatedAt')
+    }
+
+
+def read_statistics() -> Dict[str, Any]:
+    """
+    Lee el agregado (un get_item)
+    Si todavía no fue inicializado (sin rebuiltAt) se construye una vez con rebuild_statistics
+    """
+    table = dynamodb.Table(PROJECT_STATS_TABLE)
+    response = table.get_item(Key={'statsId': STATS_ID}, ConsistentRead=False)
+
+    item = response.get('Item')
+    if item is None or 'rebuiltAt' not in item:
+        logger.info("Project statistics aggregate not initialized, rebuilding")
+        # Sin espera: los ADDs del stream fallan hasta que el agregado esté inicializado
+        item = rebuild_statistics(settle_seconds=0)
+        if item is None:
+            item = table.get_item(Key={'statsId': STATS_ID}, ConsistentRead=True).get('Item') or {}
+
+    return format_statistics({
+        key: int(value) if isinstance(value, Decimal) else value
+        for key, value in item.items()
+    })
@@ -63,6 +63,24 @@ export const AVAILABLE_MODELS: Model[] = [
   }
 ]
 
+// 'auto' no es un modelo de Bedrock: el chat deja que model_router elija el tier rápido o fuerte
+// según la complejidad del turno. Cualquier otro id se envía como override del usuario.
+export const AUTO_MODEL_ID = 'auto'
+
+export const CHAT_MODELS: Model[] = [
+  {
+    id: AUTO_MODEL_ID,
+    name: 'Automático',
+    provider: 'Router',
+    description: 'Elige un modelo rápido o uno avanzado según la complejidad de cada mensaje',
+    maxTokens: 4096,
+    contextWindow: 32000,
+    capabilities: ['chat'],
+    icon: '⚡'
+  },
+  ...AVAILABLE_MODELS
+]
+
 // Configuraciones de temperatura optimizadas para proyectos AWS
 export const AWS_TEMPERATURE_CONFIGS = {
   arquitecto: 0.3,        // Baja para arquitecturas precisas y consistentes
@@ -258,6 +276,7 @@ export interface ChatStore {
   currentSessionId: string | null
   isLoading: boolean
   selectedModel: string
+  chatModel: string
   messages: Message[] // Computed property for current session messages
   addSession: (session: ChatSession) => void
   setCurrentSession: (sessionId: string) => void
@@ -268,6 +287,7 @@ export interface ChatStore {
   deleteSession: (sessionId: string) => void
   setLoading: (loading: boolean) => void
   setSelectedModel: (modelId: string) => void
+  setChatModel: (modelId: string) => void
 }
 
 export interface ArquitectoFlow {
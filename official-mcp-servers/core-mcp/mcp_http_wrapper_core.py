@@ -3,18 +3,18 @@ HTTP wrapper for core MCP server with path prefix support
 """
 
 import asyncio
-import json
 import logging
-import subprocess
-import sys
-from typing import Any, Dict, List, Optional
-import argparse
+from typing import Any, Dict, Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 
+from mcp_process_pool import MCPProcessPool
+from mcp_result_cache import MCPResultCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -47,23 +47,43 @@ async def root():
         "endpoints": ["/core/health", "/core/tools", "/core/call-tool"]
     }
 
+@app.get("/health/live")
+@app.get("/core/health/live")
+async def liveness_check():
+    """Liveness check for the container HEALTHCHECK: the HTTP server is up"""
+    return {
+        "status": "alive",
+        "service": "core-mcp",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 @app.get("/health")
 @app.get("/core/health")
+@app.get("/health/ready")
+@app.get("/core/health/ready")
 async def health_check():
-    """Health check endpoint for ALB"""
-    return {
-        "status": "healthy", 
+    """Readiness check for ALB: 503 until the MCP workers are initialized and tools are loaded"""
+    ready = mcp_pool.is_ready
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "status": "healthy" if ready else "starting", 
         "service": "core-mcp",
         "timestamp": datetime.utcnow().isoformat(),
-        "port": 8000
-    }
+        "port": 8000,
+        "mcp_pool": mcp_pool.stats(),
+        "result_cache": result_cache.stats()
+    })
 
 @app.post("/call-tool")
 @app.post("/core/call-tool")
-async def call_tool(request: MCPRequest) -> MCPResponse:
-    """Call MCP tool via subprocess"""
+async def call_tool(request: MCPRequest, response: Response) -> MCPResponse:
+    """Call MCP tool on the process pool, serving idempotent tools from the result cache"""
     try:
-        result = await execute_mcp_tool(request.tool, request.arguments)
+        result, cache_status = await result_cache.get_or_call(
+            request.tool,
+            request.arguments,
+            lambda: execute_mcp_tool(request.tool, request.arguments)
+        )
+        response.headers["X-MCP-Cache"] = cache_status
         return MCPResponse(success=True, result=result)
     except Exception as e:
         logger.error(f"Error calling MCP tool {request.tool}: {str(e)}")
@@ -80,54 +100,16 @@ async def list_tools():
         logger.error(f"Error listing tools: {str(e)}")
         return {"success": False, "error": str(e)}
 
+# Long-lived MCP server processes, initialized once and shared by every request
+mcp_pool = MCPProcessPool(["python", "-m", "awslabscore_mcp_server"])
+
+# Results of idempotent tools keyed by (tool, arguments); side-effecting tools opt out
+result_cache = MCPResultCache()
+
 async def execute_mcp_tool(tool_name: str, arguments: Dict[str, Any]) -> Any:
-    """Execute MCP tool via subprocess"""
+    """Execute MCP tool on the persistent process pool"""
     try:
-        # Get the MCP command based on service
-        mcp_commands = {
-            "core": ["python", "-m", "awslabscore_mcp_server"],
-            "pricing": ["python", "-m", "awslabspricing_mcp_server"], 
-            "awsdocs": ["python", "-m", "awslabsaws_documentation_mcp_server"],
-            "cfn": ["python", "-m", "awslabscloudformation_mcp_server"],
-            "diagram": ["awslabs.aws-diagram-mcp-server"],
-            "customdoc": ["python", "document_generator_mcp.py"]
-        }
-        
-        cmd = mcp_commands.get("core", ["echo", "unknown"])
-        
-        # Prepare input for MCP server
-        mcp_input = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": arguments
-            }
-        }
-        
-        # Execute the command
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate(
-            input=json.dumps(mcp_input).encode()
-        )
-        
-        if process.returncode != 0:
-            raise Exception(f"MCP command failed: {stderr.decode()}")
-        
-        # Parse response
-        response = json.loads(stdout.decode())
-        
-        if "error" in response:
-            raise Exception(f"MCP error: {response['error']}")
-        
-        return response.get("result", {})
+        return await mcp_pool.call_tool(tool_name, arguments)
         
     except Exception as e:
         logger.error(f"Error executing MCP tool: {str(e)}")
@@ -136,49 +118,21 @@ async def execute_mcp_tool(tool_name: str, arguments: Dict[str, Any]) -> Any:
 async def execute_mcp_command(method: str, params: Optional[Dict] = None) -> Any:
     """Execute generic MCP command"""
     try:
-        # Get the MCP command based on service
-        mcp_commands = {
-            "core": ["python", "-m", "awslabscore_mcp_server"],
-            "pricing": ["python", "-m", "awslabspricing_mcp_server"], 
-            "awsdocs": ["python", "-m", "awslabsaws_documentation_mcp_server"],
-            "cfn": ["python", "-m", "awslabscloudformation_mcp_server"],
-            "diagram": ["awslabs.aws-diagram-mcp-server"],
-            "customdoc": ["python", "document_generator_mcp.py"]
-        }
-        
-        cmd = mcp_commands.get("core", ["echo", "unknown"])
-        
-        mcp_input = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": method,
-            "params": params or {}
-        }
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate(
-            input=json.dumps(mcp_input).encode()
-        )
-        
-        if process.returncode != 0:
-            raise Exception(f"MCP command failed: {stderr.decode()}")
-        
-        response = json.loads(stdout.decode())
-        
-        if "error" in response:
-            raise Exception(f"MCP error: {response['error']}")
-        
-        return response.get("result", {})
+        return await mcp_pool.call(method, params)
         
     except Exception as e:
         logger.error(f"Error executing MCP command: {str(e)}")
         raise
 
+@app.on_event("startup")
+async def warm_up_mcp_pool():
+    """Spawn and initialize the MCP workers in the background; readiness stays 503 until done"""
+    asyncio.ensure_future(mcp_pool.warm_up())
+
+@app.on_event("shutdown")
+async def stop_mcp_pool():
+    """Stop the MCP server processes with the container"""
+    await mcp_pool.stop()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
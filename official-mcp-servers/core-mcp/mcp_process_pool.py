@@ -0,0 +1,394 @@
+"""
+Persistent MCP stdio process pool for the HTTP wrappers
+Keeps long-lived MCP server subprocesses, initialized once and multiplexed by JSON-RPC id
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MCP_PROTOCOL_VERSION = "2024-11-05"
+
+# Pool configuration (overridable per container via environment variables)
+DEFAULT_POOL_SIZE = int(os.environ.get("MCP_POOL_SIZE", "2"))
+DEFAULT_MAX_REQUESTS_PER_WORKER = int(os.environ.get("MCP_MAX_REQUESTS_PER_WORKER", "500"))
+DEFAULT_REQUEST_TIMEOUT = float(os.environ.get("MCP_REQUEST_TIMEOUT", "120"))
+DEFAULT_HEALTH_CHECK_INTERVAL = float(os.environ.get("MCP_HEALTH_CHECK_INTERVAL", "30"))
+DEFAULT_STARTUP_TIMEOUT = float(os.environ.get("MCP_STARTUP_TIMEOUT", "120"))
+DEFAULT_WARMUP_MAX_ATTEMPTS = int(os.environ.get("MCP_WARMUP_MAX_ATTEMPTS", "10"))
+
+# MCP servers may write large JSON lines (documents, diagrams)
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class MCPWorkerError(Exception):
+    """Raised when a worker process dies or cannot serve a request"""
+
+
+class MCPWorker:
+    """One long-lived MCP server subprocess speaking newline-delimited JSON-RPC over stdio"""
+
+    def __init__(self, cmd: List[str], worker_id: int, startup_timeout: float = DEFAULT_STARTUP_TIMEOUT,
+                 on_notification: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.cmd = cmd
+        self.worker_id = worker_id
+        self.startup_timeout = startup_timeout
+        self.on_notification = on_notification
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.server_info: Dict[str, Any] = {}
+        self.requests_served = 0
+        self.in_flight = 0
+        self.retiring = False
+        self.started_at: Optional[float] = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._write_lock = asyncio.Lock()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        """Spawn the process and run the MCP initialize handshake once"""
+        self.process = await asyncio.create_subprocess_exec(
+            *self.cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT
+        )
+        self._tasks = [
+            asyncio.ensure_future(self._read_stdout()),
+            asyncio.ensure_future(self._drain_stderr())
+        ]
+
+        try:
+            result = await self.request("initialize", {
+                "protocolVersion": MCP_PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "mcp-http-wrapper", "version": "1.0.0"}
+            }, timeout=self.startup_timeout, count=False)
+            self.server_info = result.get("serverInfo", {})
+            await self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        except BaseException:
+            # The caller never gets this worker, so nobody else could stop it: kill it here
+            # (also on cancellation) instead of leaving the process and its readers behind
+            await self.stop(grace_period=0)
+            raise
+
+        self.started_at = time.time()
+        logger.info(f"MCP worker {self.worker_id} ready (pid={self.process.pid}, server={self.server_info.get('name', 'unknown')})")
+
+    async def request(self, method: str, params: Optional[Dict] = None,
+                      timeout: float = DEFAULT_REQUEST_TIMEOUT, count: bool = True) -> Any:
+        """Send a JSON-RPC request and return its result, raising on a JSON-RPC error"""
+        response = await self.send_request(method, params, timeout=timeout, count=count)
+        if "error" in response:
+            raise Exception(f"MCP error: {response['error']}")
+        return response.get("result", {})
+
+    async def send_request(self, method: str, params: Optional[Dict] = None,
+                           timeout: float = DEFAULT_REQUEST_TIMEOUT, count: bool = True) -> Dict[str, Any]:
+        """Send a JSON-RPC request and wait for the full response message with the same id"""
+        if not self.is_alive:
+            raise MCPWorkerError(f"MCP worker {self.worker_id} is not running")
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.in_flight += 1
+        self._idle.clear()
+
+        try:
+            await self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}})
+            response = await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(request_id, None)
+            self.in_flight -= 1
+            if count:
+                self.requests_served += 1
+            if self.in_flight == 0:
+                self._idle.set()
+
+        return response
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        async with self._write_lock:
+            self.process.stdin.write((json.dumps(message) + "\n").encode())
+            await self.process.stdin.drain()
+
+    async def _read_stdout(self) -> None:
+        """Route every response to the pending future registered under its id"""
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.debug(f"MCP worker {self.worker_id} non-JSON output: {line[:200]!r}")
+                    continue
+
+                if "method" in message:
+                    await self._handle_server_message(message)
+                    continue
+
+                future = self._pending.get(message.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except Exception as e:
+            logger.error(f"MCP worker {self.worker_id} reader failed: {str(e)}")
+        finally:
+            self._fail_pending(MCPWorkerError(f"MCP worker {self.worker_id} exited"))
+
+    async def _handle_server_message(self, message: Dict[str, Any]) -> None:
+        """Answer server-initiated requests; notifications are only logged"""
+        if "id" not in message:
+            logger.debug(f"MCP worker {self.worker_id} notification: {message.get('method')}")
+            if self.on_notification:
+                try:
+                    self.on_notification(message)
+                except Exception as e:
+                    logger.error(f"MCP worker {self.worker_id} notification handler failed: {str(e)}")
+            return
+        if message["method"] == "ping":
+            reply = {"jsonrpc": "2.0", "id": message["id"], "result": {}}
+        else:
+            reply = {"jsonrpc": "2.0", "id": message["id"],
+                     "error": {"code": -32601, "message": f"Method not supported: {message['method']}"}}
+        await self._send(reply)
+
+    async def _drain_stderr(self) -> None:
+        """Keep the stderr pipe from filling up and blocking the server"""
+        while True:
+            line = await self.process.stderr.readline()
+            if not line:
+                break
+            logger.debug(f"MCP worker {self.worker_id} stderr: {line.decode(errors='replace').rstrip()}")
+
+    def _fail_pending(self, error: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def wait_idle(self, timeout: Optional[float] = None) -> None:
+        await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+
+    async def stop(self, grace_period: float = 5.0) -> None:
+        """Close stdin and give the server a moment to exit before killing it"""
+        if self.process is None:
+            return
+        if self.is_alive:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), timeout=grace_period)
+            except Exception:
+                if self.is_alive:
+                    self.process.kill()
+                    await self.process.wait()
+        for task in self._tasks:
+            task.cancel()
+        self._fail_pending(MCPWorkerError(f"MCP worker {self.worker_id} stopped"))
+        logger.info(f"MCP worker {self.worker_id} stopped after {self.requests_served} requests")
+
+
+class MCPProcessPool:
+    """Pool of MCPWorkers with health checks, restart-on-crash and max-requests recycling"""
+
+    def __init__(self, cmd: List[str], size: Optional[int] = None,
+                 max_requests_per_worker: Optional[int] = None,
+                 request_timeout: Optional[float] = None,
+                 health_check_interval: Optional[float] = None):
+        self.cmd = cmd
+        self.size = size or DEFAULT_POOL_SIZE
+        self.max_requests_per_worker = max_requests_per_worker or DEFAULT_MAX_REQUESTS_PER_WORKER
+        self.request_timeout = request_timeout or DEFAULT_REQUEST_TIMEOUT
+        self.health_check_interval = health_check_interval or DEFAULT_HEALTH_CHECK_INTERVAL
+        self.workers: List[Optional[MCPWorker]] = [None] * self.size
+        self.restarts = 0
+        self.recycled = 0
+        self.tools: List[Dict[str, Any]] = []
+        self.tools_loaded = False
+        self.warmup_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._worker_ids = itertools.count(1)
+        self._start_lock = asyncio.Lock()
+        self._slot_locks = [asyncio.Lock() for _ in range(self.size)]
+        self._health_task: Optional[asyncio.Task] = None
+        self._started = False
+
+    async def start(self) -> None:
+        """Spawn and initialize every worker; safe to call more than once"""
+        async with self._start_lock:
+            if self._started:
+                return
+            await asyncio.gather(*[self._ensure_worker(slot) for slot in range(self.size)])
+            self._health_task = asyncio.ensure_future(self._health_loop())
+            self._started = True
+            logger.info(f"MCP process pool started: {self.size} x {' '.join(self.cmd)}")
+
+    async def warm_up(self, retry_delay: float = 5.0, max_attempts: Optional[int] = None) -> None:
+        """
+        Spawn and initialize every worker and load the tool list before serving traffic
+        Retries with a growing delay so a slow package download does not leave the pool cold;
+        after max_attempts (MCP_WARMUP_MAX_ATTEMPTS) it gives up and readiness stays 503
+        """
+        max_attempts = max_attempts or DEFAULT_WARMUP_MAX_ATTEMPTS
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self.start()
+                result = await self.call("tools/list")
+                self.tools = result.get("tools", [])
+                self.tools_loaded = True
+                self.last_error = None
+                break
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                logger.warning(f"MCP pool warm-up attempt {attempt} failed: {str(e)}")
+                # Start every attempt from a clean pool: no half-started workers left running
+                await self.stop()
+                if attempt >= max_attempts:
+                    logger.error(f"MCP pool warm-up gave up after {attempt} attempts: {str(e)}")
+                    return
+                await asyncio.sleep(min(retry_delay * attempt, 60))
+
+        self.warmup_seconds = round(time.perf_counter() - started, 3)
+        logger.info(json.dumps({
+            "metric": "mcp_pool_warmup_seconds",
+            "value": self.warmup_seconds,
+            "command": " ".join(self.cmd),
+            "workers": self.size,
+            "tools": len(self.tools),
+            "attempts": attempt
+        }))
+
+    @property
+    def is_ready(self) -> bool:
+        """Ready once tools are loaded and at least one worker can take requests"""
+        return self.tools_loaded and any(worker and worker.is_alive for worker in self.workers)
+
+    async def stop(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+        await asyncio.gather(*[worker.stop() for worker in self.workers if worker],
+                             return_exceptions=True)
+        self.workers = [None] * self.size
+        self._started = False
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        return await self.call("tools/call", {"name": tool_name, "arguments": arguments})
+
+    async def call(self, method: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> Any:
+        """Run one JSON-RPC request on the least busy live worker"""
+        await self.start()
+        slot, worker = await self._acquire_worker()
+        try:
+            return await worker.request(method, params, timeout=timeout or self.request_timeout)
+        except MCPWorkerError:
+            # The process died mid-request: replace it so the next call gets a fresh one
+            asyncio.ensure_future(self._ensure_worker(slot))
+            raise
+        finally:
+            if worker.requests_served >= self.max_requests_per_worker and not worker.retiring:
+                worker.retiring = True
+                asyncio.ensure_future(self._recycle(slot, worker))
+
+    async def _acquire_worker(self):
+        candidates = [(slot, worker) for slot, worker in enumerate(self.workers)
+                      if worker and worker.is_alive and not worker.retiring]
+        if candidates:
+            return min(candidates, key=lambda item: item[1].in_flight)
+
+        # Nothing healthy right now: restart the first slot inline
+        worker = await self._ensure_worker(0)
+        return 0, worker
+
+    async def _ensure_worker(self, slot: int) -> MCPWorker:
+        """Return the worker in a slot, (re)spawning it if it is missing or dead"""
+        async with self._slot_locks[slot]:
+            worker = self.workers[slot]
+            if worker and worker.is_alive:
+                return worker
+            if worker is not None:
+                self.restarts += 1
+                logger.warning(f"Restarting MCP worker slot {slot} (worker {worker.worker_id} is down)")
+                await worker.stop()
+            worker = MCPWorker(self.cmd, next(self._worker_ids))
+            await worker.start()
+            self.workers[slot] = worker
+            return worker
+
+    async def _recycle(self, slot: int, old_worker: MCPWorker) -> None:
+        """Swap in a fresh worker, then retire the old one once its in-flight calls finish"""
+        try:
+            async with self._slot_locks[slot]:
+                new_worker = MCPWorker(self.cmd, next(self._worker_ids))
+                await new_worker.start()
+                self.workers[slot] = new_worker
+            self.recycled += 1
+            logger.info(f"Recycled MCP worker {old_worker.worker_id} after {old_worker.requests_served} requests")
+            try:
+                await old_worker.wait_idle(timeout=self.request_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"MCP worker {old_worker.worker_id} still busy, stopping anyway")
+            await old_worker.stop()
+        except Exception as e:
+            logger.error(f"Error recycling MCP worker slot {slot}: {str(e)}")
+            old_worker.retiring = False
+
+    async def _health_loop(self) -> None:
+        """Periodically ping each worker and restart the ones that crashed or hang"""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for slot, worker in enumerate(self.workers):
+                if worker is None or worker.retiring:
+                    continue
+                try:
+                    if not worker.is_alive:
+                        raise MCPWorkerError("process exited")
+                    await worker.request("ping", timeout=10, count=False)
+                except Exception as e:
+                    logger.warning(f"MCP worker {worker.worker_id} failed health check: {str(e)}")
+                    try:
+                        if worker.is_alive:
+                            await worker.stop()
+                        await self._ensure_worker(slot)
+                    except Exception as restart_error:
+                        logger.error(f"Could not restart MCP worker slot {slot}: {str(restart_error)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready,
+            "tools": len(self.tools),
+            "warmup_seconds": self.warmup_seconds,
+            "last_error": self.last_error,
+            "size": self.size,
+            "alive": sum(1 for worker in self.workers if worker and worker.is_alive),
+            "in_flight": sum(worker.in_flight for worker in self.workers if worker),
+            "restarts": self.restarts,
+            "recycled": self.recycled,
+            "max_requests_per_worker": self.max_requests_per_worker,
+            "workers": [
+                {
+                    "worker_id": worker.worker_id,
+                    "pid": worker.process.pid if worker.process else None,
+                    "alive": worker.is_alive,
+                    "requests_served": worker.requests_served,
+                    "in_flight": worker.in_flight
+                }
+                for worker in self.workers if worker
+            ]
+        }
@@ -0,0 +1,174 @@
+"""
+Result cache for idempotent MCP tool calls in the HTTP wrappers
+Keyed by (tool, canonicalized arguments) with per-tool TTLs, an LRU bound and single-flight de-duplication
+Only allowlisted tools are cached: anything without a TTL (live resource state, side effects) goes upstream
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.environ.get("MCP_CACHE_ENABLED", "true").lower() == "true"
+DEFAULT_MAX_ENTRIES = int(os.environ.get("MCP_CACHE_MAX_ENTRIES", "1000"))
+# TTL for tools missing from the allowlist; 0 = not cached
+DEFAULT_TTL = float(os.environ.get("MCP_CACHE_DEFAULT_TTL", "0"))
+
+# Allowlist: tools whose answer is stable for hours for the same arguments
+# (more can be added with MCP_CACHE_TOOL_TTLS)
+DEFAULT_TOOL_TTLS = {
+    "search_documentation": 6 * 3600,
+    "read_documentation": 6 * 3600,
+    "recommend": 6 * 3600,
+    "get_pricing": 3600,
+    "get_pricing_service_codes": 24 * 3600,
+    "get_pricing_service_attributes": 24 * 3600,
+    "get_pricing_attribute_values": 24 * 3600
+}
+
+# Tools with side effects (files, S3 objects, AWS resources) are never cached, whatever the TTLs say
+DEFAULT_NO_CACHE_TOOLS = {
+    "generate_diagram",
+    "generate_word_document",
+    "generate_excel_report",
+    "upload_to_s3",
+    "list_generated_documents",
+    "create_resource",
+    "create_template",
+    "update_resource",
+    "delete_resource"
+}
+
+# Values for the X-MCP-Cache response header
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_COALESCED = "COALESCED"
+CACHE_BYPASS = "BYPASS"
+
+
+def is_successful_result(result: Any) -> bool:
+    """MCP reports tool failures in-band with isError; those must not be cached"""
+    return not (isinstance(result, dict) and (result.get("isError") or "error" in result))
+
+
+def _env_tool_ttls() -> Dict[str, float]:
+    """Per-tool TTL overrides, e.g. MCP_CACHE_TOOL_TTLS='{"get_pricing": 600}'"""
+    raw = os.environ.get("MCP_CACHE_TOOL_TTLS")
+    if not raw:
+        return {}
+    try:
+        return {tool: float(ttl) for tool, ttl in json.loads(raw).items()}
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid MCP_CACHE_TOOL_TTLS: {str(e)}")
+        return {}
+
+
+def _env_no_cache_tools() -> set:
+    """Extra opt-outs, e.g. MCP_CACHE_DISABLED_TOOLS='tool_a,tool_b'"""
+    return {tool.strip() for tool in os.environ.get("MCP_CACHE_DISABLED_TOOLS", "").split(",") if tool.strip()}
+
+
+class MCPResultCache:
+    """In-memory LRU of tool results shared by all requests of a wrapper process"""
+
+    def __init__(self, tool_ttls: Optional[Dict[str, float]] = None,
+                 no_cache_tools: Optional[Iterable[str]] = None,
+                 default_ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.tool_ttls = {**DEFAULT_TOOL_TTLS, **(tool_ttls or {}), **_env_tool_ttls()}
+        self.no_cache_tools = DEFAULT_NO_CACHE_TOOLS | set(no_cache_tools or []) | _env_no_cache_tools()
+        self.default_ttl = DEFAULT_TTL if default_ttl is None else default_ttl
+        self.max_entries = max_entries or DEFAULT_MAX_ENTRIES
+        self.enabled = CACHE_ENABLED if enabled is None else enabled
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.counters = {CACHE_HIT: 0, CACHE_MISS: 0, CACHE_COALESCED: 0, CACHE_BYPASS: 0}
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Canonical key: argument order and whitespace do not create separate entries"""
+        canonical = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{tool_name}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+    def ttl_for(self, tool_name: str) -> float:
+        return self.tool_ttls.get(tool_name, self.default_ttl)
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return self.enabled and tool_name not in self.no_cache_tools and self.ttl_for(tool_name) > 0
+
+    def _get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_call(self, tool_name: str, arguments: Dict[str, Any],
+                          call: Callable[[], Awaitable[Any]],
+                          should_cache: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, str]:
+        """
+        Return (result, cache status)
+        Concurrent identical requests share a single upstream call; failures are never cached
+        """
+        if not self.is_cacheable(tool_name):
+            self.counters[CACHE_BYPASS] += 1
+            return await call(), CACHE_BYPASS
+
+        key = self.make_key(tool_name, arguments)
+        found, value = self._get(key)
+        if found:
+            self.counters[CACHE_HIT] += 1
+            return value, CACHE_HIT
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.counters[CACHE_COALESCED] += 1
+            return await asyncio.shield(in_flight), CACHE_COALESCED
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.counters[CACHE_MISS] += 1
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if (should_cache or is_successful_result)(value):
+                self._set(key, value, self.ttl_for(tool_name))
+            return value, CACHE_MISS
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters[CACHE_HIT] + self.counters[CACHE_MISS] + self.counters[CACHE_COALESCED]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round((self.counters[CACHE_HIT] + self.counters[CACHE_COALESCED]) / lookups, 3) if lookups else None,
+            **{status.lower(): count for status, count in self.counters.items()}
+        }
@@ -9,12 +9,17 @@ import json
 import logging
 import subprocess
 import sys
+import time
 from typing import Dict, Any, List, Optional
 import argparse
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 
+from mcp_process_pool import DEFAULT_REQUEST_TIMEOUT, DEFAULT_WARMUP_MAX_ATTEMPTS, MCPWorker
+from mcp_result_cache import MCPResultCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,111 +35,139 @@ class MCPResponse(BaseModel):
     error: Optional[str] = None
 
 class MCPClient:
-    def __init__(self, command: str, args: List[str]):
+    """Async JSON-RPC session over one MCP server process, safe for concurrent requests"""
+    
+    def __init__(self, command: str, args: List[str], request_timeout: float = DEFAULT_REQUEST_TIMEOUT):
         self.command = command
         self.args = args
-        self.process = None
+        self.request_timeout = request_timeout
+        # Background reader, increasing ids and the pending-future map live in MCPWorker
+        self.session = MCPWorker([command] + args, worker_id=1, on_notification=self._on_notification)
         
     async def start(self):
         """Start the MCP server process"""
         try:
-            cmd = [self.command] + self.args
-            logger.info(f"Starting MCP server: {' '.join(cmd)}")
-            
-            self.process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            # Initialize MCP connection
-            init_request = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {
-                        "roots": {"listChanged": True},
-                        "sampling": {}
-                    },
-                    "clientInfo": {
-                        "name": "http-wrapper",
-                        "version": "1.0.0"
-                    }
-                }
-            }
-            
-            await self._send_request(init_request)
+            logger.info(f"Starting MCP server: {' '.join([self.command] + self.args)}")
+            await self.session.start()
             logger.info("MCP server initialized successfully")
             
         except Exception as e:
             logger.error(f"Failed to start MCP server: {e}")
             raise
     
-    async def _send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Send a request to the MCP server"""
-        if not self.process:
-            raise RuntimeError("MCP server not started")
-        
+    @property
+    def is_alive(self) -> bool:
+        return self.session.is_alive
+    
+    def _on_notification(self, notification: Dict[str, Any]):
+        """Log server notifications (progress, log messages, list changes)"""
+        logger.info(f"MCP notification: {notification.get('method')} {notification.get('params', {})}")
+    
+    async def _send_request(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a request to the MCP server and wait for the response with its own id"""
         try:
-            # Send request
-            request_json = json.dumps(request) + "\n"
-            self.process.stdin.write(request_json.encode())
-            await self.process.stdin.drain()
-            
-            # Read response
-            response_line = await self.process.stdout.readline()
-            if not response_line:
-                raise RuntimeError("No response from MCP server")
-            
-            response = json.loads(response_line.decode().strip())
-            return response
+            return await self.session.send_request(method, params, timeout=timeout or self.request_timeout)
             
         except Exception as e:
             logger.error(f"Error communicating with MCP server: {e}")
             raise
     
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
         """Call a tool on the MCP server"""
-        request = {
-            "jsonrpc": "2.0",
-            "id": 2,
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": arguments
-            }
-        }
-        
-        return await self._send_request(request)
+        return await self._send_request("tools/call", {
+            "name": tool_name,
+            "arguments": arguments
+        }, timeout=timeout)
     
-    async def list_tools(self) -> Dict[str, Any]:
+    async def list_tools(self, timeout: Optional[float] = None) -> Dict[str, Any]:
         """List available tools"""
-        request = {
-            "jsonrpc": "2.0",
-            "id": 3,
-            "method": "tools/list",
-            "params": {}
-        }
-        
-        return await self._send_request(request)
+        return await self._send_request("tools/list", {}, timeout=timeout)
     
     async def stop(self):
         """Stop the MCP server"""
-        if self.process:
-            self.process.terminate()
-            await self.process.wait()
+        await self.session.stop()
 
 # Global MCP client instance
 mcp_client: Optional[MCPClient] = None
+mcp_client_lock = asyncio.Lock()
+
+async def get_mcp_client() -> MCPClient:
+    """Return the shared MCP client, starting it once even under concurrent first requests"""
+    global mcp_client
+    
+    async with mcp_client_lock:
+        if not mcp_client or not mcp_client.is_alive:
+            client = MCPClient("uvx", ["awslabs.aws-documentation-mcp-server@latest"])
+            await client.start()
+            mcp_client = client
+    return mcp_client
+
+# Documentation lookups are idempotent; JSON-RPC error replies are never cached
+result_cache = MCPResultCache()
+
+async def call_tool_cached(tool_name: str, arguments: Dict[str, Any], http_response: Response) -> Dict[str, Any]:
+    """Call a tool through the result cache and report the outcome in X-MCP-Cache"""
+    client = await get_mcp_client()
+    response, cache_status = await result_cache.get_or_call(
+        tool_name,
+        arguments,
+        lambda: client.call_tool(tool_name, arguments),
+        should_cache=lambda reply: "error" not in reply and not (reply.get("result") or {}).get("isError")
+    )
+    http_response.headers["X-MCP-Cache"] = cache_status
+    return response
+
+# Warm-up state reported by the readiness check
+warmup_state: Dict[str, Any] = {"tools_loaded": False, "tools": 0, "warmup_seconds": None, "last_error": None}
+
+async def stop_mcp_client():
+    """Stop the shared MCP client so the next get_mcp_client starts a fresh process"""
+    global mcp_client
+    
+    async with mcp_client_lock:
+        if mcp_client:
+            await mcp_client.stop()
+            mcp_client = None
+
+async def warm_up_mcp_client(retry_delay: float = 5.0, max_attempts: int = DEFAULT_WARMUP_MAX_ATTEMPTS):
+    """
+    Start the MCP server and load its tools so no user request pays for uvx resolution
+    Gives up after max_attempts (MCP_WARMUP_MAX_ATTEMPTS); readiness then stays 503
+    """
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            client = await get_mcp_client()
+            response = await client.list_tools()
+            warmup_state["tools"] = len(response.get("result", {}).get("tools", []))
+            warmup_state["tools_loaded"] = True
+            warmup_state["last_error"] = None
+            break
+        except Exception as e:
+            warmup_state["last_error"] = str(e) or type(e).__name__
+            logger.warning(f"MCP warm-up attempt {attempt} failed: {e}")
+            # Do not keep a process that could not list its tools around for the next attempt
+            await stop_mcp_client()
+            if attempt >= max_attempts:
+                logger.error(f"MCP warm-up gave up after {attempt} attempts: {e}")
+                return
+            await asyncio.sleep(min(retry_delay * attempt, 60))
+    
+    warmup_state["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(json.dumps({
+        "metric": "mcp_warmup_seconds",
+        "value": warmup_state["warmup_seconds"],
+        "service": "aws-documentation-mcp",
+        "tools": warmup_state["tools"],
+        "attempts": attempt
+    }))
 
 @app.on_event("startup")
 async def startup_event():
-    global mcp_client
-    # MCP client will be initialized when first request comes in
-    pass
+    # Warm up in the background so liveness answers while the readiness check stays 503
+    asyncio.ensure_future(warm_up_mcp_client())
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -142,106 +175,84 @@ async def shutdown_event():
     if mcp_client:
         await mcp_client.stop()
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness check: the HTTP server is up"""
+    return {"status": "alive", "service": "aws-documentation-mcp"}
+
 @app.get("/health")
+@app.get("/health/ready")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "aws-documentation-mcp"}
+    """Readiness check: 503 until the MCP server is initialized and its tools are loaded"""
+    ready = warmup_state["tools_loaded"] and bool(mcp_client and mcp_client.is_alive)
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "status": "healthy" if ready else "starting",
+        "service": "aws-documentation-mcp",
+        **warmup_state,
+        "result_cache": result_cache.stats()
+    })
 
 @app.get("/tools")
 async def list_tools():
     """List available MCP tools"""
-    global mcp_client
-    
-    if not mcp_client:
-        return {"error": "MCP client not initialized"}
-    
     try:
-        response = await mcp_client.list_tools()
+        client = await get_mcp_client()
+        response = await client.list_tools()
         return response
     except Exception as e:
         logger.error(f"Error listing tools: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/tools/{tool_name}")
-async def call_tool(tool_name: str, request: Dict[str, Any]):
+async def call_tool(tool_name: str, request: Dict[str, Any], http_response: Response):
     """Call a specific MCP tool"""
-    global mcp_client
-    
-    if not mcp_client:
-        return {"error": "MCP client not initialized"}
-    
     try:
-        response = await mcp_client.call_tool(tool_name, request)
-        return response
+        return await call_tool_cached(tool_name, request, http_response)
     except Exception as e:
         logger.error(f"Error calling tool {tool_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/search")
-async def search_documentation(request: Dict[str, Any]):
+async def search_documentation(request: Dict[str, Any], http_response: Response):
     """Search AWS documentation"""
-    global mcp_client
-    
-    if not mcp_client:
-        # Initialize MCP client on first request
-        mcp_client = MCPClient("uvx", ["awslabs.aws-documentation-mcp-server@latest"])
-        await mcp_client.start()
-    
     try:
         search_phrase = request.get("search_phrase", "")
         limit = request.get("limit", 10)
         
-        response = await mcp_client.call_tool("search_documentation", {
+        return await call_tool_cached("search_documentation", {
             "search_phrase": search_phrase,
             "limit": limit
-        })
-        return response
+        }, http_response)
     except Exception as e:
         logger.error(f"Error searching documentation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/read")
-async def read_documentation(request: Dict[str, Any]):
+async def read_documentation(request: Dict[str, Any], http_response: Response):
     """Read AWS documentation page"""
-    global mcp_client
-    
-    if not mcp_client:
-        # Initialize MCP client on first request
-        mcp_client = MCPClient("uvx", ["awslabs.aws-documentation-mcp-server@latest"])
-        await mcp_client.start()
-    
     try:
         url = request.get("url", "")
         max_length = request.get("max_length", 5000)
         start_index = request.get("start_index", 0)
         
-        response = await mcp_client.call_tool("read_documentation", {
+        return await call_tool_cached("read_documentation", {
             "url": url,
             "max_length": max_length,
             "start_index": start_index
-        })
-        return response
+        }, http_response)
     except Exception as e:
         logger.error(f"Error reading documentation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/recommend")
-async def recommend_documentation(request: Dict[str, Any]):
+async def recommend_documentation(request: Dict[str, Any], http_response: Response):
     """Get documentation recommendations"""
-    global mcp_client
-    
-    if not mcp_client:
-        # Initialize MCP client on first request
-        mcp_client = MCPClient("uvx", ["awslabs.aws-documentation-mcp-server@latest"])
-        await mcp_client.start()
-    
     try:
         url = request.get("url", "")
         
-        response = await mcp_client.call_tool("recommend", {
+        return await call_tool_cached("recommend", {
             "url": url
-        })
-        return response
+        }, http_response)
     except Exception as e:
         logger.error(f"Error getting recommendations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -15,6 +15,12 @@ for service in "${SERVICES[@]}"; do
     cp "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/mcp_http_wrapper_${service}.py" \
        "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/${service}-mcp/"
     
+    # Copy the shared MCP process pool and result cache used by every wrapper
+    cp "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/mcp_process_pool.py" \
+       "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/${service}-mcp/"
+    cp "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/mcp_result_cache.py" \
+       "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/${service}-mcp/"
+    
     # Update the Dockerfile CMD line
     sed -i "s/mcp_http_wrapper.py/mcp_http_wrapper_${service}.py/g" \
         "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/${service}-mcp/Dockerfile"
@@ -30,6 +36,10 @@ done
 echo "📝 Updating customdoc-mcp..."
 cp "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/mcp_http_wrapper_customdoc.py" \
    "/home/ec2-user/aws-propuestas-v3/custom-mcp-servers/document-generator-mcp/"
+cp "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/mcp_process_pool.py" \
+   "/home/ec2-user/aws-propuestas-v3/custom-mcp-servers/document-generator-mcp/"
+cp "/home/ec2-user/aws-propuestas-v3/official-mcp-servers/mcp_result_cache.py" \
+   "/home/ec2-user/aws-propuestas-v3/custom-mcp-servers/document-generator-mcp/"
 
 # Update custom doc Dockerfile
 sed -i 's/COPY mcp_http_wrapper.py ./COPY mcp_http_wrapper_customdoc.py ./' \
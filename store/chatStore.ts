@@ -1,6 +1,6 @@
 import { create } from 'zustand'
 import { devtools, persist } from 'zustand/middleware'
-import { ChatStore, Message, ChatSession } from '@/lib/types'
+import { ChatStore, Message, ChatSession, AUTO_MODEL_ID } from '@/lib/types'
 
 export const useChatStore = create<ChatStore>()(
   devtools(
@@ -11,6 +11,8 @@ export const useChatStore = create<ChatStore>()(
         currentSessionId: null,
         isLoading: false,
         selectedModel: 'amazon.nova-pro-v1:0',
+        // El chat enruta por defecto; selectedModel sigue siendo el modelo del arquitecto
+        chatModel: AUTO_MODEL_ID,
 
         // Computed property getter
         get messages(): Message[] {
@@ -113,6 +115,10 @@ export const useChatStore = create<ChatStore>()(
 
         setSelectedModel: (modelId: string) => {
           set({ selectedModel: modelId })
+        },
+
+        setChatModel: (modelId: string) => {
+          set({ chatModel: modelId })
         }
       }),
       {
@@ -120,7 +126,8 @@ export const useChatStore = create<ChatStore>()(
         partialize: (state) => ({
           sessions: state.sessions,
           currentSessionId: state.currentSessionId,
-          selectedModel: state.selectedModel
+          selectedModel: state.selectedModel,
+          chatModel: state.chatModel
         })
       }
     ),
@@ -0,0 +1,30 @@
+"""
+Pruebas unitarias de los módulos de las Lambdas (sin AWS real)
+Los test_*.py de la raíz son pruebas de integración contra el despliegue: correr con
+    python -m pytest -q tests
+"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cada Lambda se empaqueta con sus módulos en la raíz; session_store y context_window son
+# copias idénticas en chat y arquitecto
+for lambda_dir in ('projects', 'cors-proxy', 'chat', 'arquitecto'):
+    sys.path.insert(0, os.path.join(ROOT, 'lambda', lambda_dir))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+
+@pytest.fixture(scope='session')
+def chat_app():
+    """lambda/chat/app.py cargado con otro nombre (varias Lambdas tienen su propio app.py)"""
+    spec = importlib.util.spec_from_file_location('chat_app', os.path.join(ROOT, 'lambda', 'chat', 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
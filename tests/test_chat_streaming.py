@@ -0,0 +1,70 @@
+import json
+
+import model_router
+
+
+class FakeStream:
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        pass
+
+
+def sse_events(stream):
+    body = stream.data.split(b'\x00' * 8, 1)[1].decode('utf-8')
+    events = []
+    for frame in body.strip().split('\n\n'):
+        name, data = frame.split('\n', 1)
+        events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def fake_stream_model(failing_model):
+    def stream(model_id, conversation):
+        if model_id == failing_model:
+            raise RuntimeError('ThrottlingException')
+        yield {'type': 'token', 'text': 'hola'}
+        yield {'type': 'usage', 'usage': {'outputTokens': 1}, 'modelUsed': model_id,
+               'metrics': {'timeToFirstTokenMs': 1.0}}
+    return stream
+
+
+def request(message='lista regiones'):
+    return {'body': json.dumps({'messages': [{'role': 'user', 'content': message}], 'cache': False})}
+
+
+def test_fast_tier_failure_before_the_first_token_falls_back(chat_app, monkeypatch):
+    monkeypatch.setattr(chat_app, 'stream_bedrock_model', fake_stream_model(model_router.MODEL_FAST_ID))
+    stream = FakeStream()
+    chat_app.streaming_handler(request(), stream, None)
+
+    events = sse_events(stream)
+    assert [name for name, _ in events] == ['token', 'usage']
+    routing = events[-1][1]['routing']
+    assert (routing['tier'], routing['reason']) == (model_router.STRONG, 'fallback')
+    assert routing['modelId'] == model_router.MODEL_STRONG_ID
+
+
+def test_strong_tier_failure_is_an_error_frame(chat_app, monkeypatch):
+    monkeypatch.setattr(chat_app, 'stream_bedrock_model', fake_stream_model(model_router.MODEL_STRONG_ID))
+    stream = FakeStream()
+    chat_app.streaming_handler(request('¿Cómo diseño una arquitectura multi-región con failover?'), stream, None)
+
+    assert [name for name, _ in sse_events(stream)] == ['error']
+
+
+def test_user_override_does_not_fall_back(chat_app, monkeypatch):
+    model_id = 'amazon.nova-pro-v1:0'
+    monkeypatch.setattr(chat_app, 'stream_bedrock_model', fake_stream_model(model_id))
+    event = request()
+    body = json.loads(event['body'])
+    body['modelId'] = model_id
+    event['body'] = json.dumps(body)
+    stream = FakeStream()
+    chat_app.streaming_handler(event, stream, None)
+
+    assert [name for name, _ in sse_events(stream)] == ['error']
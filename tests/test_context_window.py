@@ -0,0 +1,124 @@
+import pytest
+
+from context_window import ContextWindow, extractive_summary, render_transcript
+
+
+def conversation(count, start=0):
+    """Mensajes de 13 tokens estimados (36 caracteres + overhead), alternando user/assistant"""
+    return [{'role': 'user' if index % 2 == 0 else 'assistant', 'content': f"m{index:02d}".ljust(36, 'x')}
+            for index in range(start, start + count)]
+
+
+def contents(messages):
+    return [message['content'][:3] for message in messages]
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def window(calls):
+    def summarize(previous, messages, max_tokens):
+        calls.append((previous, contents(messages)))
+        return f"{previous}+{len(messages)}"
+
+    # Presupuesto para turnos completos: 100 - 20 del resumen = 80 tokens, 6 mensajes
+    return ContextWindow(max_tokens=100, keep_recent=2, summary_max_tokens=20, summarizer=summarize)
+
+
+def test_history_under_budget_is_unchanged(window, calls):
+    messages = conversation(6)
+    fitted = window.fit(messages)
+
+    assert fitted['messages'] is messages
+    assert fitted['summary'] is None
+    assert fitted['stats']['messagesFolded'] == 0
+    assert calls == []
+
+
+def test_cut_keeps_the_newest_messages_that_fit(window, calls):
+    fitted = window.fit(conversation(10))
+
+    assert contents(fitted['messages']) == ['m04', 'm05', 'm06', 'm07', 'm08', 'm09']
+    assert calls == [('', ['m00', 'm01', 'm02', 'm03'])]
+    assert fitted['summaryState']['coveredMessages'] == 4
+    assert fitted['stats']['summarySource'] == 'computed'
+    assert fitted['stats']['tokensAfter'] <= 100
+
+
+def test_cut_moves_forward_to_a_user_turn(window):
+    # El prefijo deja lugar para 5 mensajes: el corte caería en 'assistant' y avanza uno
+    fitted = window.fit(conversation(10), prefix='p' * 52)
+
+    assert fitted['messages'][0]['role'] == 'user'
+    assert contents(fitted['messages']) == ['m06', 'm07', 'm08', 'm09']
+    assert fitted['summaryState']['coveredMessages'] == 6
+
+
+def test_keep_recent_wins_over_the_budget(calls):
+    window = ContextWindow(max_tokens=20, keep_recent=2, summary_max_tokens=10,
+                           summarizer=lambda previous, messages, max_tokens: 'summary')
+    fitted = window.fit(conversation(4))
+
+    assert contents(fitted['messages']) == ['m02', 'm03']
+    assert fitted['stats']['tokensAfter'] > 20
+
+
+def test_summary_coverage_accumulates_incrementally(window, calls):
+    first = window.fit(conversation(10))
+    second = window.fit(conversation(14), summary_state=first['summaryState'])
+
+    # Solo se resumen los turnos plegados desde el fit anterior
+    assert calls[-1] == ('+4', ['m04', 'm05', 'm06', 'm07'])
+    assert second['summary'] == '+4+4'
+    assert second['summaryState']['coveredMessages'] == 8
+    assert second['stats']['summarySource'] == 'incremental'
+    assert contents(second['messages'])[0] == 'm08'
+
+
+def test_state_from_a_different_history_is_not_reused(window, calls):
+    first = window.fit(conversation(10))
+    edited = conversation(14)
+    edited[1]['content'] = 'edited'.ljust(36, 'x')
+
+    window.fit(edited, summary_state=first['summaryState'])
+    assert calls[-1][0] == ''
+    assert calls[-1][1][:2] == ['m00', 'edi']
+
+
+def test_prior_summary_of_unloaded_turns_is_extended(window, calls):
+    # Sesión guardada: el resumen cubre turnos anteriores y messages es solo la cola sin resumir
+    fitted = window.fit(conversation(10, start=20), summary_state={'text': 'stored', 'coveredMessages': 0})
+
+    assert calls == [('stored', ['m20', 'm21', 'm22', 'm23'])]
+    assert fitted['summary'] == 'stored+4'
+    assert fitted['summaryState']['coveredMessages'] == 4
+
+
+def test_prior_summary_uses_the_summary_reserve(window, calls):
+    # Sobre el presupuesto total, pero los turnos caben en lo que no se reserva para el resumen
+    fitted = window.fit(conversation(6), summary_state={'text': 's' * 120, 'coveredMessages': 0})
+
+    assert fitted['stats']['tokensBefore'] == 30 + 6 * 13
+    assert fitted['stats']['messagesFolded'] == 0
+    assert fitted['stats']['summarySource'] == 'prior'
+    assert fitted['summary'] == 's' * 120
+    assert calls == []
+
+
+def test_folded_history_summary_is_cached(window, calls):
+    window.fit(conversation(10))
+    fitted = window.fit(conversation(10))
+
+    assert len(calls) == 1
+    assert fitted['stats']['summarySource'] == 'cache'
+
+
+def test_extractive_summary_drops_the_oldest_lines_over_budget():
+    summary = extractive_summary('- USER: old', conversation(6), max_tokens=30)
+
+    assert 'old' not in summary
+    assert summary.splitlines()[-1].startswith('- ASSISTANT: m05')
+    assert render_transcript(conversation(1), summary).startswith('\nRESUMEN DE LA CONVERSACIÓN ANTERIOR:')
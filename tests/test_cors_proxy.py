@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+pytest.importorskip('urllib3')
+
+import main as cors_proxy  # noqa: E402
+
+
+class FakeStream:
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        self.closed = True
+
+
+class FakeUpstream:
+    status = 200
+    headers = {'Content-Type': 'application/pdf'}
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, size):
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    def release_conn(self):
+        pass
+
+
+def function_url_event(method='GET', path='/docs/report', query=''):
+    return {'version': '2.0', 'rawPath': path, 'rawQueryString': query,
+            'headers': {'host': 'abc.lambda-url.us-east-1.on.aws'},
+            'requestContext': {'http': {'method': method}}, 'body': None}
+
+
+def test_upstream_request_from_api_gateway_event():
+    event = {'httpMethod': 'POST', 'path': '/cors-proxy/docs', 'queryStringParameters': {'a': '1'},
+             'headers': {'Host': 'api', 'Content-Type': 'application/json'}, 'body': '{}'}
+
+    method, url, headers, body = cors_proxy.build_upstream_request(event)
+    assert (method, url, body) == ('POST', f"{cors_proxy.MCP_BASE_URL}/docs?a=1", '{}')
+    assert headers == {'Content-Type': 'application/json'}
+
+
+def test_upstream_request_from_function_url_event():
+    method, url, headers, _ = cors_proxy.build_upstream_request(
+        function_url_event('POST', '/docs/report', 'format=pdf&page=2'))
+
+    assert method == 'POST'
+    assert url == f"{cors_proxy.MCP_BASE_URL}/docs/report?format=pdf&page=2"
+    assert 'host' not in headers
+
+
+def test_streaming_preflight_for_function_url():
+    stream = FakeStream()
+    cors_proxy.streaming_handler(function_url_event('OPTIONS'), stream, None)
+
+    assert json.loads(stream.data.split(b'\x00' * 8)[0])['statusCode'] == 200
+    assert stream.closed
+
+
+def test_streaming_forwards_chunks(monkeypatch):
+    monkeypatch.setattr(cors_proxy, 'open_upstream', lambda *args: FakeUpstream([b'%PDF', b'-1.7']))
+    stream = FakeStream()
+    cors_proxy.streaming_handler(function_url_event(), stream, None)
+
+    assert stream.data.endswith(b'\x00' * 8 + b'%PDF-1.7')
+    assert stream.closed
+
+
+def test_failure_after_prelude_is_raised_without_closing(monkeypatch):
+    upstream = FakeUpstream([b'%PDF', cors_proxy.urllib3.exceptions.ProtocolError('connection reset')])
+    monkeypatch.setattr(cors_proxy, 'open_upstream', lambda *args: upstream)
+    stream = FakeStream()
+
+    with pytest.raises(cors_proxy.urllib3.exceptions.ProtocolError):
+        cors_proxy.streaming_handler(function_url_event(), stream, None)
+    # El runtime cierra el stream con los trailers de error
+    assert not stream.closed
+
+
+def test_failure_before_prelude_is_an_error_response(monkeypatch):
+    def unavailable(*args):
+        raise cors_proxy.urllib3.exceptions.MaxRetryError(None, 'http://mcp', 'refused')
+
+    monkeypatch.setattr(cors_proxy, 'open_upstream', unavailable)
+    stream = FakeStream()
+    cors_proxy.streaming_handler(function_url_event(), stream, None)
+
+    prelude, body = stream.data.split(b'\x00' * 8)
+    assert json.loads(prelude)['statusCode'] == 502
+    assert json.loads(body)['error'] == 'Upstream unavailable'
+    assert stream.closed
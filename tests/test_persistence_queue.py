@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import persistence_queue
+from persistence_queue import LocalPersistenceQueue, build_message, process_sqs_records
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return LocalPersistenceQueue(str(tmp_path), max_attempts=3)
+
+
+def send_project(queue, project_id):
+    return queue.send(build_message(project_id, {'name': project_id}, {}, user_id='u1'))
+
+
+def test_drain_processes_in_order_and_removes_messages(queue):
+    for project_id in ('p1', 'p2'):
+        send_project(queue, project_id)
+    seen = []
+
+    report = queue.drain(lambda message: seen.append((message['projectId'], message['userId'])))
+    assert report == {'processed': 2, 'retried': 0, 'dead_lettered': 0}
+    assert seen == [('p1', 'u1'), ('p2', 'u1')]
+    assert queue.drain(seen.append)['processed'] == 0
+
+
+def test_failures_are_retried_then_dead_lettered(queue):
+    send_project(queue, 'bad')
+    send_project(queue, 'good')
+
+    def processor(message):
+        if message['projectId'] == 'bad':
+            raise RuntimeError('DynamoDB throttled')
+
+    assert queue.drain(processor) == {'processed': 1, 'retried': 1, 'dead_lettered': 0}
+    assert queue.drain(processor) == {'processed': 0, 'retried': 1, 'dead_lettered': 0}
+    assert queue.drain(processor) == {'processed': 0, 'retried': 0, 'dead_lettered': 1}
+    assert queue.drain(processor) == {'processed': 0, 'retried': 0, 'dead_lettered': 0}
+
+    dead = queue.dead_letters()
+    assert len(dead) == 1
+    assert dead[0]['attempts'] == 3
+    assert dead[0]['lastError'] == 'DynamoDB throttled'
+    assert json.loads(dead[0]['body'])['projectId'] == 'bad'
+
+
+def test_a_message_that_recovers_is_not_dead_lettered(queue):
+    send_project(queue, 'flaky')
+    failures = ['timeout']
+
+    def processor(message):
+        if failures:
+            raise RuntimeError(failures.pop())
+
+    assert queue.drain(processor)['retried'] == 1
+    assert queue.drain(processor)['processed'] == 1
+    assert queue.dead_letters() == []
+
+
+def test_enqueue_falls_back_to_sync_for_oversized_messages(queue, monkeypatch):
+    monkeypatch.setattr(persistence_queue, '_queue', queue)
+    monkeypatch.setattr(persistence_queue, 'PERSISTENCE_MAX_MESSAGE_BYTES', 200)
+
+    assert persistence_queue.enqueue_project('p1', {'name': 'small'}, {}) is not None
+    assert persistence_queue.enqueue_project('p2', {'name': 'x' * 500}, {}) is None
+
+
+def test_sqs_batch_reports_only_failed_records():
+    records = [{'messageId': 'm1', 'body': json.dumps({'projectId': 'ok'})},
+               {'messageId': 'm2', 'body': json.dumps({'projectId': 'bad'}),
+                'attributes': {'ApproximateReceiveCount': '2'}}]
+
+    def processor(message):
+        if message['projectId'] == 'bad':
+            raise ValueError('bad item')
+
+    assert process_sqs_records(records, processor) == {'batchItemFailures': [{'itemIdentifier': 'm2'}]}
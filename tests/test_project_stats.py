@@ -0,0 +1,124 @@
+import pytest
+
+boto3 = pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+
+from boto3.dynamodb.types import TypeSerializer  # noqa: E402
+
+import project_stats  # noqa: E402
+
+_serializer = TypeSerializer()
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    with moto.mock_aws():
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        for name, key in ((project_stats.PROJECTS_TABLE, 'projectId'), (project_stats.PROJECT_STATS_TABLE, 'statsId')):
+            dynamodb.create_table(
+                TableName=name,
+                AttributeDefinitions=[{'AttributeName': key, 'AttributeType': 'S'}],
+                KeySchema=[{'AttributeName': key, 'KeyType': 'HASH'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+        monkeypatch.setattr(project_stats, 'dynamodb', dynamodb)
+        yield dynamodb.Table(project_stats.PROJECTS_TABLE), dynamodb.Table(project_stats.PROJECT_STATS_TABLE)
+
+
+def project(project_id, status='completed', project_type='web', documents=2):
+    return {'projectId': project_id, 'status': status, 'projectType': project_type, 'totalDocuments': documents}
+
+
+def record(old=None, new=None):
+    images = {}
+    if old:
+        images['OldImage'] = {key: _serializer.serialize(value) for key, value in old.items()}
+    if new:
+        images['NewImage'] = {key: _serializer.serialize(value) for key, value in new.items()}
+    return {'dynamodb': images}
+
+
+def aggregate(stats_table):
+    return stats_table.get_item(Key={'statsId': project_stats.STATS_ID}).get('Item')
+
+
+def test_first_stream_batch_bootstraps_from_the_whole_table(tables):
+    projects, stats = tables
+    for project_id in ('p1', 'p2'):
+        projects.put_item(Item=project(project_id))
+    projects.put_item(Item=project('p3', status='in_progress'))
+    old, new = project('p3', status='in_progress'), project('p3', status='completed')
+    projects.put_item(Item=new)
+
+    project_stats.stream_handler({'Records': [record(old, new)]}, None)
+
+    item = aggregate(stats)
+    assert item['totalProjects'] == 3
+    assert item['status#completed'] == 3
+    assert item.get('status#in_progress', 0) == 0
+
+
+def test_stream_deltas_apply_after_bootstrap(tables):
+    projects, stats = tables
+    projects.put_item(Item=project('p1'))
+    project_stats.rebuild_statistics(settle_seconds=0)
+
+    projects.put_item(Item=project('p2', documents=5))
+    project_stats.stream_handler({'Records': [record(new=project('p2', documents=5))]}, None)
+
+    item = aggregate(stats)
+    assert (item['totalProjects'], item['totalDocuments'], item['version']) == (2, 7, 1)
+
+
+def test_rebuild_does_not_overwrite_a_delta_applied_during_the_scan(tables, monkeypatch):
+    projects, stats = tables
+    projects.put_item(Item=project('p1'))
+    project_stats.rebuild_statistics(settle_seconds=0)
+
+    scan_totals = project_stats.scan_totals
+    scans = []
+
+    def scan_with_concurrent_insert():
+        totals = scan_totals()
+        if not scans:
+            # Un proyecto creado mientras escanea: el scan no lo vio, el stream lo aplica
+            projects.put_item(Item=project('p2'))
+            project_stats.stream_handler({'Records': [record(new=project('p2'))]}, None)
+        scans.append(totals)
+        return totals
+
+    monkeypatch.setattr(project_stats, 'scan_totals', scan_with_concurrent_insert)
+    item = project_stats.rebuild_statistics(settle_seconds=0)
+
+    assert len(scans) == 2
+    assert item['totalProjects'] == 2
+    assert aggregate(stats)['totalProjects'] == 2
+    assert aggregate(stats)['version'] == 1
+
+
+def test_rebuild_gives_up_and_keeps_the_stream_aggregate(tables, monkeypatch):
+    projects, stats = tables
+    project_stats.rebuild_statistics(settle_seconds=0)
+    scan_totals = project_stats.scan_totals
+
+    def scan_while_stream_keeps_writing():
+        totals = scan_totals()
+        project_stats.apply_delta({'totalProjects': 1})
+        return totals
+
+    monkeypatch.setattr(project_stats, 'scan_totals', scan_while_stream_keeps_writing)
+
+    assert project_stats.rebuild_statistics(settle_seconds=0, max_attempts=2) is None
+    assert aggregate(stats)['totalProjects'] == 2
+
+
+def test_read_rebuilds_an_aggregate_that_was_never_initialized(tables):
+    projects, stats = tables
+    projects.put_item(Item=project('p1', project_type='api'))
+    # Item de antes del versionado: solo ADDs del stream, sin rebuiltAt
+    stats.put_item(Item={'statsId': project_stats.STATS_ID, 'totalProjects': -1, 'status#completed': -1})
+
+    statistics = project_stats.read_statistics()
+    assert statistics['totalProjects'] == 1
+    assert statistics['byStatus'] == {'completed': 1}
+    assert statistics['byType'] == {'api': 1}
@@ -0,0 +1,79 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, entity_tokens
+
+MODEL = 'amazon.nova-pro-v1:0'
+CONFIG = {'maxTokens': 1024, 'temperature': 0.5}
+
+
+def ask(question, history=()):
+    return list(history) + [{'role': 'user', 'content': question}]
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(ttl_seconds=60, max_entries=8, path='')
+
+
+def test_exact_hit_ignores_case_accents_and_punctuation(cache):
+    cache.put(MODEL, ask('¿Qué es Amazon SQS?'), CONFIG, 'Una cola', {'totalTokens': 40})
+
+    hit = cache.get(MODEL, ask('que es amazon sqs'), CONFIG)
+    assert hit['response'] == 'Una cola'
+    assert hit['cache']['tier'] == 'exact'
+    assert hit['cache']['savedTokens'] == 40
+    assert cache.get('other-model', ask('que es amazon sqs'), CONFIG) is None
+
+
+def test_semantic_hit_for_a_paraphrase(cache):
+    cache.put(MODEL, ask('What is the db.t3.micro cost?'), CONFIG, 'About $12/month')
+
+    hit = cache.get(MODEL, ask('What is the db.t3.micro instance cost?'), CONFIG)
+    assert hit is not None
+    assert hit['cache']['tier'] == 'semantic'
+    assert hit['cache']['similarity'] >= cache.similarity_threshold
+
+
+@pytest.mark.parametrize('stored, asked', [
+    ('What is the db.t3.micro cost?', 'What is the db.t3.small cost?'),
+    ('What is the maximum message size in SQS?', 'What is the maximum message size in SNS?'),
+    ('What is the difference between ALB and NLB?', 'What is the difference between ALB and GLB?'),
+    ('¿Cuánto cuesta una instancia rds postgres?', '¿Cuánto cuesta una instancia aurora postgres?')
+])
+def test_semantic_tier_requires_the_same_entities(cache, stored, asked):
+    cache.put(MODEL, ask(stored), CONFIG, 'answer')
+
+    assert entity_tokens(stored) != entity_tokens(asked)
+    assert cache.get(MODEL, ask(asked), CONFIG) is None
+
+
+def test_semantic_tier_requires_the_same_previous_turns(cache):
+    history = [{'role': 'user', 'content': 'Uso RDS'}, {'role': 'assistant', 'content': 'Bien'}]
+    cache.put(MODEL, ask('What is the db.t3.micro cost?', history), CONFIG, 'answer')
+
+    assert cache.get(MODEL, ask('What is the db.t3.micro instance cost?'), CONFIG) is None
+    assert cache.get(MODEL, ask('What is the db.t3.micro instance cost?', history), CONFIG) is not None
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now[0])
+    cache.put(MODEL, ask('What is Amazon SQS?'), CONFIG, 'answer')
+
+    now[0] += 59
+    assert cache.get(MODEL, ask('What is Amazon SQS?'), CONFIG) is not None
+    now[0] += 1
+    assert cache.get(MODEL, ask('What is Amazon SQS?'), CONFIG) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_and_persistence(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = ResponseCache(ttl_seconds=60, max_entries=2, path=path)
+    for service in ('SQS', 'SNS', 'EC2'):
+        cache.put(MODEL, ask(f"What is {service}?"), CONFIG, service)
+
+    reloaded = ResponseCache(ttl_seconds=60, max_entries=2, path=path)
+    assert reloaded.get(MODEL, ask('What is SQS?'), CONFIG) is None
+    assert reloaded.get(MODEL, ask('What is EC2?'), CONFIG)['response'] == 'EC2'
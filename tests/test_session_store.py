@@ -0,0 +1,136 @@
+import pytest
+
+boto3 = pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+
+from session_store import ChatSessionStore, SessionNotFound, message_key  # noqa: E402
+
+TABLE = 'chat-sessions-test'
+
+
+@pytest.fixture
+def store():
+    with moto.mock_aws():
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        dynamodb.create_table(
+            TableName=TABLE,
+            AttributeDefinitions=[
+                {'AttributeName': 'sessionId', 'AttributeType': 'S'},
+                {'AttributeName': 'userId', 'AttributeType': 'S'},
+                {'AttributeName': 'timestamp', 'AttributeType': 'N'}
+            ],
+            KeySchema=[{'AttributeName': 'sessionId', 'KeyType': 'HASH'}],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'UserIndex',
+                'KeySchema': [{'AttributeName': 'userId', 'KeyType': 'HASH'},
+                              {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}],
+                'Projection': {'ProjectionType': 'ALL'}
+            }],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield ChatSessionStore(dynamodb, table_name=TABLE)
+
+
+def turn(number):
+    return [{'role': 'user', 'content': f"q{number}"}, {'role': 'assistant', 'content': f"a{number}"}]
+
+
+def contents(loaded):
+    return [message['content'] for message in loaded['messages']]
+
+
+def test_append_and_load(store):
+    for number in range(4):
+        count = store.append('s1', turn(number), user_id='u1')
+    assert count == 8
+
+    loaded = store.load('s1')
+    assert contents(loaded) == ['q0', 'a0', 'q1', 'a1', 'q2', 'a2', 'q3', 'a3']
+    assert loaded['indexes'] == list(range(8))
+    assert loaded['messages'][1]['role'] == 'assistant'
+
+
+def test_load_starts_at_summary_coverage(store):
+    for number in range(3):
+        store.append('s1', turn(number))
+    store.append('s1', turn(3), attributes={'summaryCovered': 4, 'contextSummary': 'resumen'})
+
+    loaded = store.load('s1')
+    assert loaded['baseIndex'] == 4
+    assert contents(loaded) == ['q2', 'a2', 'q3', 'a3']
+    assert contents(store.load('s1', from_index=0))[0] == 'q0'
+
+
+def test_long_messages_do_not_hit_the_item_size_limit(store):
+    # ~16 KB por respuesta: 30 turnos superan los 400 KB de un item
+    answer = 'x' * 16000
+    for number in range(30):
+        count = store.append('s1', [{'role': 'user', 'content': f"q{number}"},
+                                    {'role': 'assistant', 'content': answer}])
+
+    assert count == 60
+    loaded = store.load('s1', from_index=0)
+    assert len(loaded['messages']) == 60
+    assert loaded['messages'][-1]['content'] == answer
+
+
+def test_failed_message_write_leaves_a_gap_without_shifting_later_messages(store, monkeypatch):
+    store.append('s1', turn(0))
+
+    # La reserva de índices (ADD en la cabecera) pasa, la escritura de los mensajes falla
+    def failing_put(**kwargs):
+        raise RuntimeError('throttled')
+
+    monkeypatch.setattr(store.table, 'put_item', failing_put)
+    with pytest.raises(RuntimeError):
+        store.append('s1', turn(1))
+    monkeypatch.undo()
+
+    assert store.append('s1', turn(2)) == 6
+    loaded = store.load('s1', from_index=0)
+    assert contents(loaded) == ['q0', 'a0', 'q2', 'a2']
+    assert loaded['indexes'] == [0, 1, 4, 5]
+
+    # summaryCovered sigue apuntando al mensaje correcto
+    store.append('s1', turn(3), attributes={'summaryCovered': 5})
+    assert contents(store.load('s1')) == ['a2', 'q3', 'a3']
+
+
+def test_interleaved_turns_keep_their_reserved_positions(store, monkeypatch):
+    # Dos turnos concurrentes: ambos reservan índices antes de que cualquiera escriba sus mensajes
+    writes = []
+    original_put = store.table.put_item
+
+    monkeypatch.setattr(store.table, 'put_item', lambda **kwargs: writes.append(kwargs))
+    store.append('s1', turn(0))
+    store.append('s1', turn(1))
+    monkeypatch.undo()
+
+    for kwargs in reversed(writes):
+        original_put(**kwargs)
+
+    assert contents(store.load('s1')) == ['q0', 'a0', 'q1', 'a1']
+    assert [write['Item']['sessionId'] for write in writes] == [message_key('s1', index) for index in range(4)]
+
+
+def test_unknown_session_and_listing(store):
+    with pytest.raises(SessionNotFound):
+        store.load('missing')
+
+    store.append('s1', turn(0), user_id='u1', attributes={'title': 'q0'})
+    store.append('s2', turn(0), user_id='u2')
+    sessions = store.list_sessions('u1')
+    assert [session['sessionId'] for session in sessions] == ['s1']
+    assert sessions[0]['title'] == 'q0'
+
+
+def test_chat_turn_is_returned_when_the_transcript_write_fails(chat_app, monkeypatch):
+    def failing_append(*args, **kwargs):
+        raise RuntimeError('Item size has exceeded the maximum allowed size')
+
+    monkeypatch.setattr(chat_app.session_store, 'append', failing_append)
+    new_message = {'role': 'user', 'content': 'hola'}
+    turn_state = {'sessionId': 's1', 'isNew': False, 'newMessage': new_message,
+                  'messages': [new_message], 'baseIndex': 0, 'indexes': []}
+
+    assert chat_app.save_turn(turn_state, 'respuesta', {'summaryState': None}) is None